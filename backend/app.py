@@ -1,19 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 from uuid import uuid4
-from src.sdlccopilot.requests import ProjectRequirementsRequest, OwnerFeedbackRequest
+from src.sdlccopilot.requests import ProjectRequirementsRequest, BatchProjectRequirementsRequest, OwnerFeedbackRequest
 from src.sdlccopilot.responses import UserStoriesResponse, DesignDocumentsResponse, CodeResponse, SecurityReviewResponse, SecurityReview, TestCasesResponse, QATestingResponse, DeploymentResponse
 from src.sdlccopilot.graph.sdlc_graph import SDLCGraphBuilder
 from src.sdlccopilot.logger import logging
+from src.sdlccopilot.utils.serialization import dumps, loads, model_json
+from src.sdlccopilot.compression import CompressionMiddleware, identity_etag
+from src.sdlccopilot.single_flight import single_flight
+from src.sdlccopilot.checkpointer import run_checkpoint_gc, SESSION_TTL_SECONDS
+from src.sdlccopilot.llms.prompt_cache import prompt_cache_usage
+from src.sdlccopilot.llms.continuation import partial_outputs
+from src.sdlccopilot.utils.static_analysis import start_process_pool, shutdown_process_pool
+from src.sdlccopilot.scheduler import llm_scheduler, admission_control, scheduling_context, PRIORITY_INTERACTIVE, PRIORITY_INITIAL
+from starlette.concurrency import run_in_threadpool
 from redis import Redis
+import asyncio
 import os 
 import httpx
-import json
 from typing import Optional, Dict, Any
 from contextlib import asynccontextmanager
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, PlainTextResponse, StreamingResponse
+import hashlib
 import time
 
 from dotenv import load_dotenv
@@ -33,8 +43,11 @@ REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 class ApplicationState:
     def __init__(self):
         self.redis: Optional[Redis] = None
+        self.checkpoint_redis: Optional[Redis] = None
         self.http_client: Optional[httpx.AsyncClient] = None
         self.sdlc_workflow = None
+        self.user_story_helper = None
+        self.checkpoint_gc_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         self.redis = Redis(
@@ -44,20 +57,38 @@ class ApplicationState:
             username="default",
             password=REDIS_PASSWORD
         )
+        # Checkpoints are binary, so they get a client that does not decode responses
+        self.checkpoint_redis = Redis(
+            host= REDIS_HOST,
+            port=REDIS_PORT,
+            username="default",
+            password=REDIS_PASSWORD
+        )
+        partial_outputs.configure(self.redis)
+        start_process_pool()
         self.http_client = httpx.AsyncClient()
         sdlc_graph_builder = SDLCGraphBuilder()
         self.sdlc_workflow = sdlc_graph_builder.build()
+        self.sdlc_workflow.checkpointer.configure(self.checkpoint_redis)
+        self.user_story_helper = sdlc_graph_builder.story_node.user_story_helper
+        self.checkpoint_gc_task = asyncio.create_task(run_checkpoint_gc(self.sdlc_workflow.checkpointer))
 
     async def shutdown(self):
+        if self.checkpoint_gc_task:
+            self.checkpoint_gc_task.cancel()
         if self.http_client:
             await self.http_client.aclose()
         if self.redis:
             self.redis.close()
+        if self.checkpoint_redis:
+            self.checkpoint_redis.close()
+        shutdown_process_pool()
 
 app = FastAPI(
     title="SDLC Copilot API",
     description="API for managing the Software Development Life Cycle process",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 @app.on_event("startup")
@@ -81,6 +112,9 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
+# Negotiated gzip/brotli compression for large code and document payloads
+app.add_middleware(CompressionMiddleware)
+
 # Dependency injection
 async def get_redis() -> Redis:
     return app.state.app_state.redis
@@ -91,6 +125,22 @@ async def get_http_client() -> httpx.AsyncClient:
 async def get_sdlc_workflow():
     return app.state.app_state.sdlc_workflow
 
+async def get_user_story_helper():
+    return app.state.app_state.user_story_helper
+
+async def get_tenant(request: Request) -> str:
+    """
+    The scheduler's fair-share key for the caller: its API key, hashed so it is never logged,
+    then its X-Client-Id, then its address.
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return f"client:{client_id}"
+    return f"host:{request.client.host if request.client else 'unknown'}"
+
 # Helper functions
 def serialize_message(msg) -> Dict[str, Any]:
     return {
@@ -99,6 +149,74 @@ def serialize_message(msg) -> Dict[str, Any]:
         "id": msg.id
     }
 
+def thread_config(session_id: str, session_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Sessions created before tenants were recorded are scheduled per session
+    return {"configurable": {"thread_id": session_id, "tenant_id": session_data.get("tenant_id")}}
+
+def run_workflow(sdlc_workflow, input, thread):
+    state = None
+    for event in sdlc_workflow.stream(input, thread, stream_mode="values"):
+        state = event
+    return state
+
+def model_response(model: BaseModel) -> Response:
+    return Response(content=model_json(model), media_type="application/json")
+
+def artifact_etag(payload: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(dumps(payload, sort_keys=True)).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Compressed responses carry the ETag with an encoding suffix, which names the same artifact
+    tags = [identity_etag(tag) for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def paginate_messages(messages, since_id: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Returns the messages after `since_id` and whether the history was reset. A since_id that is
+    no longer in the history, typically because compaction folded it into the history summary,
+    returns the whole current history, summary first, flagged as a reset so the client replaces
+    its copy instead of appending to it.
+    """
+    messages = messages or []
+    reset = False
+    if since_id:
+        message_ids = [msg.get("id") for msg in messages]
+        if since_id in message_ids:
+            messages = messages[message_ids.index(since_id) + 1:]
+        else:
+            reset = True
+    if limit is not None:
+        messages = messages[:limit]
+    return messages, reset
+
+def artifact_response(request: Request, payload: Dict[str, Any], fields: Optional[str] = None, since_id: Optional[str] = None, limit: Optional[int] = None):
+    """
+    Builds the response of a polled GET endpoint: an ETag computed from the artifact and the
+    query, 304 with no body when it matches If-None-Match, and otherwise the requested fields
+    with the messages paginated by `since_id` and `limit`.
+    """
+    etag = artifact_etag({"payload": payload, "fields": fields, "since_id": since_id, "limit": limit})
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    messages, messages_reset = paginate_messages(payload.get("messages"), since_id, limit)
+    payload = {**payload, "messages": messages, "messages_reset": messages_reset}
+    if fields:
+        selected = {field.strip() for field in fields.split(",")} | {"session_id"}
+        if "messages" in selected:
+            selected.add("messages_reset")
+        payload = {key: value for key, value in payload.items() if key in selected}
+    return ORJSONResponse(content=payload, headers={"ETag": etag})
+
+# Artifact read query parameters
+FIELDS_QUERY = Query(None, description="Comma-separated list of fields to return")
+SINCE_ID_QUERY = Query(None, description="Only return messages after the message with this id")
+LIMIT_QUERY = Query(None, ge=1, description="Maximum number of messages to return")
+
 
 # Status response model
 class ServerStatusResponse(BaseModel):
@@ -120,6 +238,10 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(llm_scheduler.metrics() + prompt_cache_usage.metrics())
+
 @app.get("/status", response_model=ServerStatusResponse)
 async def get_server_status():
     return ServerStatusResponse(
@@ -128,10 +250,12 @@ async def get_server_status():
     )
 
 @app.post("/stories/generate", response_model=UserStoriesResponse)
+@admission_control(PRIORITY_INITIAL)
 async def generate_user_stories(
     request: ProjectRequirementsRequest,
     redis: Redis = Depends(get_redis),
-    sdlc_workflow = Depends(get_sdlc_workflow)
+    sdlc_workflow = Depends(get_sdlc_workflow),
+    tenant: str = Depends(get_tenant)
 ):
     logging.info(f"Generating user stories for project: {request.title}")
     session_id = str(uuid4())
@@ -152,38 +276,123 @@ async def generate_user_stories(
             "review_count": 0
         }
 
-        state = None
-        thread = {"configurable": {"thread_id": session_id}}
-        for event in sdlc_workflow.stream(initial_story_state, thread, stream_mode="values"):
-            state = event
+        thread = thread_config(session_id, {"tenant_id": tenant})
+        state = await run_in_threadpool(run_workflow, sdlc_workflow, initial_story_state, thread)
 
         user_story_status = "completed" if state["user_story_status"] == 'approved' else state["user_story_status"]
         user_story = state["user_stories"]
         user_story_messages = [serialize_message(msg) for msg in state["user_story_messages"]]
 
         session_data = {
+            "tenant_id": tenant,
             "project_requirements": project_requirements,
             "user_stories": user_story,
             "user_story_status": user_story_status,
             "user_story_messages": user_story_messages
         }
                 
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"User stories generated successfully for session: {session_id}")
 
-        return UserStoriesResponse(
+        return model_response(UserStoriesResponse(
             session_id=session_id,
             project_requirements=project_requirements,
             status=user_story_status,
             user_stories=user_story,
             message=user_story_messages
-        )    
+        ))    
 
     except Exception as e:
         logging.error(f"Error generating user stories: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
 
+def start_user_story_session(sdlc_workflow, redis, tenant, project_requirements, user_stories):
+    """
+    Runs a new session up to the user story review with `user_stories` generated ahead of
+    the graph, so the session continues through the regular review endpoints.
+    """
+    session_id = str(uuid4())
+    initial_story_state = {
+        "project_requirements": project_requirements,
+        "user_stories": user_stories,
+        "user_stories_messages": HumanMessage(content=f"{project_requirements}"),
+        "status": "in_progress",
+        "owner_feedback": "",
+        "review_count": 0
+    }
+    thread = thread_config(session_id, {"tenant_id": tenant})
+    state = run_workflow(sdlc_workflow, initial_story_state, thread)
+
+    user_story_status = "completed" if state["user_story_status"] == 'approved' else state["user_story_status"]
+    user_story_messages = [serialize_message(msg) for msg in state["user_story_messages"]]
+    session_data = {
+        "tenant_id": tenant,
+        "project_requirements": project_requirements,
+        "user_stories": state["user_stories"],
+        "user_story_status": user_story_status,
+        "user_story_messages": user_story_messages
+    }
+    redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
+    return session_id, session_data
+
+@app.post("/stories/generate/batch")
+@admission_control(PRIORITY_INITIAL)
+async def generate_user_stories_batch(
+    request: BatchProjectRequirementsRequest,
+    redis: Redis = Depends(get_redis),
+    sdlc_workflow = Depends(get_sdlc_workflow),
+    user_story_helper = Depends(get_user_story_helper),
+    tenant: str = Depends(get_tenant)
+):
+    """
+    Generates user stories for many projects in one request. The LLM calls run concurrently
+    with a bounded fan-out, and each project is streamed back as an NDJSON line as soon as
+    its session is ready, so one failed project does not fail the batch.
+    """
+    logging.info(f"Generating user stories for a batch of {len(request.projects)} projects")
+
+    async def generated_user_stories():
+        if os.environ.get("PROJECT_ENVIRONMENT") == "development":
+            # The user story node serves the fixtures when no stories are passed in
+            for index in range(len(request.projects)):
+                yield index, []
+            return
+        with scheduling_context(PRIORITY_INITIAL, tenant):
+            async for index, user_stories in user_story_helper.generate_user_stories_batch_with_llm(request.projects):
+                yield index, user_stories
+
+    async def results():
+        async for index, user_stories in generated_user_stories():
+            project = request.projects[index]
+            result = {"index": index, "title": project.title}
+            try:
+                if isinstance(user_stories, Exception):
+                    raise user_stories
+                project_requirements = {
+                    "title": project.title,
+                    "description": project.description,
+                    "requirements": project.requirements
+                }
+                session_id, session_data = await run_in_threadpool(
+                    start_user_story_session, sdlc_workflow, redis, tenant, project_requirements, user_stories
+                )
+                logging.info(f"User stories generated successfully for session: {session_id}")
+                result.update({
+                    "status": session_data["user_story_status"],
+                    "session_id": session_id,
+                    "user_stories": session_data["user_stories"],
+                    "message": session_data["user_story_messages"]
+                })
+            except Exception as e:
+                logging.error(f"Error generating user stories for project {index}: {str(e)}")
+                result.update({"status": "failed", "error": str(e)})
+            yield dumps(result) + b"\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @app.post("/stories/review/{session_id}", response_model=UserStoriesResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_user_stories(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -195,7 +404,7 @@ async def review_user_stories(
     session_data = session_validator(session_id, redis, "user_story_review")
     
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         sdlc_state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {sdlc_state.next}")
 
@@ -227,16 +436,16 @@ async def review_user_stories(
             "functional_messages": functional_messages if user_story_status == "completed" else None
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"User stories reviewed successfully for session: {session_id}")
 
-        return UserStoriesResponse(
+        return model_response(UserStoriesResponse(
             session_id=session_id,
             project_requirements=session_data["project_requirements"],
             status=user_story_status,
             user_stories=user_story,
             message=user_story_messages
-        )    
+        ))    
 
     except Exception as e:
         logging.error(f"Error reviewing user stories: {str(e)}")
@@ -257,13 +466,13 @@ async def create_functional_design_documents(
 
         logging.info(f"Functional documents generated successfully for session: {session_id}")
 
-        return DesignDocumentsResponse.model_construct(
+        return model_response(DesignDocumentsResponse.model_construct(
             session_id=session_id,
             document_type="functional",
             status=functional_status,
             document=functional_documents,
             messages=functional_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error generating functional documents: {str(e)}")
@@ -271,6 +480,8 @@ async def create_functional_design_documents(
 
 
 @app.post("/documents/functional/review/{session_id}", response_model=DesignDocumentsResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_functional_design_documents(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -281,7 +492,7 @@ async def review_functional_design_documents(
     feedback = request.feedback
     session_data = session_validator(session_id, redis, "functional_review")
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         sdlc_state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {sdlc_state.next}")
         
@@ -310,16 +521,16 @@ async def review_functional_design_documents(
             "technical_status": technical_status if functional_status == "completed" else None,
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Functional documents reviewed successfully for session: {session_id}")
 
-        return DesignDocumentsResponse.model_construct(
+        return model_response(DesignDocumentsResponse.model_construct(
             session_id=session_id,
             document_type="functional",
             status=functional_status,
             document=sdlc_state["functional_documents"],
             messages=functional_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing functional documents: {str(e)}")
@@ -341,19 +552,21 @@ async def create_technical_design_documents(
         
         logging.info(f"Technical documents generated successfully for session: {session_id}")
         
-        return DesignDocumentsResponse.model_construct(
+        return model_response(DesignDocumentsResponse.model_construct(
             session_id=session_id,
             document_type="technical",
             status=technical_status,
             document=technical_documents,
             messages=technical_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error generating technical documents: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
 
 @app.post("/documents/technical/review/{session_id}", response_model=DesignDocumentsResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_technical_design_documents(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -366,7 +579,7 @@ async def review_technical_design_documents(
     
     try:
         
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         sdlc_state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {sdlc_state.next}")
 
@@ -396,16 +609,16 @@ async def review_technical_design_documents(
             "frontend_status": frontend_status if technical_status == "completed" else None,
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Technical documents reviewed successfully for session: {session_id}")
 
-        return DesignDocumentsResponse.model_construct(
+        return model_response(DesignDocumentsResponse.model_construct(
             session_id=session_id,
             document_type="technical",
             status=technical_status,
             document=sdlc_state["technical_documents"],
             messages=technical_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing technical documents: {str(e)}")
@@ -427,19 +640,21 @@ async def generate_frontend_code(
         
         logging.info(f"Frontend code generated successfully for session: {session_id}")
 
-        return CodeResponse.model_construct(
+        return model_response(CodeResponse.model_construct(
             session_id=session_id,
             code_type="frontend",
             status=frontend_status,
             code=frontend_code,
             messages=frontend_messages,
-        )
+        ))
     
     except Exception as e:
         logging.error(f"Error generating frontend code: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
     
 @app.post("/code/frontend/review/{session_id}", response_model=CodeResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_frontend_code(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -451,7 +666,7 @@ async def review_frontend_code(
     session_data = session_validator(session_id, redis, "frontend_review")
     
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         sdlc_state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {sdlc_state.next}")
 
@@ -481,16 +696,16 @@ async def review_frontend_code(
             "backend_status": backend_status if frontend_status == "completed" else None,
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Frontend code reviewed successfully for session: {session_id}")
         
-        return CodeResponse.model_construct(
+        return model_response(CodeResponse.model_construct(
             session_id=session_id,
             code_type="frontend",
             status=frontend_status,
             code=sdlc_state["frontend_code"],
             messages=frontend_messages,
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing frontend code: {str(e)}")
@@ -511,19 +726,21 @@ async def generate_backend_code(
         backend_code = session_data["backend_code"]
         backend_messages = session_data["backend_messages"]
         logging.info(f"Backend code generated successfully for session: {session_id}")
-        return CodeResponse.model_construct(
+        return model_response(CodeResponse.model_construct(
             session_id=session_id,
             code_type="backend",
             status=backend_status,
             code=backend_code,
             messages=backend_messages,
-        )
+        ))
     
     except Exception as e:
         logging.error(f"Error generating backend code: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
 
 @app.post("/code/backend/review/{session_id}", response_model=CodeResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_backend_code(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -535,7 +752,7 @@ async def review_backend_code(
     session_data = session_validator(session_id, redis, "backend_review")
     
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         document_state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {document_state.next}")
         
@@ -564,16 +781,16 @@ async def review_backend_code(
             "security_reviews_status": security_reviews_status if status == "completed" else None,
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Backend code reviewed successfully for session: {session_id}")
         
-        return CodeResponse.model_construct(
+        return model_response(CodeResponse.model_construct(
             session_id=session_id,
             code_type="backend",
             status=status,
             code=state["backend_code"],
             messages=backend_messages,
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing backend code: {str(e)}")
@@ -583,6 +800,10 @@ async def review_backend_code(
 @app.get("/security/review/get/{session_id}", response_model=SecurityReviewResponse)
 async def get_security_review(
     session_id: str,
+    request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    since_id: Optional[str] = SINCE_ID_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
     redis: Redis = Depends(get_redis),
 ):
     logging.info(f"Getting security review for session: {session_id}")
@@ -593,18 +814,20 @@ async def get_security_review(
         messages = session_data["security_reviews_messages"]
         logging.info(f"Security review retrieved successfully for session: {session_id}")
         
-        return SecurityReviewResponse.model_construct(
-            session_id=session_id,
-            status=status,
-            reviews=reviews,
-            messages=messages
-        )
+        return artifact_response(request, {
+            "session_id": session_id,
+            "status": status,
+            "reviews": reviews,
+            "messages": messages
+        }, fields, since_id, limit)
         
     except Exception as e:
         logging.error(f"Error getting security review: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
 
 @app.post("/security/review/review/{session_id}", response_model=SecurityReviewResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_security_review(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -616,7 +839,7 @@ async def review_security_review(
     session_data = session_validator(session_id, redis, "security_review")
     
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {state.next}")
         
@@ -650,7 +873,7 @@ async def review_security_review(
             "test_cases_status": test_cases_status if status == "completed" else None,
         }
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Security review reviewed successfully for session: {session_id}")
 
         # Ensure security_reviews is a list, not a tuple
@@ -658,12 +881,12 @@ async def review_security_review(
         if isinstance(security_reviews, tuple):
             security_reviews = list(security_reviews)
         
-        return SecurityReviewResponse.model_construct(
+        return model_response(SecurityReviewResponse.model_construct(
             session_id=session_id,
             status=status,
             reviews=security_reviews,
             messages=security_reviews_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing security review: {str(e)}")
@@ -673,6 +896,10 @@ async def review_security_review(
 @app.get("/test/cases/get/{session_id}", response_model=TestCasesResponse)
 async def get_test_cases(
     session_id: str,
+    request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    since_id: Optional[str] = SINCE_ID_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
     redis: Redis = Depends(get_redis)
 ):
     logging.info(f"Getting test cases for session: {session_id}")
@@ -683,18 +910,20 @@ async def get_test_cases(
         status = session_data["test_cases_status"]
         messages = session_data["test_cases_messages"]
         logging.info(f"Test cases retrieved successfully for session: {session_id}")
-        return TestCasesResponse.model_construct(
-            session_id=session_id,
-            status=status,
-            test_cases=test_cases,
-            messages=messages
-        )
+        return artifact_response(request, {
+            "session_id": session_id,
+            "status": status,
+            "test_cases": test_cases,
+            "messages": messages
+        }, fields, since_id, limit)
         
     except Exception as e:
         logging.error(f"Error getting test cases: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
 
 @app.post("/test/cases/review/{session_id}", response_model=TestCasesResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
 async def review_test_cases(
     session_id: str,
     request: OwnerFeedbackRequest,
@@ -706,7 +935,7 @@ async def review_test_cases(
     session_data = session_validator(session_id, redis, "test_cases_review")
     
     try:
-        thread = {"configurable": {"thread_id": session_id}}
+        thread = thread_config(session_id, session_data)
         state = sdlc_workflow.get_state(thread)
         logging.debug(f"Next node to call: {state.next}")
         
@@ -755,8 +984,14 @@ async def review_test_cases(
             "deployment_status": deployment_status if status == "completed" else None,
             "deployment_messages": deployment_messages if status == "completed" else None,
         }
+        if status == "completed":
+            # The QA fix loop may have revised the backend code, which then waits for its review gate
+            session_data["backend_code"] = state.get("backend_code")
+            session_data["security_reviews"] = state.get("security_reviews", [])
+            qa_fixes_status = state.get("qa_fixes_status")
+            session_data["qa_fixes_status"] = "completed" if qa_fixes_status == "approved" else qa_fixes_status
         
-        redis.set(session_id, json.dumps(session_data))
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
         logging.info(f"Test cases reviewed successfully for session: {session_id}")
 
         # Ensure test_cases is a list for the response
@@ -764,12 +999,12 @@ async def review_test_cases(
         if isinstance(test_cases_response, tuple):
             test_cases_response = list(test_cases_response)
         
-        return TestCasesResponse.model_construct(
+        return model_response(TestCasesResponse.model_construct(
             session_id=session_id,
             status=status,
             test_cases=test_cases_response,
             messages=test_cases_messages
-        )
+        ))
 
     except Exception as e:
         logging.error(f"Error reviewing test cases: {str(e)}")
@@ -779,6 +1014,10 @@ async def review_test_cases(
 @app.get("/qa/testing/get/{session_id}", response_model=QATestingResponse)
 async def get_qa_testing(
     session_id: str,
+    request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    since_id: Optional[str] = SINCE_ID_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
     redis: Redis = Depends(get_redis)
 ):
     logging.info(f"Getting QA testing report for session: {session_id}")
@@ -789,22 +1028,83 @@ async def get_qa_testing(
         status = session_data["qa_testing_status"]
         messages = session_data["qa_testing_messages"]
         logging.info(f"QA testing results retrieved successfully for session: {session_id}")
-        return QATestingResponse.model_construct(
-            session_id=session_id,
-            status=status,
-            qa_testing=qa_testing,
-            messages=messages
-        )
+        return artifact_response(request, {
+            "session_id": session_id,
+            "status": status,
+            "qa_testing": qa_testing,
+            "messages": messages
+        }, fields, since_id, limit)
         
     except Exception as e:
         logging.error(f"Error getting QA testing results: {str(e)}")
         raise SDLCException(status_code=500, detail=str(e))
     
     
+@app.post("/qa/testing/review/{session_id}", response_model=QATestingResponse)
+@single_flight
+@admission_control(PRIORITY_INTERACTIVE)
+async def review_qa_testing(
+    session_id: str,
+    request: OwnerFeedbackRequest,
+    redis: Redis = Depends(get_redis),
+    sdlc_workflow = Depends(get_sdlc_workflow)
+):
+    """Reviews the backend code changed by the QA fix loop, which is released only once approved."""
+    logging.info(f"Reviewing QA fixes for session: {session_id}")
+    feedback = request.feedback
+    session_data = session_validator(session_id, redis, "qa_testing_review")
+
+    try:
+        thread = thread_config(session_id, session_data)
+        state = sdlc_workflow.get_state(thread)
+        logging.debug(f"Next node to call: {state.next}")
+
+        sdlc_workflow.update_state(thread, {"qa_testing_messages": HumanMessage(content=feedback)})
+
+        state = None
+        for event in sdlc_workflow.stream(None, thread, stream_mode="values"):
+            state = event
+
+        logging.debug(f"Updated state: {state}")
+        status = "completed" if state.get("qa_fixes_status") == 'approved' else state.get("qa_fixes_status", "pending")
+        qa_testing_messages = [serialize_message(msg) for msg in state.get("qa_testing_messages", [])]
+        deployment_status_raw = state.get("deployment_status")
+
+        session_data = {
+            **session_data,
+            "backend_code": state.get("backend_code"),
+            "security_reviews": state.get("security_reviews", []),
+            "qa_testing": state.get("qa_testing"),
+            "qa_testing_messages": qa_testing_messages,
+            "qa_testing_status": state.get("qa_testing_status"),
+            "qa_fixes_status": status,
+            "deployment_steps": state.get("deployment_steps"),
+            "deployment_status": "completed" if deployment_status_raw == 'approved' else deployment_status_raw,
+            "deployment_messages": [serialize_message(msg) for msg in state.get("deployment_messages", [])],
+        }
+
+        redis.set(session_id, dumps(session_data), ex=SESSION_TTL_SECONDS)
+        logging.info(f"QA fixes reviewed successfully for session: {session_id}")
+
+        return model_response(QATestingResponse.model_construct(
+            session_id=session_id,
+            status=status,
+            qa_testing=state.get("qa_testing"),
+            messages=qa_testing_messages
+        ))
+
+    except Exception as e:
+        logging.error(f"Error reviewing QA fixes: {str(e)}")
+        raise SDLCException(status_code=500, detail=str(e))
+
 # Deployment endpoints
 @app.get("/deployment/get/{session_id}", response_model=DeploymentResponse)
 async def get_deployment(
     session_id: str,
+    request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    since_id: Optional[str] = SINCE_ID_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
     redis: Redis = Depends(get_redis)
 ):
     logging.info(f"Getting deployment steps for session: {session_id}")
@@ -815,12 +1115,12 @@ async def get_deployment(
         status = session_data["deployment_status"]
         messages = session_data["deployment_messages"]
         logging.info(f"Deployment steps retrieved successfully for session: {session_id}")
-        return DeploymentResponse.model_construct(
-            session_id=session_id,
-            status=status,
-            deployment_steps=deployment_steps,
-            messages=messages
-        )
+        return artifact_response(request, {
+            "session_id": session_id,
+            "status": status,
+            "deployment_steps": deployment_steps,
+            "messages": messages
+        }, fields, since_id, limit)
         
     except Exception as e:
         logging.error(f"Error getting deployment steps: {str(e)}")
@@ -831,7 +1131,7 @@ def session_validator(session_id: str, redis: Redis, current_node: str):
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    session_data = json.loads(session)
+    session_data = loads(session)
     if current_node == "user_story_review":
         if session_data["user_story_status"] == "completed":
             raise HTTPException(status_code=400, detail="User stories are already completed")
@@ -900,7 +1200,10 @@ def session_validator(session_id: str, redis: Redis, current_node: str):
             raise HTTPException(status_code=400, detail="Test cases are not completed")
         
     if current_node == "qa_testing_review":
-        if session_data["qa_testing_status"] == "completed":
-            raise HTTPException(status_code=400, detail="QA testing is already completed")
+        if session_data.get("qa_fixes_status") == "completed":
+            raise HTTPException(status_code=400, detail="QA fixes are already completed")
+
+        if session_data.get("qa_fixes_status") != "pending_approval":
+            raise HTTPException(status_code=400, detail="QA fixes are not pending approval")
         
     return session_data
@@ -0,0 +1,35 @@
+"""
+Measures the serialized checkpoint size of the *_messages channels after a long
+review loop, with the plain `add_messages` reducer and with `add_compacted_messages`.
+
+Run from the backend directory:
+    python -m benchmarks.checkpoint_size
+"""
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph.message import add_messages
+from src.sdlccopilot.states.messages import add_compacted_messages, MESSAGE_HISTORY_LIMIT
+
+MESSAGE_CHANNELS = 9
+REVISION_LOOPS = 50
+
+def simulate_channel(reducer):
+    messages = reducer([], HumanMessage(content="Project requirements: " + "Build a payments app with UPI transfers. " * 10))
+    for loop in range(REVISION_LOOPS):
+        messages = reducer(messages, HumanMessage(content=f"Revision {loop}: please add a story covering refunds and dispute handling for failed UPI payments."))
+        messages = reducer(messages, AIMessage(content="I've received your feedback. I'll revise the user stories accordingly."))
+        messages = reducer(messages, AIMessage(content="Please review revised user stories and provide additional feedback or type 'Approved' if you're satisfied."))
+    return messages
+
+def checkpoint_size(reducer):
+    serializer = JsonPlusSerializer()
+    channel = simulate_channel(reducer)
+    _, payload = serializer.dumps_typed({f"channel_{index}_messages": channel for index in range(MESSAGE_CHANNELS)})
+    return len(channel), len(payload)
+
+if __name__ == "__main__":
+    full_count, full_size = checkpoint_size(add_messages)
+    compact_count, compact_size = checkpoint_size(add_compacted_messages)
+    print(f"{REVISION_LOOPS} revision loops x {MESSAGE_CHANNELS} channels, MESSAGE_HISTORY_LIMIT={MESSAGE_HISTORY_LIMIT}")
+    print(f"add_messages           : {full_count} messages/channel, {full_size} bytes")
+    print(f"add_compacted_messages : {compact_count} messages/channel, {compact_size} bytes ({compact_size / full_size:.1%})")
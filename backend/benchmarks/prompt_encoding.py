@@ -0,0 +1,34 @@
+"""
+Compares the prompt tokens of the structured artifacts as interpolated before (the repr of the
+pydantic objects in state) and with the compact encodings of utils/prompt_encoding.py, per phase,
+on the CONSTANT_* development fixtures.
+
+Run from the backend directory:
+    python -m benchmarks.prompt_encoding
+"""
+from src.sdlccopilot.states.story import UserStory
+from src.sdlccopilot.states.testcase import TestCase
+from src.sdlccopilot.states.security import SecurityReview
+from src.sdlccopilot.states.qa import TestResult
+from src.sdlccopilot.utils.artifact import estimate_tokens
+from src.sdlccopilot.utils.prompt_encoding import encode_user_stories, encode_test_cases, encode_security_reviews, encode_test_results
+from src.sdlccopilot.utils.constants import CONSTANT_USER_STORIES, CONSTANT_TEST_CASES, CONSTANT_SECURITY_REVIEW, CONSTANT_QA_TESTING_RESULTS
+
+PHASES = [
+    ("user stories (documents, code, story revision)", UserStory, CONSTANT_USER_STORIES, encode_user_stories),
+    ("test cases (test case revision, QA testing)", TestCase, CONSTANT_TEST_CASES, encode_test_cases),
+    ("security reviews (security revision)", SecurityReview, CONSTANT_SECURITY_REVIEW, encode_security_reviews),
+    ("test results (QA fixes)", TestResult, CONSTANT_QA_TESTING_RESULTS["test_results"], encode_test_results),
+]
+
+if __name__ == "__main__":
+    for name, model, fixture, encode in PHASES:
+        items = [model.model_validate(item) for item in fixture]
+        before, after = estimate_tokens(str(items)), estimate_tokens(encode(items))
+        print(f"{name:50} {len(items):3} items  repr {before:5} tokens  encoded {after:5} tokens  ({1 - after / before:.1%} fewer)")
+
+    stories = [UserStory.model_validate(story) for story in CONSTANT_USER_STORIES]
+    whole_before = sum(1 for end in range(1, len(stories) + 1) if len(str(stories[:end])) <= 2000)
+    encoded = encode_user_stories(stories, max_chars=2000)
+    whole_after = len(stories) - int(encoded.rsplit("(", 1)[1].split()[0]) if encoded.endswith("more)") else len(stories)
+    print(f"functional document prompt (2000 chars): {whole_before} of {len(stories)} whole user stories before, {whole_after} after")
@@ -0,0 +1,56 @@
+"""
+Compares stdlib json with the orjson / pydantic-core path used by app.py, on a
+session blob and response built from the CONSTANT_* development fixtures.
+
+Run from the backend directory:
+    python -m benchmarks.serialization
+"""
+import json
+import timeit
+from fastapi.encoders import jsonable_encoder
+from src.sdlccopilot.responses import CodeResponse
+from src.sdlccopilot.utils.serialization import dumps, loads, model_json
+from src.sdlccopilot.utils.constants import (
+    CONSTANT_USER_STORIES, CONSTANT_FUNCTIONAL_DOCUMENT, CONSTANT_TECHNICAL_DOCUMENT,
+    CONSTANT_FRONTEND_CODE, CONSTANT_BACKEND_CODE, CONSTANT_SECURITY_REVIEW,
+    CONSTANT_TEST_CASES, CONSTANT_QA_TESTING_RESULTS, CONSTANT_DEPLOYMENT_STEPS
+)
+
+ITERATIONS = 200
+
+def messages(count):
+    return [
+        {"content": f"Please review the revised artifact and provide feedback or type 'Approved' ({index}).", "type": "ai" if index % 2 else "human", "id": f"message-{index}"}
+        for index in range(count)
+    ]
+
+SESSION_DATA = {
+    "project_requirements": {"title": "PayMate", "description": "UPI payments app", "requirements": ["UPI transfers", "Bill payments"]},
+    "user_stories": CONSTANT_USER_STORIES, "user_story_status": "completed", "user_story_messages": messages(20),
+    "functional_documents": CONSTANT_FUNCTIONAL_DOCUMENT, "functional_status": "completed", "functional_messages": messages(20),
+    "technical_documents": CONSTANT_TECHNICAL_DOCUMENT, "technical_status": "completed", "technical_messages": messages(20),
+    "frontend_code": CONSTANT_FRONTEND_CODE, "frontend_status": "completed", "frontend_messages": messages(20),
+    "backend_code": CONSTANT_BACKEND_CODE, "backend_status": "completed", "backend_messages": messages(20),
+    "security_reviews": CONSTANT_SECURITY_REVIEW, "security_reviews_status": "completed", "security_reviews_messages": messages(20),
+    "test_cases": CONSTANT_TEST_CASES, "test_cases_status": "completed", "test_cases_messages": messages(20),
+    "qa_testing": CONSTANT_QA_TESTING_RESULTS, "qa_testing_status": "passed", "qa_testing_messages": messages(20),
+    "deployment_steps": CONSTANT_DEPLOYMENT_STEPS, "deployment_status": "completed", "deployment_messages": messages(20),
+}
+
+CODE_RESPONSE = CodeResponse.model_construct(
+    session_id="session", code_type="frontend", status="completed",
+    code=CONSTANT_FRONTEND_CODE, messages=messages(20)
+)
+
+def report(name, stdlib, fast):
+    stdlib_time = timeit.timeit(stdlib, number=ITERATIONS) / ITERATIONS * 1e6
+    fast_time = timeit.timeit(fast, number=ITERATIONS) / ITERATIONS * 1e6
+    print(f"{name:<28} stdlib {stdlib_time:9.1f} us   fast {fast_time:9.1f} us   {stdlib_time / fast_time:5.1f}x")
+
+if __name__ == "__main__":
+    raw_json = json.dumps(SESSION_DATA)
+    raw_orjson = dumps(SESSION_DATA)
+    print(f"session blob: {len(raw_json)} bytes, code response: {len(model_json(CODE_RESPONSE))} bytes")
+    report("session dumps", lambda: json.dumps(SESSION_DATA), lambda: dumps(SESSION_DATA))
+    report("session loads", lambda: json.loads(raw_json), lambda: loads(raw_orjson))
+    report("code response", lambda: json.dumps(jsonable_encoder(CODE_RESPONSE)).encode("utf-8"), lambda: model_json(CODE_RESPONSE))
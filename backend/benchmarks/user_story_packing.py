@@ -0,0 +1,42 @@
+"""
+Compares the prompt tokens sent per project when generating user stories for a batch of
+small projects with one call per project and with packed calls.
+
+Run from the backend directory:
+    python -m benchmarks.user_story_packing
+"""
+from src.sdlccopilot.helpers.user_story import pack_projects, user_story_query, packed_user_story_query, USER_STORY_PACK_SIZE
+from src.sdlccopilot.prompts.prompt_template import json_prompt_template
+from src.sdlccopilot.prompts.user_story import generate_user_stories_system_prompt, packed_user_stories_system_prompt
+from src.sdlccopilot.requests import ProjectRequirementsRequest
+from src.sdlccopilot.utils.artifact import estimate_tokens
+
+PROJECTS = 20
+
+def sample_projects():
+    return [
+        ProjectRequirementsRequest(
+            title=f"Internal tool {index}",
+            description="A small internal web app for a single team.",
+            requirements=["Users can sign in with SSO", "Users can create and list records", "Admins can export records as CSV"]
+        )
+        for index in range(PROJECTS)
+    ]
+
+def prompt_tokens(system_prompt, human_query):
+    return estimate_tokens(json_prompt_template.format(system_prompt=system_prompt, human_query=human_query))
+
+if __name__ == "__main__":
+    projects = sample_projects()
+    individual = sum(
+        prompt_tokens(generate_user_stories_system_prompt, user_story_query(project.title, project.description, project.requirements))
+        for project in projects
+    )
+    packs = pack_projects(projects)
+    packed = sum(
+        prompt_tokens(packed_user_stories_system_prompt, packed_user_story_query({f"P{position + 1}" : projects[index] for position, index in enumerate(pack)}))
+        for pack in packs
+    )
+    print(f"{PROJECTS} small projects, USER_STORY_PACK_SIZE={USER_STORY_PACK_SIZE}")
+    print(f"individual : {PROJECTS} calls, {individual} prompt tokens, {individual / PROJECTS:.0f} tokens/project")
+    print(f"packed     : {len(packs)} calls, {packed} prompt tokens, {packed / PROJECTS:.0f} tokens/project ({packed / individual:.1%})")
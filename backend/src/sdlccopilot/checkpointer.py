@@ -0,0 +1,224 @@
+import asyncio
+import os
+import threading
+import time
+import ormsgpack
+from typing import get_args
+from langgraph.checkpoint.memory import MemorySaver
+from starlette.concurrency import run_in_threadpool
+from src.sdlccopilot.states.sdlc import SDLCState
+from src.sdlccopilot.logger import logging
+
+# Idle time after which a session expires, for both the Redis session key and its checkpoints
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "86400"))
+CHECKPOINT_KEEP_LATEST = max(int(os.getenv("CHECKPOINT_KEEP_LATEST", "10")), 1)
+CHECKPOINT_GC_INTERVAL = int(os.getenv("CHECKPOINT_GC_INTERVAL", "300"))
+
+# The status channels of the phases that end with an approval, so a phase added to the state is retained too
+PHASE_STATUS_CHANNELS = tuple(
+    name for name, field in SDLCState.model_fields.items()
+    if name.endswith("_status") and "approved" in get_args(field.annotation)
+)
+
+def _pack(value):
+    return ormsgpack.packb(value)
+
+def _unpack_typed(value):
+    """Msgpack returns the (type, bytes) pairs of the serializer as lists."""
+    return tuple(value) if isinstance(value, list) else value
+
+class RetentionMemorySaver(MemorySaver):
+    """
+    MemorySaver with a retention policy. Per thread it keeps the latest `keep_latest` checkpoints
+    plus the checkpoint where each phase was approved, and drops the writes and channel blobs
+    that only the pruned checkpoints referenced. Threads with no new checkpoint for `ttl`
+    seconds are deleted, matching the expiry of their Redis session key.
+
+    With a Redis client configured, every checkpoint, blob and pending write is also written to
+    a per-thread Redis hash that expires with the session. A thread this process does not hold,
+    for example after a worker restart or a redeploy, is loaded from Redis on first access, so
+    an interrupted run resumes from its last checkpoint. A thread is served by one worker at a
+    time, as the session endpoints already assume.
+    """
+    def __init__(self, keep_latest=CHECKPOINT_KEEP_LATEST, ttl=SESSION_TTL_SECONDS, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_latest = keep_latest
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self.last_write = {}
+        self.dirty_threads = set()
+        self.redis = None
+
+    def configure(self, redis):
+        """Sets the Redis client, which must not decode responses, that checkpoints are persisted to."""
+        self.redis = redis
+
+    def _redis_key(self, thread_id):
+        return f"checkpoints:{thread_id}"
+
+    def _persist(self, thread_id, fields):
+        if self.redis is None or not fields:
+            return
+        try:
+            pipeline = self.redis.pipeline()
+            pipeline.hset(self._redis_key(thread_id), mapping={_pack(field) : _pack(value) for field, value in fields.items()})
+            pipeline.expire(self._redis_key(thread_id), self.ttl)
+            pipeline.execute()
+        except Exception as e:
+            logging.warning(f"Could not persist the checkpoints of thread {thread_id}: {str(e)}")
+
+    def _unpersist(self, thread_id, fields=None):
+        """Deletes `fields` of a persisted thread, or the whole thread."""
+        if self.redis is None:
+            return
+        try:
+            if fields is None:
+                self.redis.delete(self._redis_key(thread_id))
+            elif fields:
+                self.redis.hdel(self._redis_key(thread_id), *(_pack(field) for field in fields))
+        except Exception as e:
+            logging.warning(f"Could not delete the persisted checkpoints of thread {thread_id}: {str(e)}")
+
+    def _load_thread(self, thread_id):
+        """Loads a persisted thread into memory when this process does not hold it."""
+        if self.redis is None or thread_id in self.storage:
+            return
+        try:
+            persisted = self.redis.hgetall(self._redis_key(thread_id))
+        except Exception as e:
+            logging.warning(f"Could not load the persisted checkpoints of thread {thread_id}: {str(e)}")
+            return
+        if not persisted:
+            return
+        for field, value in persisted.items():
+            kind, *key = ormsgpack.unpackb(field)
+            value = ormsgpack.unpackb(value)
+            if kind == "checkpoint":
+                checkpoint_ns, checkpoint_id = key
+                checkpoint, metadata, parent_id = value
+                self.storage[thread_id][checkpoint_ns][checkpoint_id] = (_unpack_typed(checkpoint), _unpack_typed(metadata), parent_id)
+            elif kind == "write":
+                checkpoint_ns, checkpoint_id, task_id, index = key
+                write_task_id, channel, typed, task_path = value
+                self.writes.setdefault((thread_id, checkpoint_ns, checkpoint_id), {})[(task_id, index)] = (write_task_id, channel, _unpack_typed(typed), task_path)
+            elif kind == "blob":
+                checkpoint_ns, channel, version = key
+                self.blobs[(thread_id, checkpoint_ns, channel, version)] = _unpack_typed(value)
+        self.last_write[thread_id] = time.monotonic()
+        logging.info(f"Loaded {len(persisted)} persisted checkpoint entries of thread {thread_id}")
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self.lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            self._load_thread(thread_id)
+            self.last_write[thread_id] = time.monotonic()
+            self.dirty_threads.add(thread_id)
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            fields = {("checkpoint", checkpoint_ns, checkpoint["id"]) : self.storage[thread_id][checkpoint_ns][checkpoint["id"]]}
+            fields.update({
+                ("blob", checkpoint_ns, channel, version) : self.blobs[(thread_id, checkpoint_ns, channel, version)]
+                for channel, version in new_versions.items()
+            })
+            self._persist(thread_id, fields)
+            return saved
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self.lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            checkpoint_id = config["configurable"]["checkpoint_id"]
+            self._load_thread(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+            stored = self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {})
+            self._persist(thread_id, {
+                ("write", checkpoint_ns, checkpoint_id, write_task_id, index) : write
+                for (write_task_id, index), write in stored.items() if write_task_id == task_id
+            })
+
+    def get_tuple(self, config):
+        with self.lock:
+            self._load_thread(config["configurable"]["thread_id"])
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self.lock:
+            if config:
+                self._load_thread(config["configurable"]["thread_id"])
+            checkpoints = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from checkpoints
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            super().delete_thread(thread_id)
+            self.last_write.pop(thread_id, None)
+            self.dirty_threads.discard(thread_id)
+            self._unpersist(thread_id)
+
+    def _approved_phases(self, thread_id, checkpoint_ns, checkpoint):
+        approved = set()
+        for channel in PHASE_STATUS_CHANNELS:
+            version = checkpoint["channel_versions"].get(channel)
+            blob = self.blobs.get((thread_id, checkpoint_ns, channel, version))
+            if blob and blob[0] != "empty" and self.serde.loads_typed(blob) == "approved":
+                approved.add(channel)
+        return approved
+
+    def prune_thread(self, thread_id):
+        """Applies the retention policy to one thread and returns the number of checkpoints dropped."""
+        dropped = 0
+        with self.lock:
+            deleted = []
+            for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+                if len(checkpoints) <= self.keep_latest:
+                    continue
+                # Checkpoint ids are time-ordered
+                ordered = sorted(checkpoints)
+                keep = set(ordered[-self.keep_latest:])
+                approved_so_far = set()
+                for checkpoint_id in ordered:
+                    checkpoint = self.serde.loads_typed(checkpoints[checkpoint_id][0])
+                    newly_approved = self._approved_phases(thread_id, checkpoint_ns, checkpoint) - approved_so_far
+                    if newly_approved:
+                        keep.add(checkpoint_id)
+                        approved_so_far |= newly_approved
+
+                for checkpoint_id in ordered:
+                    if checkpoint_id not in keep:
+                        del checkpoints[checkpoint_id]
+                        writes = self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None) or {}
+                        deleted.append(("checkpoint", checkpoint_ns, checkpoint_id))
+                        deleted += [("write", checkpoint_ns, checkpoint_id, task_id, index) for task_id, index in writes]
+                        dropped += 1
+
+                referenced = set()
+                for saved in checkpoints.values():
+                    referenced.update(self.serde.loads_typed(saved[0])["channel_versions"].items())
+                for key in [key for key in self.blobs if key[0] == thread_id and key[1] == checkpoint_ns]:
+                    if (key[2], key[3]) not in referenced:
+                        del self.blobs[key]
+                        deleted.append(("blob", checkpoint_ns, key[2], key[3]))
+            self._unpersist(thread_id, deleted)
+        return dropped
+
+    def collect_garbage(self):
+        """Deletes expired threads and prunes the threads written to since the last run."""
+        with self.lock:
+            now = time.monotonic()
+            expired = [thread_id for thread_id, written in self.last_write.items() if now - written > self.ttl]
+            dirty, self.dirty_threads = self.dirty_threads, set()
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        dropped = sum(self.prune_thread(thread_id) for thread_id in dirty if thread_id not in expired)
+        if expired or dropped:
+            logging.info(f"Checkpoint GC expired {len(expired)} sessions and dropped {dropped} checkpoints")
+        return len(expired), dropped
+
+async def run_checkpoint_gc(checkpointer, interval=CHECKPOINT_GC_INTERVAL):
+    """Background task that runs `collect_garbage` every `interval` seconds off the event loop."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(checkpointer.collect_garbage)
+        except Exception as e:
+            logging.error(f"Checkpoint GC failed: {str(e)}")
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _accepted_encodings(headers):
+    accept_encoding = ''
+    for key, value in headers:
+        if key == b"accept-encoding":
+            accept_encoding = value.decode("latin-1").lower()
+    accepted = set()
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        qualities = [part[2:] for part in parts[1:] if part.startswith("q=")]
+        try:
+            quality = float(qualities[0]) if qualities else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            accepted.add(parts[0])
+    return accepted
+
+def merge_vary(headers, field=b"Accept-Encoding"):
+    """
+    Returns `headers` with `field` added to their Vary value. The existing Vary fields, such as
+    the Origin set by the CORS middleware, are kept, and several Vary headers are joined into one.
+    """
+    fields = []
+    for key, value in headers:
+        if key.lower() == b"vary":
+            fields += [item.strip() for item in value.split(b",") if item.strip()]
+    if b"*" not in fields and field.lower() not in {item.lower() for item in fields}:
+        fields.append(field)
+    return [(key, value) for key, value in headers if key.lower() != b"vary"] + [(b"vary", b", ".join(fields))]
+
+def negotiate_encoding(headers):
+    """
+    Picks the response encoding from the request's Accept-Encoding header, preferring brotli.
+    """
+    accepted = _accepted_encodings(headers)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def encoding_etag(etag, encoding):
+    """
+    Returns the ETag of the `encoding` representation of a response, such as "abc-gzip" for "abc",
+    so caches never serve a compressed body to a client that revalidates the identity one.
+    """
+    if not etag.endswith(b'"'):
+        return etag
+    return etag[:-1] + b"-" + encoding.encode("latin-1") + b'"'
+
+def identity_etag(etag):
+    """Reverses encoding_etag on an If-None-Match entry, also dropping the weak prefix."""
+    etag = etag.strip().removeprefix("W/")
+    for encoding in ("gzip", "br"):
+        if etag.endswith(f'-{encoding}"'):
+            return etag[:-len(encoding) - 2] + '"'
+    return etag
+
+def _with_etag(headers, encoding):
+    return [(key, encoding_etag(value, encoding) if key.lower() == b"etag" else value) for key, value in headers]
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class _StreamCompressor:
+    """Compresses a chunked body and flushes after every chunk, so SSE events are not held back."""
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, chunk):
+        if self.encoding == "br":
+            return self.compressor.process(chunk) + self.compressor.flush()
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+class CompressionCache:
+    """Bounded LRU of compressed bodies keyed by (artifact hash, encoding)."""
+    def __init__(self, max_entries=COMPRESSION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that negotiates brotli or gzip for responses above `minimum_size`.
+    Complete bodies are compressed once per artifact hash (the ETag when the endpoint sets
+    one, otherwise a hash of the body) and served from the cache afterwards. Chunked bodies,
+    such as server-sent events, are compressed as they stream and flushed per chunk.
+    A compressed response, and a 304 revalidating one, carry an encoding-specific ETag.
+    """
+    def __init__(self, app, minimum_size=COMPRESSION_MINIMUM_SIZE, cache_size=COMPRESSION_CACHE_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressionCache(cache_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(scope["headers"])
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream_compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, stream_compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream_compressor is None and start_message is not None:
+                headers = {key.lower(): value for key, value in start_message["headers"]}
+                content_type = headers.get(b"content-type", b"")
+                is_stream = more_body or content_type.startswith(b"text/event-stream")
+                if start_message["status"] == 304:
+                    start_message = {**start_message, "headers": merge_vary(_with_etag(start_message["headers"], encoding))}
+                if b"content-encoding" in headers or (not is_stream and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                response_headers = merge_vary([
+                    (key, value) for key, value in _with_etag(start_message["headers"], encoding)
+                    if key.lower() != b"content-length"
+                ])
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+                if not is_stream:
+                    artifact_hash = headers.get(b"etag") or hashlib.sha256(body).hexdigest().encode("latin-1")
+                    cache_key = (artifact_hash, encoding)
+                    compressed = self.cache.get(cache_key)
+                    if compressed is None:
+                        compressed = compress(body, encoding)
+                        self.cache.set(cache_key, compressed)
+                    response_headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    await send({**start_message, "headers": response_headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    start_message = None
+                    return
+
+                stream_compressor = _StreamCompressor(encoding)
+                await send({**start_message, "headers": response_headers})
+                start_message = None
+
+            if stream_compressor is None:
+                await send(message)
+                return
+            chunk = stream_compressor.compress(body) if body else b""
+            if not more_body:
+                chunk += stream_compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,18 +1,21 @@
 
 from langgraph.graph import StateGraph, START, END
 from src.sdlccopilot.states.sdlc import SDLCState
-from langgraph.checkpoint.memory import MemorySaver
+from src.sdlccopilot.checkpointer import RetentionMemorySaver
 from src.sdlccopilot.nodes.user_story_nodes import UserStoryNodes
 from src.sdlccopilot.nodes.functional_document_nodes import FunctionalDocumentNodes
 from src.sdlccopilot.nodes.technical_document_nodes import TechnicalDocumentNodes
 from src.sdlccopilot.nodes.development_nodes import DevelopmentNodes
 from src.sdlccopilot.nodes.test_cases_nodes import TestCaseNodes
 from src.sdlccopilot.nodes.security_review_nodes import SecurityReviewNodes
+from src.sdlccopilot.nodes.qa_testing_nodes import QATestingNodes
+from src.sdlccopilot.nodes.deployment_nodes import DeploymentNodes
 from IPython.display import Image, display
 from src.sdlccopilot.llms.gemini import GeminiLLM
 from src.sdlccopilot.llms.groq import GroqLLM
 from src.sdlccopilot.llms.anthropic import AnthropicLLM
 from src.sdlccopilot.logger import logging
+from src.sdlccopilot.scheduler import scheduled, PRIORITY_INTERACTIVE, PRIORITY_INITIAL
 
 ## LLMs 
 gemini_llm = GeminiLLM("gemini-2.0-flash").get()
@@ -29,6 +32,8 @@ class SDLCGraphBuilder:
         self.development_node = DevelopmentNodes(anthropic_llm)
         self.security_review_node = SecurityReviewNodes(gemini_llm, anthropic_llm)
         self.test_case_node = TestCaseNodes(gemini_llm)
+        self.qa_testing_node = QATestingNodes(gemini_llm, anthropic_llm)
+        self.deployment_node = DeploymentNodes(gemini_llm)
         
     def build(self):
         """
@@ -38,39 +43,51 @@ class SDLCGraphBuilder:
         
         # User Story
         self.sdlc_graph_builder.add_node("process_project_requirements", self.story_node.process_project_requirements)
-        self.sdlc_graph_builder.add_node("generate_user_stories", self.story_node.generate_user_stories)
+        self.sdlc_graph_builder.add_node("generate_user_stories", scheduled(PRIORITY_INITIAL, self.story_node.generate_user_stories))
         self.sdlc_graph_builder.add_node("review_user_stories", self.story_node.review_user_stories)
-        self.sdlc_graph_builder.add_node("revised_user_stories", self.story_node.revised_user_stories)
+        self.sdlc_graph_builder.add_node("revised_user_stories", scheduled(PRIORITY_INTERACTIVE, self.story_node.revised_user_stories))
         
         ## Functional documents 
-        self.sdlc_graph_builder.add_node("create_functional_documents", self.functional_document_node.create_functional_documents)
+        self.sdlc_graph_builder.add_node("create_functional_documents", scheduled(PRIORITY_INITIAL, self.functional_document_node.create_functional_documents))
         self.sdlc_graph_builder.add_node("review_functional_documents", self.functional_document_node.review_functional_documents)
-        self.sdlc_graph_builder.add_node("revise_functional_documents", self.functional_document_node.revise_functional_documents)
+        self.sdlc_graph_builder.add_node("revise_functional_documents", scheduled(PRIORITY_INTERACTIVE, self.functional_document_node.revise_functional_documents))
 
         ## Technical documents 
-        self.sdlc_graph_builder.add_node("create_technical_documents", self.technical_document_node.create_technical_documents)
+        self.sdlc_graph_builder.add_node("create_technical_documents", scheduled(PRIORITY_INITIAL, self.technical_document_node.create_technical_documents))
         self.sdlc_graph_builder.add_node("review_technical_documents", self.technical_document_node.review_technical_documents)
-        self.sdlc_graph_builder.add_node("revise_technical_documents", self.technical_document_node.revise_technical_documents)
+        self.sdlc_graph_builder.add_node("revise_technical_documents", scheduled(PRIORITY_INTERACTIVE, self.technical_document_node.revise_technical_documents))
         
         ## Frontend Code Development
-        self.sdlc_graph_builder.add_node("generate_frontend_code", self.development_node.generate_frontend_code)
+        self.sdlc_graph_builder.add_node("generate_frontend_code", scheduled(PRIORITY_INITIAL, self.development_node.generate_frontend_code))
         self.sdlc_graph_builder.add_node("review_frontend_code", self.development_node.review_frontend_code)
-        self.sdlc_graph_builder.add_node("fix_frontend_code", self.development_node.fix_frontend_code)
+        self.sdlc_graph_builder.add_node("fix_frontend_code", scheduled(PRIORITY_INTERACTIVE, self.development_node.fix_frontend_code))
         
         ## Backend Code Development
-        self.sdlc_graph_builder.add_node("generate_backend_code", self.development_node.generate_backend_code)
+        self.sdlc_graph_builder.add_node("generate_backend_code", scheduled(PRIORITY_INITIAL, self.development_node.generate_backend_code))
         self.sdlc_graph_builder.add_node("review_backend_code", self.development_node.review_backend_code)
-        self.sdlc_graph_builder.add_node("fix_backend_code", self.development_node.fix_backend_code)
+        self.sdlc_graph_builder.add_node("fix_backend_code", scheduled(PRIORITY_INTERACTIVE, self.development_node.fix_backend_code))
         
         ## Security Review
-        self.sdlc_graph_builder.add_node("generate_security_reviews", self.security_review_node.generate_security_reviews)
+        self.sdlc_graph_builder.add_node("generate_security_reviews", scheduled(PRIORITY_INITIAL, self.security_review_node.generate_security_reviews))
         self.sdlc_graph_builder.add_node("security_review", self.security_review_node.security_review)
-        self.sdlc_graph_builder.add_node("fix_code_after_security_review", self.security_review_node.fix_code_after_security_review)
+        self.sdlc_graph_builder.add_node("fix_code_after_security_review", scheduled(PRIORITY_INTERACTIVE, self.security_review_node.fix_code_after_security_review))
     
         ## Test Cases
-        self.sdlc_graph_builder.add_node("generate_test_cases", self.test_case_node.generate_test_cases)
+        self.sdlc_graph_builder.add_node("prefetch_test_cases", self.test_case_node.prefetch_test_cases)
+        self.sdlc_graph_builder.add_node("generate_test_cases", scheduled(PRIORITY_INITIAL, self.test_case_node.generate_test_cases))
         self.sdlc_graph_builder.add_node("test_cases_review", self.test_case_node.test_cases_review)
-        self.sdlc_graph_builder.add_node("revised_test_cases", self.test_case_node.revised_test_cases)
+        self.sdlc_graph_builder.add_node("revised_test_cases", scheduled(PRIORITY_INTERACTIVE, self.test_case_node.revised_test_cases))
+
+        ## QA testing and deployment
+        self.sdlc_graph_builder.add_node("perform_qa_testing", scheduled(PRIORITY_INITIAL, self.qa_testing_node.perform_qa_testing))
+        self.sdlc_graph_builder.add_node("fix_code_after_qa_testing", scheduled(PRIORITY_INITIAL, self.qa_testing_node.fix_code_after_qa_testing))
+        self.sdlc_graph_builder.add_node("complete_qa_testing", self.qa_testing_node.complete_qa_testing)
+        self.sdlc_graph_builder.add_node("security_review_qa_fixes", scheduled(PRIORITY_INITIAL, self.qa_testing_node.security_review_qa_fixes))
+        self.sdlc_graph_builder.add_node("review_qa_fixes", self.qa_testing_node.review_qa_fixes)
+        self.sdlc_graph_builder.add_node("revise_qa_fixes", scheduled(PRIORITY_INTERACTIVE, self.qa_testing_node.revise_qa_fixes))
+        self.sdlc_graph_builder.add_node("release_qa_testing", self.qa_testing_node.release_qa_testing)
+        self.sdlc_graph_builder.add_node("generate_deployment_steps", scheduled(PRIORITY_INITIAL, self.deployment_node.generate_deployment_steps))
+        self.sdlc_graph_builder.add_node("join_release", self.deployment_node.join_release)
         
         ## Adding edges
         ## User Story
@@ -85,8 +102,10 @@ class SDLCGraphBuilder:
         # Functional documents
         self.sdlc_graph_builder.add_edge("create_functional_documents", "review_functional_documents")
         self.sdlc_graph_builder.add_conditional_edges(
-            "review_functional_documents", self.functional_document_node.should_revise_functional_documents, {'approved' : "create_technical_documents", 'feedback' : 'revise_functional_documents'}
+            "review_functional_documents", self.functional_document_node.should_revise_functional_documents, {'approved' : "prefetch_test_cases", 'feedback' : 'revise_functional_documents'}
         )
+        # Test cases need only the functional documents, so they start here and wait for their review gate
+        self.sdlc_graph_builder.add_edge("prefetch_test_cases", "create_technical_documents")
         self.sdlc_graph_builder.add_edge("revise_functional_documents", "review_functional_documents")
         
         # Technical documents
@@ -134,19 +153,53 @@ class SDLCGraphBuilder:
 
         ## test cases
         self.sdlc_graph_builder.add_edge("generate_test_cases", "test_cases_review")
+        # On approval QA testing and deployment steps run as parallel branches, since both need only the code
         self.sdlc_graph_builder.add_conditional_edges(
             "test_cases_review",
-            self.test_case_node.should_fix_test_cases,
-            {
-                "feedback" : "revised_test_cases",
-                "approved" : END
-            }
+            self.test_case_node.next_after_test_cases_review,
+            ["revised_test_cases", "perform_qa_testing", "generate_deployment_steps"]
         )
 
         self.sdlc_graph_builder.add_edge("revised_test_cases", "test_cases_review")
+
+        ## QA testing and deployment
+        # Failed tests are fixed and re-run until they pass or QA_FIX_MAX_ROUNDS runs out
+        self.sdlc_graph_builder.add_conditional_edges(
+            "perform_qa_testing",
+            self.qa_testing_node.next_after_qa_testing,
+            ["fix_code_after_qa_testing", "complete_qa_testing"]
+        )
+        self.sdlc_graph_builder.add_conditional_edges(
+            "fix_code_after_qa_testing",
+            self.qa_testing_node.next_after_qa_testing,
+            ["fix_code_after_qa_testing", "complete_qa_testing"]
+        )
+        # Backend code changed by the fixes is security-reviewed and approved before release
+        self.sdlc_graph_builder.add_conditional_edges(
+            "complete_qa_testing",
+            self.qa_testing_node.next_after_complete_qa_testing,
+            ["security_review_qa_fixes", "release_qa_testing"]
+        )
+        self.sdlc_graph_builder.add_edge("security_review_qa_fixes", "review_qa_fixes")
+        self.sdlc_graph_builder.add_conditional_edges(
+            "review_qa_fixes",
+            self.qa_testing_node.should_revise_qa_fixes,
+            {
+                "feedback" : "revise_qa_fixes",
+                "approved" : "release_qa_testing"
+            }
+        )
+        # Revised code is re-tested, and goes back through the fix loop and security review to the gate
+        self.sdlc_graph_builder.add_conditional_edges(
+            "revise_qa_fixes",
+            self.qa_testing_node.next_after_qa_testing,
+            ["fix_code_after_qa_testing", "complete_qa_testing"]
+        )
+        self.sdlc_graph_builder.add_edge(["release_qa_testing", "generate_deployment_steps"], "join_release")
+        self.sdlc_graph_builder.add_edge("join_release", END)
                 
-        memory = MemorySaver()
-        sdlc_workflow = self.sdlc_graph_builder.compile(checkpointer=memory, interrupt_before=['review_user_stories', 'review_functional_documents', 'review_technical_documents', 'review_frontend_code', 'review_backend_code', 'security_review', 'test_cases_review'])
+        memory = RetentionMemorySaver()
+        sdlc_workflow = self.sdlc_graph_builder.compile(checkpointer=memory, interrupt_before=['review_user_stories', 'review_functional_documents', 'review_technical_documents', 'review_frontend_code', 'review_backend_code', 'security_review', 'test_cases_review', 'review_qa_fixes'])
         logging.info("SDLC workflow built successfully !!!")
         return sdlc_workflow
     
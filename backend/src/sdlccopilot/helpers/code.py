@@ -1,9 +1,43 @@
-from src.sdlccopilot.prompts.prompt_template import prompt_template
-from src.sdlccopilot.prompts.code import CODE_SYSTEM_PROMPT, FRONTEND_PROMPT, BACKEND_PROMPT
+from src.sdlccopilot.prompts.prompt_template import cached_prompt_template, json_prompt_template, json_output_parser
+from src.sdlccopilot.prompts.code import FRONTEND_SYSTEM_PROMPT, FRONTEND_TEMPLATE_SYSTEM_PROMPT, BACKEND_SYSTEM_PROMPT, CODE_MANIFEST_SYSTEM_PROMPT
+from src.sdlccopilot.project_templates import get_template
+from src.sdlccopilot.llms.prompt_cache import cache_static_prefix
+from src.sdlccopilot.llms.continuation import invoke_with_continuation, batch_with_continuation
+from src.sdlccopilot.utils.artifact import parse_bolt_files, render_bolt_artifact
+from src.sdlccopilot.utils.consistency import check_bolt_files
+from src.sdlccopilot.utils.prompt_encoding import encode_user_stories
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.exception import CustomException
+import json
+import os
+import re
 import sys
 
+# Plan a file manifest and interface contract first, then generate the files concurrently against it
+CODE_PLAN_ENABLED = os.getenv("CODE_PLAN_ENABLED", "true").lower() == "true"
+CODE_FILE_MAX_CONCURRENCY = int(os.getenv("CODE_FILE_MAX_CONCURRENCY", "6"))
+CODE_PLAN_MAX_FILES = int(os.getenv("CODE_PLAN_MAX_FILES", "60"))
+
+CODE_BLOCK_PATTERN = re.compile(r"```[\w+-]*\n(.*?)(?:```|$)", re.DOTALL)
+ACTION_OPEN_PATTERN = re.compile(r"<boltAction\b[^>]*>")
+
+def _file_content(response_content, file_path):
+    """
+    Extracts the content of one generated file from a response, with or without its boltAction.
+    An action that was never closed loses its opening tag too, so the file is not nested in the
+    action it is rendered into.
+    """
+    files = parse_bolt_files(response_content)
+    if file_path in files:
+        return files[file_path]
+    if len(files) == 1:
+        return next(iter(files.values()))
+    action_open = ACTION_OPEN_PATTERN.search(response_content)
+    if action_open:
+        return response_content[action_open.end():].split("</boltAction>")[0]
+    match = CODE_BLOCK_PATTERN.search(response_content)
+    return match.group(1) if match else response_content
+
 class CodeHelper:
     def __init__(self, llm):
         self.llm = llm
@@ -13,7 +47,7 @@ class CodeHelper:
             logging.info("Generating frontend code with LLM...")
             
             # Build comprehensive context
-            context_parts = [f"User Stories: {user_stories}"]
+            context_parts = [f"User Stories:\n{encode_user_stories(user_stories)}"]
             
             if functional_document:
                 # Include key sections from functional document
@@ -26,13 +60,15 @@ class CodeHelper:
                 context_parts.append(f"Technical Design (Frontend): {tech_summary}")
             
             context = "\n\n".join(context_parts)
-            user_query = f"Analyze the following project requirements and generate a professional, production-ready frontend React + Vite + TypeScript application:\n\n{context}\n\n{FRONTEND_PROMPT}"
+            user_query = f"Analyze the following project requirements and generate a professional, production-ready frontend React + Vite + TypeScript application:\n\n{context}"
             
-            chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
+            template = get_template("react-vite-ts")
+            chain = cached_prompt_template | cache_static_prefix(self.llm)
+            content = invoke_with_continuation(chain, {"system_prompt" : FRONTEND_TEMPLATE_SYSTEM_PROMPT if template else FRONTEND_SYSTEM_PROMPT, "human_query" : user_query}, "artifact")
+            code = template.merge(content) if template else content
             logging.info("Frontend code generated with LLM.")
-            logging.info(f"In generate_frontend_code_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In generate_frontend_code_from_llm : {code}")
+            return code
         except Exception as e:
             logging.error(f"Error generating frontend code: {str(e)}")
             raise CustomException(e, sys)
@@ -40,8 +76,9 @@ class CodeHelper:
     def revised_frontend_code_from_llm(self, code, user_feedback):
         try:
             logging.info("Revising frontend code with LLM...")
+            template = get_template("react-vite-ts")
             user_query = f"""EXISTING FRONTEND CODE (PRESERVE ALL CODE NOT MENTIONED IN FEEDBACK):
-{code}
+{template.strip(code) if template else code}
 
 USER FEEDBACK (APPLY ONLY THESE CHANGES):
 {user_feedback}
@@ -50,14 +87,13 @@ INSTRUCTIONS:
 - Keep ALL existing files, components, functions, and code that are NOT mentioned in the feedback
 - Only modify the specific parts requested in the user feedback
 - Return the complete codebase with all preserved code and incremental changes applied
-- Maintain code structure, imports, and dependencies unless explicitly changed
-
-{FRONTEND_PROMPT}"""
-            chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
+- Maintain code structure, imports, and dependencies unless explicitly changed"""
+            chain = cached_prompt_template | cache_static_prefix(self.llm)
+            content = invoke_with_continuation(chain, {"system_prompt" : FRONTEND_TEMPLATE_SYSTEM_PROMPT if template else FRONTEND_SYSTEM_PROMPT, "human_query" : user_query}, "artifact")
+            revised_code = template.merge(content) if template else content
             logging.info("Frontend code revised with LLM.")
-            logging.info(f"In revised_frontend_code_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In revised_frontend_code_from_llm : {revised_code}")
+            return revised_code
         except Exception as e:
             logging.error(f"Error revising frontend code: {str(e)}")
             raise CustomException(e, sys)
@@ -67,7 +103,7 @@ INSTRUCTIONS:
             logging.info("Generating backend code with LLM...")
             
             # Build comprehensive context
-            context_parts = [f"User Stories: {user_stories}"]
+            context_parts = [f"User Stories:\n{encode_user_stories(user_stories)}"]
             
             if functional_document:
                 # Include key sections from functional document
@@ -80,17 +116,117 @@ INSTRUCTIONS:
                 context_parts.append(f"Technical Design (Backend): {tech_summary}")
             
             context = "\n\n".join(context_parts)
-            user_query = f"Analyze the following project requirements and generate a professional, production-ready backend application (Node.js/Express or Python/FastAPI):\n\n{context}\n\n{BACKEND_PROMPT}"
+            user_query = f"Analyze the following project requirements and generate a professional, production-ready backend application (Node.js/Express or Python/FastAPI):\n\n{context}"
             
-            chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
+            chain = cached_prompt_template | cache_static_prefix(self.llm)
+            content = invoke_with_continuation(chain, {"system_prompt" : BACKEND_SYSTEM_PROMPT, "human_query" : user_query}, "artifact")
             logging.info("Backend code generated with LLM.")
-            logging.info(f"In generate_backend_code_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In generate_backend_code_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error generating backend code: {str(e)}")
             raise CustomException(e, sys)
     
+    def plan_code_from_llm(self, project_type, context):
+        """Returns the file manifest and interface contract of a project, as planned by CODE_MANIFEST_SYSTEM_PROMPT."""
+        chain = json_prompt_template | self.llm | json_output_parser
+        manifest = chain.invoke({
+            "system_prompt" : CODE_MANIFEST_SYSTEM_PROMPT,
+            "human_query" : f"Plan a professional, production-ready {project_type} for these project requirements:\n\n{context}"
+        })
+        files = manifest.get("files") if isinstance(manifest, dict) else None
+        if not files or not all(isinstance(entry, dict) and entry.get("path") for entry in files):
+            raise ValueError("The code plan has no file manifest")
+        if len(files) > CODE_PLAN_MAX_FILES:
+            raise ValueError(f"The code plan has {len(files)} files, more than CODE_PLAN_MAX_FILES={CODE_PLAN_MAX_FILES}")
+        return manifest
+
+    def _generate_files(self, system_prompt, manifest, context, file_paths, issues=None):
+        """
+        Generates `file_paths` concurrently, each against the shared manifest and contract, and
+        returns {file_path: content}. A file cut off at the output-token limit is continued, and
+        one that is still cut off fails the whole generation like any other failed file.
+        """
+        contract = json.dumps({key : manifest.get(key, []) for key in ("routes", "types", "dependencies")}, indent=1)
+        file_list = "\n".join(
+            f"- {entry['path']}: {entry.get('purpose', '')} (exports: {', '.join(map(str, entry.get('exports', []))) or 'none'})"
+            for entry in manifest["files"]
+        )
+        entries = {entry["path"] : entry for entry in manifest["files"]}
+        inputs = []
+        for file_path in file_paths:
+            fix = ""
+            if issues and issues.get(file_path):
+                fix = "\n\nA previous version of this file failed these consistency checks, fix them:\n" + "\n".join(f"- {issue}" for issue in issues[file_path])
+            inputs.append({
+                "system_prompt" : system_prompt,
+                "human_query" : f"""You are writing one file of a project whose other files are written in parallel against the same plan.
+
+PROJECT REQUIREMENTS:
+{context}
+
+PROJECT FILES:
+{file_list}
+
+INTERFACE CONTRACT (ROUTES, TYPES AND DEPENDENCIES, IMPLEMENT THEM EXACTLY):
+{contract}
+
+FILE TO WRITE:
+{json.dumps(entries[file_path])}{fix}
+
+Return only this file, as a single <boltAction type="file" filePath="{file_path}"> block with its complete content. Import other project files only by the paths and export names listed above."""
+            })
+        chain = cached_prompt_template | cache_static_prefix(self.llm)
+        responses = batch_with_continuation(chain, inputs, "file", CODE_FILE_MAX_CONCURRENCY)
+        failed = [file_path for file_path, response in zip(file_paths, responses) if isinstance(response, Exception)]
+        if failed:
+            raise RuntimeError(f"Generating files {failed} failed: {[str(response) for response in responses if isinstance(response, Exception)][:3]}")
+        return {file_path : _file_content(response, file_path) for file_path, response in zip(file_paths, responses)}
+
+    def _generate_planned_code(self, project_type, system_prompt, context):
+        """
+        Plan-then-fill code generation: a manifest and interface contract, the files generated
+        concurrently against it, a local cross-file consistency check with one round of fixes for
+        the files that fail it, and the assembled boltArtifact.
+        """
+        manifest = self.plan_code_from_llm(project_type, context)
+        file_paths = list(dict.fromkeys(entry["path"] for entry in manifest["files"]))
+        logging.info(f"Planned the {project_type} in {len(file_paths)} files and {len(manifest.get('routes', []))} routes")
+        files = self._generate_files(system_prompt, manifest, context, file_paths)
+
+        issues = {file_path : found for file_path, found in check_bolt_files(files, manifest.get("routes")).items() if file_path in files}
+        if issues:
+            logging.info(f"Regenerating {len(issues)} files that failed the consistency check : {issues}")
+            files.update(self._generate_files(system_prompt, manifest, context, list(issues), issues))
+            remaining = check_bolt_files(files, manifest.get("routes"))
+            if remaining:
+                logging.warning(f"Consistency issues left after the fix round : {remaining}")
+
+        commands = [command for command in manifest.get("commands", []) if isinstance(command, str)]
+        if not commands and "package.json" in files:
+            commands = ["npm install && npm run dev"]
+        artifact = render_bolt_artifact(manifest.get("artifact_id", "project"), manifest.get("title", project_type), files, commands)
+        return f"{manifest.get('summary', '')}\n\n{artifact}".strip()
+
+    def generate_planned_backend_code_from_llm(self, user_stories, functional_document=None, technical_document=None):
+        """Plan-then-fill backend generation, falling back to the single-artifact call when planning or a file fails."""
+        if not CODE_PLAN_ENABLED:
+            return self.generate_backend_code_from_llm(user_stories, functional_document, technical_document)
+        try:
+            logging.info("Generating backend code file by file with LLM...")
+            context_parts = [f"User Stories:\n{encode_user_stories(user_stories)}"]
+            if functional_document:
+                context_parts.append(f"Functional Requirements: {functional_document[:2000]}")
+            if technical_document:
+                context_parts.append(f"Technical Design (Backend): {technical_document[:3000]}")
+            code = self._generate_planned_code("backend application (Node.js/Express or Python/FastAPI)", BACKEND_SYSTEM_PROMPT, "\n\n".join(context_parts))
+            logging.info("Backend code generated with LLM.")
+            logging.info(f"In generate_planned_backend_code_from_llm : {code}")
+            return code
+        except Exception as e:
+            logging.warning(f"File-by-file backend generation failed, generating it as one artifact: {str(e)}")
+            return self.generate_backend_code_from_llm(user_stories, functional_document, technical_document)
+
     def revised_backend_code_from_llm(self, code, user_feedback):
         try:
             logging.info("Revising backend code with LLM...")
@@ -104,14 +240,12 @@ INSTRUCTIONS:
 - Keep ALL existing files, modules, functions, and code that are NOT mentioned in the feedback
 - Only modify the specific parts requested in the user feedback
 - Return the complete codebase with all preserved code and incremental changes applied
-- Maintain code structure, imports, and dependencies unless explicitly changed
-
-{BACKEND_PROMPT}"""
-            chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
+- Maintain code structure, imports, and dependencies unless explicitly changed"""
+            chain = cached_prompt_template | cache_static_prefix(self.llm)
+            content = invoke_with_continuation(chain, {"system_prompt" : BACKEND_SYSTEM_PROMPT, "human_query" : user_query}, "artifact")
             logging.info("Backend code revised with LLM.")
-            logging.info(f"In revised_backend_code_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In revised_backend_code_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error revising backend code: {str(e)}")
             raise CustomException(e, sys)
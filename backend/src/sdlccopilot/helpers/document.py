@@ -1,10 +1,44 @@
-from src.sdlccopilot.prompts.prompt_template import prompt_template
+from src.sdlccopilot.prompts.prompt_template import prompt_template, json_prompt_template, json_output_parser
 from src.sdlccopilot.prompts.document import functional_document_system_prompt, revised_functional_document_system_prompt, technical_document_system_prompt, revised_technical_document_system_prompt
+from src.sdlccopilot.prompts.document import document_outline_system_prompt, FUNCTIONAL_DOCUMENT_SECTIONS, TECHNICAL_DOCUMENT_SECTIONS
+from src.sdlccopilot.llms.continuation import invoke_with_continuation, batch_with_continuation
+from src.sdlccopilot.utils.prompt_encoding import encode_user_stories
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.exception import CustomException
+import os
 import sys
 import re
 
+# Outline the document in one short call, then write its sections concurrently
+DOCUMENT_OUTLINE_ENABLED = os.getenv("DOCUMENT_OUTLINE_ENABLED", "true").lower() == "true"
+DOCUMENT_SECTION_MAX_CONCURRENCY = int(os.getenv("DOCUMENT_SECTION_MAX_CONCURRENCY", "6"))
+DOCUMENT_SECTION_CONTEXT_CHARS = int(os.getenv("DOCUMENT_SECTION_CONTEXT_CHARS", "6000"))
+
+# Major numbered headings such as "**4. SPECIFIC FUNCTIONAL REQUIREMENTS**" or "# 4. Database Design"
+MAJOR_SECTION_PATTERN = re.compile(r"^[ \t]*(?:#{1,3}[ \t]+(?:\*\*)?|\*\*)(\d{1,2})\.[ \t]+[^\n]*$", re.MULTILINE)
+
+def split_major_sections(document):
+    """Splits a document into its major numbered sections, as {number: section text with its heading}."""
+    matches = list(MAJOR_SECTION_PATTERN.finditer(document or ''))
+    sections = {}
+    for position, match in enumerate(matches):
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(document)
+        sections.setdefault(int(match.group(1)), document[match.start():end].strip())
+    return sections
+
+def _truncate(text, max_chars=DOCUMENT_SECTION_CONTEXT_CHARS):
+    return text if len(text) <= max_chars else text[:max_chars] + "... (truncated)"
+
+def _story_context(user_stories, detail):
+    return encode_user_stories(user_stories, max_chars=DOCUMENT_SECTION_CONTEXT_CHARS, titles_only=(detail == "titles"))
+
+def _outline_lines(outline, heading):
+    number = heading.split(".")[0]
+    lines = outline.get(number) or outline.get(heading) or next(
+        (value for key, value in outline.items() if str(key).split(".")[0].strip() == number), []
+    )
+    return lines if isinstance(lines, list) else [str(lines)]
+
 class DocumentHelper:
     def __init__(self, llm):
         self.llm = llm
@@ -177,19 +211,115 @@ class DocumentHelper:
         logging.info(f"Condensed document from {doc_tokens} to {self._estimate_tokens(condensed_doc)} tokens")
         return condensed_doc
 
+    def _generate_outlined_document(self, document_type, system_prompt, sections, heading_format, outline_context, section_contexts):
+        """
+        Outline-then-fill generation. One short call outlines all `sections`, then the sections are
+        written concurrently, each from the shared outline plus its own entry of `section_contexts`,
+        and joined in order. The outline keeps names and identifiers consistent across the writers.
+        Like the single-call document, each section is continued when it is cut off at the
+        output-token limit and checkpointed in the partial outputs as it streams.
+        """
+        headings = "\n".join(f"{heading}: {subsections}" for heading, subsections, _ in sections)
+        outline_chain = json_prompt_template | self.llm | json_output_parser
+        outline = outline_chain.invoke({
+            "system_prompt" : document_outline_system_prompt,
+            "human_query" : f"Document: {document_type}\n\nMajor sections:\n{headings}\n\nProject context:\n{outline_context}"
+        })
+        if not isinstance(outline, dict):
+            raise ValueError(f"Expected a JSON object for the outline, got {type(outline).__name__}")
+        outline_text = "\n".join(
+            heading + "".join(f"\n  - {line}" for line in _outline_lines(outline, heading))
+            for heading, _, _ in sections
+        )
+        logging.info(f"Outlined the {document_type} in {len(sections)} sections")
+
+        inputs = [
+            {
+                "system_prompt" : system_prompt,
+                "human_query" : f"""You are writing one section of the {document_type}. The other sections are written in parallel from the same outline.
+
+DOCUMENT OUTLINE:
+{outline_text}
+
+CONTEXT FOR THIS SECTION:
+{context}
+
+Write only section {heading}, starting with the heading {heading_format.format(heading)}, following its outline and the guidelines for a major section. Do not write any other section, preamble or closing remarks."""
+            }
+            for (heading, _, _), context in zip(sections, section_contexts)
+        ]
+        chain = prompt_template | self.llm
+        responses = batch_with_continuation(chain, inputs, "document", DOCUMENT_SECTION_MAX_CONCURRENCY)
+        failed = [heading for (heading, _, _), response in zip(sections, responses) if isinstance(response, Exception)]
+        if failed:
+            raise RuntimeError(f"Generating sections {failed} of the {document_type} failed")
+
+        parts = []
+        for (heading, _, _), response in zip(sections, responses):
+            content = response.strip()
+            if not MAJOR_SECTION_PATTERN.match(content.split("\n", 1)[0]):
+                content = f"{heading_format.format(heading)}\n\n{content}"
+            parts.append(content)
+        return "\n\n".join(parts)
+
+    def generate_functional_document_in_sections_from_llm(self, user_stories):
+        """Outline-then-fill generation of the functional document, falling back to a single call."""
+        if not DOCUMENT_OUTLINE_ENABLED:
+            return self.generate_functional_document_from_llm(user_stories)
+        try:
+            logging.info("Generating functional document in sections with LLM...")
+            section_contexts = [f"User stories:\n{_story_context(user_stories, detail)}" for _, _, detail in FUNCTIONAL_DOCUMENT_SECTIONS]
+            document = self._generate_outlined_document(
+                "Functional Specification Document", functional_document_system_prompt, FUNCTIONAL_DOCUMENT_SECTIONS,
+                "**{}**", f"User stories:\n{_story_context(user_stories, 'full')}", section_contexts
+            )
+            logging.info("Functional document generated with LLM.")
+            logging.info(f"In generate_functional_document_in_sections_from_llm : {document}")
+            return document
+        except Exception as e:
+            logging.warning(f"Sectioned functional document generation failed, generating it in one call: {str(e)}")
+            return self.generate_functional_document_from_llm(user_stories)
+
+    def generate_technical_document_in_sections_from_llm(self, functional_document, user_stories):
+        """
+        Outline-then-fill generation of the technical document. Each section gets the user story
+        titles and only the functional document sections it builds on. Falls back to a single call.
+        """
+        if not DOCUMENT_OUTLINE_ENABLED:
+            return self.generate_technical_document_from_llm(functional_document, user_stories)
+        try:
+            logging.info("Generating technical document in sections with LLM...")
+            functional_sections = split_major_sections(functional_document)
+            story_titles = _story_context(user_stories, "titles")
+            section_contexts = []
+            for _, _, functional_numbers in TECHNICAL_DOCUMENT_SECTIONS:
+                related = "\n\n".join(functional_sections[number] for number in functional_numbers if number in functional_sections)
+                if not related:
+                    related = (functional_document or '')[:2000]
+                section_contexts.append(f"User stories:\n{story_titles}\n\nRelated functional document sections:\n{_truncate(related)}")
+            functional_headings = "\n".join(section.split("\n", 1)[0] for section in functional_sections.values())
+            document = self._generate_outlined_document(
+                "Technical Design Document", technical_document_system_prompt, TECHNICAL_DOCUMENT_SECTIONS,
+                "# {}", f"User stories:\n{_story_context(user_stories, 'full')}\n\nFunctional document sections:\n{functional_headings}", section_contexts
+            )
+            logging.info("Technical document generated with LLM.")
+            logging.info(f"In generate_technical_document_in_sections_from_llm : {document}")
+            return document
+        except Exception as e:
+            logging.warning(f"Sectioned technical document generation failed, generating it in one call: {str(e)}")
+            return self.generate_technical_document_from_llm(functional_document, user_stories)
+
     def generate_functional_document_from_llm(self, user_stories):
         try:
             logging.info("Generating functional document with LLM...")
-            # Truncate user_stories if too long to avoid token limits
-            user_stories_str = str(user_stories)
-            if len(user_stories_str) > 2000:
-                user_stories_str = user_stories_str[:2000] + "... (truncated for token limits)"
-            user_query = f"Create a functional document for these user stories: {user_stories_str}."
+            # Whole user stories only, within the token budget
+            user_stories_str = encode_user_stories(user_stories, max_chars=2000)
+            user_query = f"Create a functional document for these user stories:\n{user_stories_str}"
             chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : functional_document_system_prompt, "human_query" : user_query})
+            content = invoke_with_continuation(chain, {"system_prompt" : functional_document_system_prompt, "human_query" : user_query}, "document")
             logging.info("Functional document generated with LLM.")
-            logging.info(f"In generate_functional_document_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In generate_functional_document_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error generating functional document: {str(e)}")
             raise CustomException(e, sys)
@@ -212,10 +342,10 @@ CRITICAL INSTRUCTIONS:
 - If adding a completely new section, add it at the end of the document
 - Return the complete document with the exact same structure, order, and numbering, with only the requested changes applied"""
             chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : revised_functional_document_system_prompt, "human_query" : user_query})
+            content = invoke_with_continuation(chain, {"system_prompt" : revised_functional_document_system_prompt, "human_query" : user_query}, "document")
             logging.info("Functional document revised with LLM.")
-            logging.info(f"In revised_functional_document_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In revised_functional_document_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error revising functional document: {str(e)}")
             raise CustomException(e, sys)
@@ -237,20 +367,17 @@ CRITICAL INSTRUCTIONS:
                     fr_text = fr_match.group(1)[:500]  # First 500 chars
                     func_summary += f"Key functional requirements: {fr_text}..."
             
-            # Truncate user_stories if too long
-            user_stories_str = str(user_stories)
-            if len(user_stories_str) > 1500:
-                user_stories_str = user_stories_str[:1500] + "... (truncated)"
+            user_stories_str = encode_user_stories(user_stories, max_chars=1500)
             
-            user_query = f"Create a comprehensive Technical Design Document based on these user stories: {user_stories_str}. "
+            user_query = f"Create a comprehensive Technical Design Document based on these user stories:\n{user_stories_str}\n"
             if func_summary:
                 user_query += f"Reference this functional document summary: {func_summary}"
             
             chain = prompt_template | self.llm 
-            response = chain.invoke({"system_prompt" : technical_document_system_prompt, "human_query" : user_query})
+            content = invoke_with_continuation(chain, {"system_prompt" : technical_document_system_prompt, "human_query" : user_query}, "document")
             logging.info("Technical document generated with LLM.")
-            logging.info(f"In generate_technical_document_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In generate_technical_document_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error generating technical document: {str(e)}")
             raise CustomException(e, sys)
@@ -299,10 +426,10 @@ CRITICAL INSTRUCTIONS:
 - Return the complete document with the exact same structure, order, and numbering, with only the requested changes applied
 - IMPORTANT: If the document above appears condensed, you must still return the FULL original document structure with all sections, applying only the changes requested in the feedback"""
             chain = prompt_template | self.llm
-            response = chain.invoke({"system_prompt" : revised_technical_document_system_prompt, "human_query" : user_query})
+            content = invoke_with_continuation(chain, {"system_prompt" : revised_technical_document_system_prompt, "human_query" : user_query}, "document")
             logging.info("Technical document revised with LLM.")
-            logging.info(f"In revised_technical_document_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In revised_technical_document_from_llm : {content}")
+            return content
         except Exception as e:
             error_str = str(e)
             # Check if it's a token limit error
@@ -327,9 +454,9 @@ CRITICAL INSTRUCTIONS:
 - MAINTAIN THE EXACT SAME SECTION ORDER and numbering as in the original document above
 - Return the complete document with the exact same structure, order, and numbering, with only the requested changes applied"""
                     retry_chain = prompt_template | self.llm
-                    response = retry_chain.invoke({"system_prompt" : revised_technical_document_system_prompt, "human_query" : user_query})
+                    content = invoke_with_continuation(retry_chain, {"system_prompt" : revised_technical_document_system_prompt, "human_query" : user_query}, "document")
                     logging.info("Technical document revised with LLM after retry.")
-                    return response.content
+                    return content
                 except Exception as retry_error:
                     logging.error(f"Retry also failed: {str(retry_error)}")
                     raise CustomException(f"Document too large for LLM processing. Original error: {error_str}", sys)
@@ -1,12 +1,62 @@
-from src.sdlccopilot.prompts.prompt_template import json_prompt_template
 from src.sdlccopilot.prompts.qa_testing import qa_testing_system_prompt
-from src.sdlccopilot.prompts.prompt_template import json_output_parser
+from src.sdlccopilot.llms.structured_output import generate_with_schema
+from src.sdlccopilot.states.qa import QATesting
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.exception import CustomException
 from src.sdlccopilot.prompts.code import CODE_SYSTEM_PROMPT
-from src.sdlccopilot.prompts.prompt_template import prompt_template
+from src.sdlccopilot.prompts.prompt_template import cached_prompt_template
+from src.sdlccopilot.llms.prompt_cache import cache_static_prefix
+from src.sdlccopilot.llms.continuation import invoke_with_continuation
+from src.sdlccopilot.utils.artifact import parse_bolt_files, render_bolt_files
+from src.sdlccopilot.utils.endpoints import implicated_files
+from src.sdlccopilot.utils.prompt_encoding import encode_test_cases, encode_test_results
+from pydantic import BaseModel
+import json
 import sys
 
+def is_failed(test_result):
+    status = test_result.status if isinstance(test_result, BaseModel) else test_result.get("status", "")
+    return str(status).lower().startswith("fail")
+
+def summarize_test_results(test_results):
+    """Computes the summary statistics of a list of test results."""
+    failed = sum(1 for result in test_results if is_failed(result))
+    return {
+        "total_tests" : len(test_results),
+        "passed" : len(test_results) - failed,
+        "failed" : failed,
+        "pass_percentage" : round((len(test_results) - failed) * 100 / len(test_results), 2) if test_results else 0.0
+    }
+
+def merge_test_results(qa_testing, test_results):
+    """
+    Replaces the results of `qa_testing` that were re-run with their new `test_results`, matched by
+    test_id, and recomputes the summary over the merged results.
+    """
+    qa_testing = qa_testing.model_dump() if isinstance(qa_testing, BaseModel) else dict(qa_testing)
+    rerun = {
+        result["test_id"] : result
+        for result in (result.model_dump() if isinstance(result, BaseModel) else dict(result) for result in test_results)
+    }
+    merged = [rerun.pop(result["test_id"], result) for result in qa_testing["test_results"]] + list(rerun.values())
+    return {"summary" : summarize_test_results(merged), "test_results" : merged}
+
+def affected_test_cases(files, changed_files, test_cases, test_results):
+    """
+    Returns the test cases to re-run after `changed_files` were revised: the ones that failed, and
+    the ones whose endpoints are implemented by a changed file. When no test's endpoints lead to a
+    changed file, there is no telling which tests the change affects, so every test case is returned.
+    """
+    failed_ids = {result["test_id"] for result in test_results if is_failed(result)}
+    affected = [
+        test_case for test_case in test_cases
+        if set(implicated_files(files, [json.dumps(test_case)])) & set(changed_files)
+    ]
+    if not affected:
+        return list(test_cases)
+    affected_ids = {test_case["test_id"] for test_case in affected}
+    return [test_case for test_case in test_cases if test_case["test_id"] in affected_ids | failed_ids]
+
 class QATestingHelper:
     def __init__(self, gemini_llm, anthropic_llm):
         self.gemini_llm = gemini_llm
@@ -15,9 +65,10 @@ class QATestingHelper:
     def perform_qa_testing_with_llm(self, test_cases, backend_code):
         try:
             logging.info("Performing qa testing with LLM...")
-            user_query =  f"Perform qa testing for the test cases {test_cases} for the this backend code: {backend_code}"
-            chain = json_prompt_template | self.gemini_llm | json_output_parser
-            response = chain.invoke({"system_prompt" : qa_testing_system_prompt, "human_query" : user_query})
+            user_query =  f"Perform qa testing for these test cases:\n{encode_test_cases(test_cases)}\n\nfor this backend code: {backend_code}"
+            response = generate_with_schema(self.gemini_llm, QATesting, "test_results", qa_testing_system_prompt, user_query)
+            # The summary is recomputed from the results, which may have been salvaged from a partial response
+            response["summary"] = summarize_test_results(response["test_results"])
             logging.info("QA testing performed with LLM.")
             logging.info(f"In perform_qa_testing_with_llm : {response}")
             return response
@@ -25,15 +76,27 @@ class QATestingHelper:
             logging.error(f"Error performing qa testing: {str(e)}")
             raise CustomException(e, sys)
 
-    def revised_backend_code_with_qa_testing_from_llm(self, code, test_cases, user_feedback):
+    def revised_backend_files_with_qa_testing_from_llm(self, files, failed_test_results):
+        """
+        Sends only the files implicated by the failed tests, with those tests' results, and returns
+        the {file_path: content} map of the files the model revised.
+        """
         try:
-            logging.info("Revising backend code according to qa testing with LLM...")
-            user_query =  f"Analyze this backend code: {code} and fix these test cases {test_cases} according to the user feedback: {user_feedback} and return the revised code" 
-            chain = prompt_template | self.anthropic_llm
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
-            logging.info("Backend code revised according to qa testing with LLM.")
-            logging.info(f"In revised_backend_code_with_qa_testing_from_llm : {response.content}")
-            return response.content
+            logging.info(f"Revising {len(files)} backend files for {len(failed_test_results)} failed tests with LLM...")
+            user_query = f"""BACKEND FILES IMPLICATED BY THE FAILED TESTS:
+{render_bolt_files(files)}
+
+FAILED TEST RESULTS:
+{encode_test_results(failed_test_results)}
+
+INSTRUCTIONS:
+- Fix the code so the failed tests pass, keeping the behavior the tests do not mention unchanged
+- Return only the files you changed, each as a complete boltAction file block with its full content
+- Do not return unchanged files or the rest of the codebase"""
+            chain = cached_prompt_template | cache_static_prefix(self.anthropic_llm)
+            revised_files = parse_bolt_files(invoke_with_continuation(chain, {"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query}, "artifact"))
+            logging.info(f"In revised_backend_files_with_qa_testing_from_llm : revised {list(revised_files)}")
+            return revised_files
         except Exception as e:
             logging.error(f"Error revising backend code according to qa testing: {str(e)}")
             raise CustomException(e, sys)
@@ -1,12 +1,72 @@
-from src.sdlccopilot.prompts.prompt_template import json_prompt_template, prompt_template
+from src.sdlccopilot.prompts.prompt_template import cached_prompt_template
+from src.sdlccopilot.llms.prompt_cache import cache_static_prefix
+from src.sdlccopilot.llms.continuation import invoke_with_continuation
 from src.sdlccopilot.prompts.user_story import generate_user_stories_system_prompt, revised_user_stories_system_prompt
-from src.sdlccopilot.prompts.prompt_template import json_output_parser
 from src.sdlccopilot.prompts.security_review import security_reviews_system_prompt
 from src.sdlccopilot.prompts.code import CODE_SYSTEM_PROMPT
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.exception import CustomException
+from src.sdlccopilot.utils.artifact import parse_bolt_files, render_bolt_files, shard_bolt_files, hash_bolt_files, normalize_file_path
+from src.sdlccopilot.utils.concurrency import run_coroutine
+from src.sdlccopilot.llms.structured_output import generate_with_schema, SecurityReviews
+from src.sdlccopilot.utils.static_analysis import static_security_analysis
+from src.sdlccopilot.utils.prompt_encoding import encode_security_reviews
+from pydantic import BaseModel
+import asyncio
+import os
+import re
 import sys
 
+SECURITY_REVIEW_SHARD_TOKENS = int(os.getenv("SECURITY_REVIEW_SHARD_TOKENS", "6000"))
+SECURITY_REVIEW_MAX_CONCURRENCY = int(os.getenv("SECURITY_REVIEW_MAX_CONCURRENCY", "4"))
+# Extra attempts for the shards whose review call failed, before the whole review fails
+SECURITY_REVIEW_SHARD_RETRIES = int(os.getenv("SECURITY_REVIEW_SHARD_RETRIES", "1"))
+# Word overlap (Jaccard) of two reviews of the same file above which they are the same finding
+SECURITY_REVIEW_DUPLICATE_SIMILARITY = float(os.getenv("SECURITY_REVIEW_DUPLICATE_SIMILARITY", "0.8"))
+PRIORITY_ORDER = {"low": 0, "medium": 1, "high": 2}
+
+def _as_review_list(response):
+    """Normalizes a parsed LLM response into a list of security review dicts."""
+    if isinstance(response, dict):
+        if "sec_id" in response:
+            return [response]
+        lists = [value for value in response.values() if isinstance(value, list)]
+        return lists[0] if lists else []
+    return list(response or [])
+
+def _review_words(review):
+    return set(re.findall(r"\w+", str(review.get("review", "")).lower()))
+
+def merge_security_reviews(review_lists, similarity=SECURITY_REVIEW_DUPLICATE_SIMILARITY):
+    """
+    Merges security reviews from several passes. A review of the same file whose text shares at
+    least `similarity` of its words with an earlier review is the same finding: it is dropped and
+    the earlier review keeps the higher of the two priorities. The sec_ids are renumbered from
+    SR-001 so they stay unique and ordered.
+    """
+    merged, merged_words = [], []
+    for reviews in review_lists:
+        for review in reviews:
+            review = review.model_dump() if isinstance(review, BaseModel) else dict(review)
+            words = _review_words(review)
+            duplicate = next(
+                (
+                    index for index, other in enumerate(merged)
+                    if other.get("file_path") == review.get("file_path")
+                    and (words | merged_words[index]) and len(words & merged_words[index]) / len(words | merged_words[index]) >= similarity
+                ),
+                None
+            )
+            if duplicate is None:
+                merged.append(review)
+                merged_words.append(words)
+                continue
+            if PRIORITY_ORDER.get(review.get("priority"), 0) > PRIORITY_ORDER.get(merged[duplicate].get("priority"), 0):
+                merged[duplicate]["priority"] = review["priority"]
+    for index, review in enumerate(merged, start=1):
+        review["sec_id"] = f"SR-{index:03d}"
+    return merged
+
 class SecurityReviewHelper:
     def __init__(self, gemini_llm, anthropic_llm):
         self.gemini_llm = gemini_llm
@@ -16,8 +76,7 @@ class SecurityReviewHelper:
         try:
             logging.info("Generating security reviews with LLM...")
             user_query =  f"Analyze this backend code: {backend_code} and create the security reviews for the code" 
-            chain = json_prompt_template | self.gemini_llm  | json_output_parser
-            response = chain.invoke({"system_prompt" : security_reviews_system_prompt, "human_query" : user_query})
+            response = generate_with_schema(self.gemini_llm, SecurityReviews, "security_reviews", security_reviews_system_prompt, user_query)["security_reviews"]
             logging.info(f"In generate_security_reviews_from_llm : {response}")
             logging.info("Security reviews generated with LLM.")
             return response
@@ -25,6 +84,103 @@ class SecurityReviewHelper:
             logging.error(f"Error generating security reviews: {str(e)}")
             raise CustomException(e, sys)
 
+    def generate_sharded_security_reviews_from_llm(self, backend_code, max_shard_tokens=SECURITY_REVIEW_SHARD_TOKENS, max_concurrency=SECURITY_REVIEW_MAX_CONCURRENCY, retries=SECURITY_REVIEW_SHARD_RETRIES):
+        """
+        Reviews the backend code shard by shard, with up to `max_concurrency` shards in flight,
+        so the wall time follows the largest shard instead of the whole codebase. Each shard goes
+        through the same structured-output path as a single review, so its findings are validated
+        against SecurityReviews before they are merged. Failed shards
+        are retried up to `retries` times; if any still fails the review fails, instead of
+        reporting partial coverage as a complete review.
+        """
+        files = parse_bolt_files(backend_code)
+        shards = shard_bolt_files(files, max_shard_tokens)
+        if len(shards) <= 1:
+            return self.generate_security_reviews_from_llm(backend_code)
+        try:
+            logging.info(f"Generating security reviews with LLM over {len(shards)} shards...")
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def review_shard(shard):
+                user_query = f"Analyze this backend code: {render_bolt_files(shard)} and create the security reviews for the code"
+                async with semaphore:
+                    return await asyncio.to_thread(generate_with_schema, self.gemini_llm, SecurityReviews, "security_reviews", security_reviews_system_prompt, user_query)
+
+            async def review_shards(indices):
+                return await asyncio.gather(*(review_shard(shards[index]) for index in indices), return_exceptions=True)
+
+            responses = {}
+            pending = list(range(len(shards)))
+            for attempt in range(retries + 1):
+                if attempt:
+                    logging.warning(f"Retrying the security review of {len(pending)} failed shards (attempt {attempt})")
+                results = run_coroutine(review_shards(pending))
+                failed = []
+                for index, response in zip(pending, results):
+                    if isinstance(response, Exception):
+                        logging.error(f"Error generating security reviews for shard {index}: {str(response)}")
+                        failed.append(index)
+                    else:
+                        responses[index] = response["security_reviews"]
+                pending = failed
+                if not pending:
+                    break
+            if pending:
+                unreviewed = list(dict.fromkeys(file_path for index in pending for file_path in shards[index]))
+                raise RuntimeError(f"Security review failed for {len(pending)} of {len(shards)} shards, covering {unreviewed}")
+            security_reviews = merge_security_reviews([responses[index] for index in range(len(shards))])
+            logging.info(f"In generate_sharded_security_reviews_from_llm : {security_reviews}")
+            logging.info("Security reviews generated with LLM.")
+            return security_reviews
+        except Exception as e:
+            logging.error(f"Error generating security reviews: {str(e)}")
+            raise CustomException(e, sys)
+
+    def generate_security_reviews_with_static_analysis(self, backend_code):
+        """
+        Runs the local rule engine first. Files with definite findings keep them; every other file,
+        and every file the rules could not analyze, is still reviewed by the LLM.
+        """
+        files = parse_bolt_files(backend_code)
+        if not files:
+            return self.generate_security_reviews_from_llm(backend_code)
+        static_reviews, review_files = static_security_analysis(files)
+        logging.info(f"Static analysis found {len(static_reviews)} security issues, {len(review_files)} of {len(files)} files need an LLM review")
+        llm_reviews = []
+        if review_files:
+            llm_reviews = _as_review_list(self.generate_sharded_security_reviews_from_llm(render_bolt_files(review_files)))
+        return merge_security_reviews([static_reviews, llm_reviews])
+
+    def generate_incremental_security_reviews(self, backend_code, previous_reviews, previous_hashes):
+        """
+        Re-reviews only the files whose content hash changed since the last pass and carries
+        the other findings forward, including those whose path matches no current file. Paths
+        are compared normalized, since the model does not always write a path the same way.
+        Returns the merged reviews and the new hashes.
+        The hashes are only returned once every changed file was reviewed: a review that fails
+        for any file raises, so no file is ever recorded as reviewed without its findings.
+        """
+        files = parse_bolt_files(backend_code)
+        current_hashes = hash_bolt_files(files)
+        previous_hashes = {normalize_file_path(file_path): file_hash for file_path, file_hash in previous_hashes.items()}
+        unchanged = {file_path for file_path, file_hash in current_hashes.items() if previous_hashes.get(normalize_file_path(file_path)) == file_hash}
+        changed_files = {file_path: content for file_path, content in files.items() if file_path not in unchanged}
+        if not files or not unchanged:
+            security_reviews = self.generate_security_reviews_with_static_analysis(backend_code)
+            return security_reviews, current_hashes
+        logging.info(f"Re-reviewing {len(changed_files)} changed files, carrying forward findings for {len(unchanged)} unchanged files")
+        # Only the findings of the re-reviewed files are replaced
+        changed_paths = {normalize_file_path(file_path) for file_path in changed_files}
+        carried_reviews = [
+            review for review in previous_reviews
+            if normalize_file_path(review.file_path if isinstance(review, BaseModel) else review.get("file_path")) not in changed_paths
+        ]
+        new_reviews = []
+        if changed_files:
+            new_reviews = self.generate_security_reviews_with_static_analysis(render_bolt_files(changed_files))
+        reviewed_hashes = {file_path: current_hashes[file_path] for file_path in unchanged | set(changed_files)}
+        return merge_security_reviews([carried_reviews, new_reviews]), reviewed_hashes
+
     def revised_backend_code_with_security_reviews_from_llm(self, code, reviews, user_feedback):
         try:
             logging.info("Revising backend code according to security reviews with LLM...")
@@ -32,7 +188,7 @@ class SecurityReviewHelper:
 {code}
 
 SECURITY REVIEWS TO ADDRESS:
-{reviews}
+{encode_security_reviews(reviews)}
 
 USER FEEDBACK (APPLY ONLY THESE CHANGES):
 {user_feedback}
@@ -42,11 +198,11 @@ INSTRUCTIONS:
 - Fix the security issues identified in the reviews
 - Only modify the specific parts requested in the user feedback
 - Return the complete codebase with all preserved code and security fixes applied"""
-            chain = prompt_template | self.anthropic_llm
-            response = chain.invoke({"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query})
+            chain = cached_prompt_template | cache_static_prefix(self.anthropic_llm)
+            content = invoke_with_continuation(chain, {"system_prompt" : CODE_SYSTEM_PROMPT, "human_query" : user_query}, "artifact")
             logging.info("Backend code revised according to security reviews with LLM.")
-            logging.info(f"In revised_backend_code_with_security_reviews_from_llm : {response.content}")
-            return response.content
+            logging.info(f"In revised_backend_code_with_security_reviews_from_llm : {content}")
+            return content
         except Exception as e:
             logging.error(f"Error revising backend code according to security reviews: {str(e)}")
             raise CustomException(e, sys)
\ No newline at end of file
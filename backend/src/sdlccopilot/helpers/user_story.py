@@ -1,10 +1,91 @@
 from src.sdlccopilot.prompts.prompt_template import json_prompt_template
-from src.sdlccopilot.prompts.user_story import generate_user_stories_system_prompt, revised_user_stories_system_prompt
+from src.sdlccopilot.prompts.user_story import generate_user_stories_system_prompt, packed_user_stories_system_prompt, revised_user_stories_system_prompt
 from src.sdlccopilot.prompts.prompt_template import json_output_parser
+from src.sdlccopilot.utils.artifact import estimate_tokens
+from src.sdlccopilot.llms.structured_output import generate_with_schema, normalize_salvaged, UserStories
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.exception import CustomException
+from pydantic import BaseModel
+from src.sdlccopilot.utils.concurrency import run_coroutine
+from src.sdlccopilot.utils.prompt_encoding import encode_user_stories
+import asyncio
+import os
+import re
 import sys
 
+USER_STORY_BATCH_MAX_CONCURRENCY = int(os.getenv("USER_STORY_BATCH_MAX_CONCURRENCY", "4"))
+# Projects whose query is at most this many tokens are packed together into one LLM call
+USER_STORY_PACK_MAX_PROJECT_TOKENS = int(os.getenv("USER_STORY_PACK_MAX_PROJECT_TOKENS", "300"))
+USER_STORY_PACK_SIZE = int(os.getenv("USER_STORY_PACK_SIZE", "5"))
+# Projects with more requirements than this are generated one requirement group at a time
+USER_STORY_SHARD_SIZE = int(os.getenv("USER_STORY_SHARD_SIZE", "5"))
+USER_STORY_SHARD_MAX_CONCURRENCY = int(os.getenv("USER_STORY_SHARD_MAX_CONCURRENCY", "4"))
+# Times a failed requirement group is generated again before the project is generated in one call
+USER_STORY_SHARD_RETRIES = int(os.getenv("USER_STORY_SHARD_RETRIES", "1"))
+# Word overlap (Jaccard) of title and description above which two stories are the same story
+USER_STORY_DUPLICATE_SIMILARITY = float(os.getenv("USER_STORY_DUPLICATE_SIMILARITY", "0.8"))
+
+def user_story_query(project_title, project_description, requirements):
+    return f"Create a user stories for the this project title: {project_title} and description: {project_description} and requirements: {requirements}"
+
+def packed_user_story_query(projects):
+    return "\n\n".join(
+        f"{key}: title: {project.title}\ndescription: {project.description}\nrequirements: {project.requirements}"
+        for key, project in projects.items()
+    )
+
+def pack_projects(projects, max_project_tokens=USER_STORY_PACK_MAX_PROJECT_TOKENS, pack_size=USER_STORY_PACK_SIZE):
+    """
+    Splits project indices into packs of up to `pack_size` small projects. Projects with a
+    larger query go into packs of their own and keep the single-project prompt.
+    """
+    packs, current = [], []
+    for index, project in enumerate(projects):
+        if pack_size < 2 or estimate_tokens(user_story_query(project.title, project.description, project.requirements)) > max_project_tokens:
+            packs.append([index])
+            continue
+        current.append(index)
+        if len(current) == pack_size:
+            packs.append(current)
+            current = []
+    if current:
+        packs.append(current)
+    return packs
+
+def shard_requirements(requirements, shard_size=USER_STORY_SHARD_SIZE):
+    """Splits the requirements into groups of `shard_size`, keeping their order."""
+    shard_size = max(shard_size, 1)
+    return [requirements[start:start + shard_size] for start in range(0, len(requirements), shard_size)]
+
+def _story_words(story):
+    return set(re.findall(r"\w+", f"{story.get('title', '')} {story.get('description', '')}".lower()))
+
+def merge_user_stories(story_lists, similarity=USER_STORY_DUPLICATE_SIMILARITY):
+    """
+    Merges the user stories generated for several requirement groups. A story whose title and
+    description share at least `similarity` of their words with an earlier story is dropped and
+    its new acceptance criteria are added to the earlier story. The story_ids are renumbered
+    from US-001 in shard order.
+    """
+    merged, merged_words = [], []
+    for stories in story_lists:
+        for story in stories:
+            story = story.model_dump() if isinstance(story, BaseModel) else dict(story)
+            words = _story_words(story)
+            duplicate = next(
+                (index for index, other in enumerate(merged_words) if words and len(words & other) / len(words | other) >= similarity),
+                None
+            )
+            if duplicate is None:
+                merged.append(story)
+                merged_words.append(words)
+                continue
+            criteria = merged[duplicate].setdefault("acceptance_criteria", [])
+            criteria.extend(criterion for criterion in story.get("acceptance_criteria", []) if criterion not in criteria)
+    for index, story in enumerate(merged, start=1):
+        story["story_id"] = f"US-{index:03d}"
+    return merged
+
 class UserStoryHelper:
     def __init__(self, llm):
         self.llm = llm
@@ -12,9 +93,8 @@ class UserStoryHelper:
     def generate_user_stories_with_llm(self, project_title, project_description, requirements):
         try:
             logging.info("Generating user stories with LLM...")
-            user_query =  f"Create a user stories for the this project title: {project_title} and description: {project_description} and requirements: {requirements}"
-            chain = json_prompt_template | self.llm | json_output_parser
-            response = chain.invoke({"system_prompt" : generate_user_stories_system_prompt, "human_query" : user_query})
+            user_query = user_story_query(project_title, project_description, requirements)
+            response = generate_with_schema(self.llm, UserStories, "user_stories", generate_user_stories_system_prompt, user_query)["user_stories"]
             logging.info("User stories generated with LLM.")
             logging.info(f"In generate_user_stories_with_llm : {response}")
             return response
@@ -22,11 +102,122 @@ class UserStoryHelper:
             logging.error(f"Error generating user stories: {str(e)}")
             raise CustomException(e, sys)
 
+    def generate_sharded_user_stories_with_llm(self, project_title, project_description, requirements, shard_size=USER_STORY_SHARD_SIZE, max_concurrency=USER_STORY_SHARD_MAX_CONCURRENCY, retries=USER_STORY_SHARD_RETRIES):
+        """
+        Generates the user stories of each group of `shard_size` requirements in its own LLM call,
+        with up to `max_concurrency` calls in flight, and merges them locally. Each call stays well
+        under the output-token limit and the wall time follows the slowest group.
+        A failed group is generated again up to `retries` times; when a group still fails, the
+        project is generated unsharded so that no requirement is left without user stories.
+        """
+        shards = shard_requirements(requirements, shard_size)
+        if len(shards) <= 1:
+            return self.generate_user_stories_with_llm(project_title, project_description, requirements)
+        try:
+            logging.info(f"Generating user stories with LLM over {len(shards)} requirement groups...")
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def generate_shard(shard):
+                user_query = user_story_query(project_title, project_description, shard) + \
+                    ". These requirements are one group of the project's requirements, create user stories only for them."
+                async with semaphore:
+                    return await asyncio.to_thread(generate_with_schema, self.llm, UserStories, "user_stories", generate_user_stories_system_prompt, user_query)
+
+            async def generate_shards(indices):
+                return await asyncio.gather(*(generate_shard(shards[index]) for index in indices), return_exceptions=True)
+
+            story_lists, pending = {}, list(range(len(shards)))
+            for attempt in range(retries + 1):
+                if attempt:
+                    logging.info(f"Retrying user story generation for requirement groups {pending}, attempt {attempt} of {retries}")
+                failed = []
+                for index, response in zip(pending, run_coroutine(generate_shards(pending))):
+                    if isinstance(response, Exception):
+                        logging.error(f"Error generating user stories for requirement group {index}: {str(response)}")
+                        failed.append(index)
+                    else:
+                        story_lists[index] = response["user_stories"]
+                pending = failed
+                if not pending:
+                    break
+            if pending:
+                logging.warning(f"User story generation failed for requirement groups {pending}, generating the project in one call")
+                return self.generate_user_stories_with_llm(project_title, project_description, requirements)
+            user_stories = merge_user_stories([story_lists[index] for index in range(len(shards))])
+            logging.info(f"In generate_sharded_user_stories_with_llm : {user_stories}")
+            logging.info("User stories generated with LLM.")
+            return user_stories
+        except Exception as e:
+            logging.error(f"Error generating user stories: {str(e)}")
+            raise CustomException(e, sys)
+
+    async def generate_user_stories_batch_with_llm(self, projects, max_concurrency=USER_STORY_BATCH_MAX_CONCURRENCY):
+        """
+        Generates user stories for many projects with at most `max_concurrency` LLM calls in flight.
+        Small projects are packed into one call per USER_STORY_PACK_SIZE projects, which sends the
+        system prompt and format instructions once per pack instead of once per project.
+        Every project's stories are validated against UserStories: single projects use structured
+        output, and each project of a pack is normalized, with invalid stories dropped.
+        Yields (index, user_stories) as each project completes; a failed project yields its exception
+        in place of the stories so the rest of the batch carries on.
+        """
+        packs = pack_projects(projects)
+        logging.info(f"Generating user stories with LLM for {len(projects)} projects in {len(packs)} calls...")
+        semaphore = asyncio.Semaphore(max_concurrency)
+        chain = json_prompt_template | self.llm | json_output_parser
+
+        async def generate_one(index):
+            project = projects[index]
+            try:
+                user_query = user_story_query(project.title, project.description, project.requirements)
+                async with semaphore:
+                    response = await asyncio.to_thread(generate_with_schema, self.llm, UserStories, "user_stories", generate_user_stories_system_prompt, user_query)
+                logging.info(f"User stories generated with LLM for project {index}.")
+                return [(index, response["user_stories"])]
+            except Exception as e:
+                logging.error(f"Error generating user stories for project {index}: {str(e)}")
+                return [(index, e)]
+
+        async def generate_pack(pack):
+            if len(pack) == 1:
+                return await generate_one(pack[0])
+            keyed_projects = {f"P{position + 1}" : projects[index] for position, index in enumerate(pack)}
+            results, unresolved = [], list(pack)
+            try:
+                async with semaphore:
+                    response = await chain.ainvoke({
+                        "system_prompt" : packed_user_stories_system_prompt,
+                        "human_query" : packed_user_story_query(keyed_projects)
+                    })
+                if not isinstance(response, dict):
+                    raise ValueError(f"Expected a JSON object keyed by project, got {type(response).__name__}")
+                unresolved = []
+                for position, index in enumerate(pack):
+                    user_stories = response.get(f"P{position + 1}")
+                    if isinstance(user_stories, list):
+                        user_stories = normalize_salvaged(UserStories, "user_stories", user_stories)["user_stories"]
+                    if isinstance(user_stories, list) and user_stories:
+                        results.append((index, user_stories))
+                    else:
+                        unresolved.append(index)
+                logging.info(f"User stories generated with LLM for {len(pack) - len(unresolved)} of {len(pack)} packed projects.")
+            except Exception as e:
+                logging.error(f"Error generating packed user stories for projects {pack}: {str(e)}")
+            if unresolved:
+                logging.info(f"Falling back to individual calls for projects {unresolved}")
+                for fallback in await asyncio.gather(*(generate_one(index) for index in unresolved)):
+                    results.extend(fallback)
+            return results
+
+        for completed in asyncio.as_completed([generate_pack(pack) for pack in packs]):
+            for index, response in await completed:
+                yield index, response
+
     def revised_user_stories_with_llm(self, user_stories, user_feedback):
         try:
             logging.info("Revising user stories with LLM...")
             user_query = f"""EXISTING USER STORIES (PRESERVE THESE UNLESS MODIFIED IN FEEDBACK):
-{user_stories}
+{encode_user_stories(user_stories)}
 
 USER FEEDBACK (APPLY ONLY THESE CHANGES):
 {user_feedback}
@@ -35,8 +226,7 @@ INSTRUCTIONS:
 - Keep ALL existing user stories that are NOT mentioned in the feedback
 - Only modify, add, or remove stories as specifically requested in the feedback
 - Return the complete updated list with all preserved and modified stories"""
-            chain = json_prompt_template | self.llm | json_output_parser
-            response = chain.invoke({"system_prompt" : revised_user_stories_system_prompt, "human_query" : user_query})
+            response = generate_with_schema(self.llm, UserStories, "user_stories", revised_user_stories_system_prompt, user_query)["user_stories"]
             logging.info("User stories revised with LLM.")
             logging.info(f"In revised_user_stories_with_llm : {response}")
             return response
@@ -1,6 +1,7 @@
 
 from langchain_anthropic import ChatAnthropic
 from dotenv import load_dotenv
+from src.sdlccopilot.scheduler import scheduled_chat_model
 import os
 
 load_dotenv()
@@ -12,7 +13,7 @@ class AnthropicLLM:
         pass
 
     def get(self):
-        return ChatAnthropic(
+        return scheduled_chat_model(ChatAnthropic)(
             model= self.model_name,
             temperature=0,
             max_tokens=8000,
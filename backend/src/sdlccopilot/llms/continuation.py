@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import os
+import re
+from langgraph.config import get_config
+from src.sdlccopilot.utils.artifact import BOLT_FILE_ACTION_PATTERN, parse_bolt_files
+from src.sdlccopilot.utils.concurrency import run_coroutine
+from src.sdlccopilot.logger import logging
+
+# Continuation calls allowed per generation when the output is cut off at the output-token limit
+LLM_MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "3"))
+# Characters of the cut-off output repeated in the continuation prompt so the model can pick up the thread
+CONTINUATION_TAIL_CHARS = int(os.getenv("CONTINUATION_TAIL_CHARS", "1500"))
+# Expiry of the partial output of a generation that was interrupted and never resumed
+PARTIAL_OUTPUT_TTL = int(os.getenv("PARTIAL_OUTPUT_TTL", "3600"))
+
+# stop_reason of Anthropic, finish_reason of OpenAI-compatible providers and of Gemini
+TRUNCATED_FINISH_REASONS = {"max_tokens", "length", "MAX_TOKENS"}
+ARTIFACT_OPEN_PATTERN = re.compile(r"<boltArtifact\b[^>]*>")
+DOCUMENT_HEADING_PATTERN = re.compile(r"^[ \t]*(?:#{1,3}[ \t]+\S|\*\*\d{1,2}\.[ \t])[^\n]*$", re.MULTILINE)
+
+def _text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+def finish_reason(message):
+    metadata = getattr(message, "response_metadata", None) or {}
+    return metadata.get("stop_reason") or metadata.get("finish_reason")
+
+def is_truncated(content, reason, kind):
+    """An output is cut off when the provider says it stopped at the token limit, or when a boltArtifact was left open."""
+    if str(reason) in TRUNCATED_FINISH_REASONS:
+        return True
+    return kind == "artifact" and "<boltArtifact" in content and "</boltArtifact>" not in content
+
+def _artifact_resume(content):
+    """Keeps the artifact up to its last complete file action and asks for the files after it."""
+    closed = [match.end() for match in re.finditer(r"</boltAction>", content)]
+    if closed:
+        kept = content[:closed[-1]]
+    else:
+        artifact_open = ARTIFACT_OPEN_PATTERN.search(content)
+        kept = content[:artifact_open.end()] if artifact_open else ''
+    written = list(parse_bolt_files(kept))
+    instruction = f"""Continue the artifact with the remaining files and shell commands, then close it with </boltArtifact>.
+These files are complete, do not write them again: {", ".join(written) or "none"}.
+Start directly with the next <boltAction>, without any text or <boltArtifact> tag before it."""
+
+    def stitch(continuation):
+        start = continuation.find("<boltAction")
+        if start == -1:
+            return kept + ("\n</boltArtifact>" if "</boltArtifact>" in continuation else continuation)
+        # A file the model wrote again keeps its first, complete version
+        rest = BOLT_FILE_ACTION_PATTERN.sub(
+            lambda match: "" if match.group(1).strip() in written else match.group(0), continuation[start:]
+        )
+        return f"{kept}\n{rest}"
+
+    return kept, instruction, stitch
+
+def _document_resume(content, complete=False):
+    """
+    Keeps the document up to the start of its last, possibly unfinished, section and asks for that
+    section onwards. A `complete` document, such as a saved partial output, is kept whole and the
+    sections after its last one are asked for.
+    """
+    headings = list(DOCUMENT_HEADING_PATTERN.finditer(content))
+    if complete and headings:
+        heading = headings[-1].group(0).strip()
+        instruction = f"""Continue the document with the sections after {heading}, which is complete.
+Do not repeat the earlier sections. Start directly with the heading of the next section."""
+
+        def stitch(continuation):
+            start = DOCUMENT_HEADING_PATTERN.search(continuation)
+            return f"{content.rstrip()}\n\n{continuation[start.start():] if start else continuation.lstrip()}"
+
+        return content, instruction, stitch
+    if len(headings) < 2:
+        return content, "Continue exactly where the response stopped, without repeating anything before it.", lambda continuation: content + continuation
+    heading = headings[-1].group(0).strip()
+    kept = content[:headings[-1].start()].rstrip()
+    instruction = f"""Continue the document from the section {heading}: write that section in full and every section after it.
+Do not repeat the earlier sections. Start directly with the heading {heading}."""
+
+    def stitch(continuation):
+        start = continuation.find(heading)
+        return f"{kept}\n\n{continuation[start:] if start != -1 else continuation.lstrip()}"
+
+    return kept, instruction, stitch
+
+def _file_resume(content):
+    """Keeps a single file cut off mid-way as it is and asks for the rest of it."""
+    instruction = """Continue the file exactly where the response stopped, without repeating anything before it.
+Do not start a new <boltAction>; close the file with </boltAction> once it is complete."""
+    return content, instruction, lambda continuation: content + continuation
+
+def _close_artifact(content):
+    """Drops a half-written file action at the end and closes the artifact."""
+    kept, _, _ = _artifact_resume(content)
+    return f"{kept}\n</boltArtifact>" if kept else content
+
+def _completed_prefix(content, kind):
+    """The part of a partial output that ends with its last complete file or section."""
+    if kind == "artifact":
+        return _artifact_resume(content)[0] if "</boltAction>" in content else ''
+    headings = list(DOCUMENT_HEADING_PATTERN.finditer(content))
+    return content[:headings[-1].start()].rstrip() if len(headings) > 1 else ''
+
+def _thread_id():
+    """The thread_id of the graph run the call is made from, or None outside a graph run."""
+    try:
+        return get_config().get("configurable", {}).get("thread_id")
+    except RuntimeError:
+        return None
+
+class PartialOutputs:
+    """
+    The completed part of each generation in progress, saved in Redis as files or sections arrive.
+    A generation is identified by the graph thread it runs in and a hash of its prompt, and its
+    entry is removed once it completes. When a node is interrupted mid-generation, by a provider
+    error or timeout, or by a worker crash or redeploy, and the graph runs it again for the same
+    thread, it continues from the saved part instead of starting over. The graph checkpoints are
+    persisted in Redis as well (see RetentionMemorySaver), so the thread survives the restart.
+    Calls made outside a graph run, or without a configured Redis client, save nothing.
+    """
+    def __init__(self, ttl=PARTIAL_OUTPUT_TTL):
+        self.ttl = ttl
+        self.redis = None
+
+    def configure(self, redis):
+        self.redis = redis
+
+    def key(self, kind, inputs):
+        thread_id = _thread_id()
+        if thread_id is None:
+            return None
+        prompt = f"{inputs.get('system_prompt', '')}\n{inputs.get('human_query', '')}"
+        return f"partial:{thread_id}:{kind}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+
+    def load(self, key):
+        if self.redis is None or key is None:
+            return None
+        try:
+            return self.redis.get(key)
+        except Exception as e:
+            logging.warning(f"Could not load the partial output {key}: {str(e)}")
+            return None
+
+    def save(self, key, content):
+        if self.redis is None or key is None:
+            return
+        try:
+            self.redis.set(key, content, ex=self.ttl)
+        except Exception as e:
+            logging.warning(f"Could not save the partial output {key}: {str(e)}")
+
+    def clear(self, key):
+        if self.redis is None or key is None:
+            return
+        try:
+            self.redis.delete(key)
+        except Exception as e:
+            logging.warning(f"Could not clear the partial output {key}: {str(e)}")
+
+partial_outputs = PartialOutputs()
+
+def _stream_with_checkpoints(chain, inputs, kind, key, stitch):
+    """
+    Streams one call and returns (stitched content, finish reason). Each time a file or section
+    completes, the completed part of the stitched output is saved to `partial_outputs`. Only the
+    text after the last scanned offset is searched for the end of a file or the heading of a
+    section, so the output is scanned once and stitched once per completed file or section.
+    """
+    response, text, saved, scanned = None, '', '', 0
+    for chunk in chain.stream(inputs):
+        response = chunk if response is None else response + chunk
+        text += _text(chunk)
+        boundary = None
+        if kind == "artifact":
+            end = text.rfind("</boltAction>", scanned)
+            if end != -1:
+                boundary = end + len("</boltAction>")
+            # A closing tag can be split across chunks
+            scanned = max(scanned, len(text) - len("</boltAction>") + 1)
+        elif kind == "document":
+            # Only complete lines can hold a complete heading
+            line_start = text.rfind("\n") + 1
+            headings = list(DOCUMENT_HEADING_PATTERN.finditer(text, scanned, line_start))
+            if headings:
+                boundary = headings[-1].end()
+            scanned = max(scanned, line_start)
+        if boundary is not None:
+            completed = _completed_prefix(stitch(text[:boundary]), kind)
+            if len(completed) > len(saved):
+                partial_outputs.save(key, completed)
+                saved = completed
+    return stitch(text), finish_reason(response) if response is not None else None
+
+def invoke_with_continuation(chain, inputs, kind, max_continuations=LLM_MAX_CONTINUATIONS):
+    """
+    Invokes `chain` (a prompt with system_prompt and human_query, and a chat model) and returns the
+    text of the response. When the output was cut off at the token limit it is cut back to its last
+    complete file ("artifact") or section ("document"), and continuation calls ask for the rest, up
+    to `max_continuations` times. The pieces are stitched together here. A single "file" is kept as
+    it is and continued from where it stopped; one still cut off after the last continuation
+    raises, as it cannot be closed like an artifact.
+
+    The output is streamed and its completed part checkpointed in `partial_outputs`, so a node
+    that is run again on the same graph thread after failing mid-generation resumes from that
+    part with a continuation call.
+    """
+    key = partial_outputs.key(kind, inputs)
+    content, reason = partial_outputs.load(key), None
+    resumed = bool(content)
+    if resumed:
+        logging.info(f"Resuming the {kind} generation from {len(content)} saved characters")
+    else:
+        content, reason = _stream_with_checkpoints(chain, inputs, kind, key, lambda text: text)
+    continuations = 0
+    while resumed or is_truncated(content, reason, kind):
+        if continuations >= max_continuations:
+            logging.warning(f"The {kind} output is still cut off after {continuations} continuations")
+            if kind == "file":
+                raise RuntimeError(f"The file output is still cut off after {continuations} continuations")
+            if kind == "artifact" and "</boltArtifact>" not in content:
+                content = _close_artifact(content)
+            break
+        continuations += 1
+        if kind == "artifact":
+            kept, instruction, stitch = _artifact_resume(content)
+        elif kind == "file":
+            kept, instruction, stitch = _file_resume(content)
+        else:
+            kept, instruction, stitch = _document_resume(content, complete=resumed)
+        logging.info(f"The {kind} output was {'interrupted' if resumed else f'cut off ({reason})'}, continuation {continuations} of {max_continuations}")
+        resumed = False
+        content, reason = _stream_with_checkpoints(chain, {
+            **inputs,
+            "human_query" : f"""{inputs["human_query"]}
+
+YOUR PREVIOUS RESPONSE TO THIS REQUEST WAS {"INTERRUPTED" if reason is None else "CUT OFF AT THE OUTPUT LIMIT"}. It ended with:
+...{kept[-CONTINUATION_TAIL_CHARS:]}
+
+{instruction}"""
+        }, kind, key, stitch)
+    partial_outputs.clear(key)
+    return content
+
+def batch_with_continuation(chain, inputs_list, kind, max_concurrency):
+    """
+    Runs `invoke_with_continuation` for each of `inputs_list` with up to `max_concurrency` calls
+    in flight and returns their contents in order, with the exception in place of a failed call.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def invoke_one(inputs):
+        async with semaphore:
+            return await asyncio.to_thread(invoke_with_continuation, chain, inputs, kind)
+
+    async def invoke_all():
+        return await asyncio.gather(*(invoke_one(inputs) for inputs in inputs_list), return_exceptions=True)
+
+    return run_coroutine(invoke_all())
@@ -1,6 +1,7 @@
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from src.sdlccopilot.scheduler import scheduled_chat_model
 import os
 
 load_dotenv()
@@ -28,7 +29,7 @@ class GeminiLLM:
             del os.environ['GOOGLE_APPLICATION_CREDENTIALS']
         
         # Use api_key parameter explicitly to force API key authentication
-        return ChatGoogleGenerativeAI(
+        return scheduled_chat_model(ChatGoogleGenerativeAI)(
             model=self.model_name,
             temperature=0,
             max_tokens=None,
@@ -1,5 +1,6 @@
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from src.sdlccopilot.scheduler import scheduled_chat_model
 import os
 load_dotenv()   
 
@@ -10,4 +11,4 @@ class GroqLLM:
         self.model_name = model_name
 
     def get(self):
-        return ChatGroq(model=self.model_name, api_key=api_key)
\ No newline at end of file
+        return scheduled_chat_model(ChatGroq)(model=self.model_name, api_key=api_key)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import os
+import time
+from threading import Lock
+from typing import Optional
+from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_google_genai import ChatGoogleGenerativeAI, create_context_cache
+from src.sdlccopilot.logger import logging
+from src.sdlccopilot.utils.artifact import estimate_tokens
+
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+# Gemini rejects context caches below the model's minimum size
+GEMINI_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CACHE_MIN_TOKENS", "1024"))
+# Leave a margin so a cache is never used in the last moments before it expires
+GEMINI_CACHE_EXPIRY_MARGIN = 60
+
+def _model_name(llm):
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+class PromptCacheUsage:
+    """Per-model totals of input tokens and the part of them read from or written to the provider cache."""
+    def __init__(self):
+        self.lock = Lock()
+        self.totals = {}
+
+    def record(self, model, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cache_read = details.get("cache_read", 0) or 0
+        cache_creation = details.get("cache_creation", 0) or 0
+        logging.info(f"Prompt cache usage for {model}: {input_tokens} input tokens, {cache_read} cached, {cache_creation} written to cache")
+        with self.lock:
+            totals = self.totals.setdefault(model, {"calls": 0, "input_tokens": 0, "cache_read": 0, "cache_creation": 0})
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cache_read"] += cache_read
+            totals["cache_creation"] += cache_creation
+
+    def metrics(self):
+        """Renders the totals in the Prometheus text exposition format."""
+        with self.lock:
+            lines = []
+            for name, key in (("sdlc_llm_calls_total", "calls"), ("sdlc_llm_input_tokens_total", "input_tokens"),
+                              ("sdlc_llm_cache_read_tokens_total", "cache_read"), ("sdlc_llm_cache_creation_tokens_total", "cache_creation")):
+                lines.append(f"# TYPE {name} counter")
+                lines += [f'{name}{{model="{model}"}} {totals[key]}' for model, totals in self.totals.items()]
+            return "\n".join(lines) + "\n"
+
+prompt_cache_usage = PromptCacheUsage()
+
+class GeminiContextCaches:
+    """
+    Gemini context caches of static system prompts, keyed by (model, prompt hash) and recreated
+    when they expire. A prompt the API refuses to cache is not retried until the TTL has passed.
+    """
+    def __init__(self, ttl=PROMPT_CACHE_TTL):
+        self.ttl = ttl
+        self.lock = Lock()
+        self.caches = {}
+
+    def get(self, llm, system_prompt):
+        if estimate_tokens(system_prompt) < GEMINI_CACHE_MIN_TOKENS:
+            return None
+        key = (llm.model, hashlib.sha256(system_prompt.encode("utf-8")).hexdigest())
+        with self.lock:
+            cached = self.caches.get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            name = None
+            try:
+                name = create_context_cache(llm, [SystemMessage(content=system_prompt)], ttl=f"{self.ttl}s")
+                logging.info(f"Created Gemini context cache {name} for {llm.model}")
+            except Exception as e:
+                logging.warning(f"Could not create a Gemini context cache for {llm.model}: {str(e)}")
+            self.caches[key] = (name, time.monotonic() + self.ttl - GEMINI_CACHE_EXPIRY_MARGIN)
+            return name
+
+gemini_context_caches = GeminiContextCaches()
+
+def _cacheable_request(llm, messages):
+    """
+    Rewrites the leading system message for the provider's prompt caching and returns the
+    messages with any extra call arguments. Other providers get the messages unchanged; the
+    static prefix still comes first, so automatic prefix caching can apply.
+    """
+    if not messages or messages[0].type != "system" or not isinstance(messages[0].content, str):
+        return messages, {}
+    system_prompt, rest = messages[0].content, messages[1:]
+    if isinstance(llm, ChatAnthropic):
+        system_message = SystemMessage(content=[{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}])
+        return [system_message] + rest, {}
+    if isinstance(llm, ChatGoogleGenerativeAI):
+        # The system instruction lives in the cache and must not be sent again
+        cache_name = gemini_context_caches.get(llm, system_prompt)
+        if cache_name:
+            return rest, {"cached_content": cache_name}
+    return messages, {}
+
+class _CachedChatModel(Runnable):
+    def __init__(self, llm):
+        self.llm = llm
+        self.model = _model_name(llm)
+        self.name = f"cached_{self.model}"
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        messages, call_kwargs = _cacheable_request(self.llm, input.to_messages())
+        response = self.llm.invoke(messages, config, **call_kwargs)
+        prompt_cache_usage.record(self.model, response)
+        return response
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        messages, call_kwargs = await asyncio.to_thread(_cacheable_request, self.llm, input.to_messages())
+        response = await self.llm.ainvoke(messages, config, **call_kwargs)
+        prompt_cache_usage.record(self.model, response)
+        return response
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        messages, call_kwargs = _cacheable_request(self.llm, input.to_messages())
+        response = None
+        for chunk in self.llm.stream(messages, config, **call_kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            prompt_cache_usage.record(self.model, response)
+
+def cache_static_prefix(llm):
+    """
+    Wraps a chat model so the static system message of `cached_prompt_template` is served from
+    the provider's prompt cache: an Anthropic cache_control breakpoint, or a Gemini context cache.
+    The cached-token counts of every call, streamed or not, are recorded in `prompt_cache_usage`.
+    """
+    return _CachedChatModel(llm)
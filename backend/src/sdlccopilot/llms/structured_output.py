@@ -0,0 +1,114 @@
+import json
+import os
+from typing import get_args
+from pydantic import BaseModel, Field, ValidationError
+from typing_extensions import List
+from src.sdlccopilot.prompts.prompt_template import prompt_template, json_prompt_template
+from src.sdlccopilot.states.story import UserStory
+from src.sdlccopilot.states.testcase import TestCase
+from src.sdlccopilot.states.security import SecurityReview
+from src.sdlccopilot.utils.json_stream import parse_json, stream_json_items
+from src.sdlccopilot.logger import logging
+
+STRUCTURED_OUTPUT_ENABLED = os.getenv("STRUCTURED_OUTPUT_ENABLED", "true").lower() == "true"
+STRUCTURED_OUTPUT_MAX_RETRIES = int(os.getenv("STRUCTURED_OUTPUT_MAX_RETRIES", "2"))
+
+# Tool and response schemas need an object at the top level, so the list artifacts are wrapped
+class UserStories(BaseModel):
+    user_stories : List[UserStory] = Field(description="The user stories")
+
+class TestCases(BaseModel):
+    test_cases : List[TestCase] = Field(description="The test cases")
+
+class SecurityReviews(BaseModel):
+    security_reviews : List[SecurityReview] = Field(description="The security reviews")
+
+def _arguments(output):
+    """Returns the raw arguments of a structured-output call, also when they failed validation."""
+    if output["parsed"] is not None:
+        return output["parsed"].model_dump()
+    raw = output["raw"]
+    if raw.tool_calls:
+        return dict(raw.tool_calls[0]["args"])
+    return parse_json(raw.content)
+
+def _validate_items(item_model, items):
+    valid, invalid = {}, {}
+    for index, item in enumerate(items):
+        try:
+            valid[index] = item_model.model_validate(item).model_dump()
+        except ValidationError as e:
+            invalid[index] = (item, e.errors(include_url=False, include_context=False, include_input=False))
+    return valid, invalid
+
+def generate_structured(llm, schema, list_field, system_prompt, human_query, max_retries=STRUCTURED_OUTPUT_MAX_RETRIES):
+    """
+    Generates `schema` with the provider's structured output (tool calling or a response schema)
+    and validates the items of `list_field` one by one. Only the invalid items are sent back to
+    the model, together with their validation errors, for up to `max_retries` rounds; items that
+    are still invalid are dropped. Returns the validated object as a dict.
+    """
+    item_model = get_args(schema.model_fields[list_field].annotation)[0]
+    chain = prompt_template | llm.with_structured_output(schema, include_raw=True)
+    data = _arguments(chain.invoke({"system_prompt" : system_prompt, "human_query" : human_query}))
+    valid, invalid = _validate_items(item_model, data.get(list_field) or [])
+
+    for attempt in range(max_retries):
+        if not invalid:
+            break
+        logging.warning(f"Retrying {len(invalid)} invalid {item_model.__name__} objects (attempt {attempt + 1})")
+        indices = list(invalid)
+        retry_query = f"""These {item_model.__name__} objects failed schema validation:
+{json.dumps([{"object" : item, "errors" : errors} for item, errors in invalid.values()], default=str, indent=2)}
+
+Return only the corrected objects in `{list_field}`, in the same order, fixing the listed errors and keeping everything else unchanged."""
+        fixed = _arguments(chain.invoke({"system_prompt" : system_prompt, "human_query" : retry_query})).get(list_field) or []
+        fixed_valid, fixed_invalid = _validate_items(item_model, fixed[:len(indices)])
+        valid.update({indices[position] : item for position, item in fixed_valid.items()})
+        invalid = {
+            index : fixed_invalid[position] if position in fixed_invalid else invalid[index]
+            for position, index in enumerate(indices) if position not in fixed_valid
+        }
+
+    if invalid:
+        logging.warning(f"Dropping {len(invalid)} {item_model.__name__} objects that are still invalid")
+    data[list_field] = [valid[index] for index in sorted(valid)]
+    return schema.model_validate(data).model_dump()
+
+def normalize_salvaged(schema, list_field, data):
+    """
+    Validates JSON output that was salvaged from a partial or malformed response against `schema`:
+    invalid items of `list_field` are dropped, and when the rest of the object does not validate,
+    missing keys get the field's default, or None for a required field, so callers can always
+    look up every field of the schema.
+    """
+    item_model = get_args(schema.model_fields[list_field].annotation)[0]
+    data = data if isinstance(data, dict) else {list_field : data}
+    valid, invalid = _validate_items(item_model, data.get(list_field) or [])
+    if invalid:
+        logging.warning(f"Dropping {len(invalid)} salvaged {item_model.__name__} objects that are invalid")
+    data = {**data, list_field : [valid[index] for index in sorted(valid)]}
+    try:
+        return schema.model_validate(data).model_dump()
+    except ValidationError as e:
+        logging.warning(f"Salvaged {schema.__name__} output is incomplete, filling in defaults: {str(e)}")
+        normalized = {
+            name : None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in schema.model_fields.items()
+        }
+        normalized[list_field] = data[list_field]
+        return normalized
+
+def generate_with_schema(llm, schema, list_field, system_prompt, human_query):
+    """
+    Structured-output generation with a fallback to streamed JSON output, for providers or
+    models without tool calling and when STRUCTURED_OUTPUT_ENABLED is off.
+    """
+    if STRUCTURED_OUTPUT_ENABLED:
+        try:
+            return generate_structured(llm, schema, list_field, system_prompt, human_query)
+        except Exception as e:
+            logging.warning(f"Structured output failed for {schema.__name__}, falling back to JSON output: {str(e)}")
+    chain = json_prompt_template | llm
+    response = stream_json_items(chain, {"system_prompt" : system_prompt, "human_query" : human_query}, list_field)
+    return normalize_salvaged(schema, list_field, response)
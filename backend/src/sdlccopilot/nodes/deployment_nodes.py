@@ -25,4 +25,9 @@ class DeploymentNodes:
             "deployment_steps" : deployment_steps,
             "deployment_status" : "approved",
             "deployment_messages" : AIMessage(content="Please follow these steps to deploy the code.")
-        }
\ No newline at end of file
+        }
+
+    def join_release(self, state : SDLCState) -> SDLCState:
+        """Joins the QA testing and deployment branches once both have finished."""
+        logging.info(f"In join_release... qa_testing_status : {state.qa_testing_status}, deployment_status : {state.deployment_status}")
+        return {}
@@ -87,7 +87,7 @@ class DevelopmentNodes:
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":
             functional_doc = getattr(state, 'functional_documents', None) or ''
             technical_doc = getattr(state, 'technical_documents', None) or ''
-            backend_code = self.code_helper.generate_backend_code_from_llm(
+            backend_code = self.code_helper.generate_planned_backend_code_from_llm(
                 state.user_stories,
                 functional_document=functional_doc,
                 technical_document=technical_doc
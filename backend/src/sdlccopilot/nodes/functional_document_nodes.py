@@ -16,7 +16,7 @@ class FunctionalDocumentNodes:
         user_stories = state.user_stories
         documents = None
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            documents = self.document_helper.generate_functional_document_from_llm(user_stories)
+            documents = self.document_helper.generate_functional_document_in_sections_from_llm(user_stories)
         else:
             time.sleep(10)
             documents = CONSTANT_FUNCTIONAL_DOCUMENT
@@ -1,131 +1,178 @@
-
 from langchain_core.messages import AIMessage
 from src.sdlccopilot.states.sdlc import SDLCState
 from src.sdlccopilot.logger import logging
-from src.sdlccopilot.helpers.qa_testing import QATestingHelper
+from src.sdlccopilot.helpers.qa_testing import QATestingHelper, affected_test_cases, is_failed, merge_test_results
+from src.sdlccopilot.helpers.security_review import SecurityReviewHelper
+from src.sdlccopilot.utils.artifact import parse_bolt_files, render_bolt_files, replace_bolt_files
+from src.sdlccopilot.utils.endpoints import implicated_files
 from typing_extensions import Literal
-from src.sdlccopilot.utils.constants import CONSTANT_QA_TESTING_RESULTS, CONSTANT_REVISED_BACKEND_CODE
+from src.sdlccopilot.utils.constants import CONSTANT_QA_TESTING_RESULTS
+import json
 import os
-from src.sdlccopilot.logger import logging
 import time
-CONSTANT_TEST_CASES = [
-  {
-    "test_id": "TC001",
-    "description": "Enable MFA with valid userId and mfaType",
-    "steps": [
-      "Send POST request to /api/auth/mfa/enable",
-      "Include JSON body with userId: 'user123' and mfaType: 'mpin'",
-      "Expect response status 200 and message 'MFA enabled successfully'"
-    ],
-    "status": "draft"
-  },
-  {
-    "test_id": "TC002",
-    "description": "Apply for a loan with valid amount and term",
-    "steps": [
-      "Send POST request to /api/loan/apply",
-      "Include JSON body with amount: 50000 and term: 12",
-      "Expect response with loanId, status: 'PENDING', and interest value"
-    ],
-    "status": "draft"
-  },
-  {
-    "test_id": "TC003",
-    "description": "Link a bank account with valid details",
-    "steps": [
-      "Send POST request to /api/bank/link",
-      "Include JSON body with accountNumber: '1234567890' and bankName: 'BankX'",
-      "Expect response status 200 and message 'Bank account linked successfully'"
-    ],
-    "status": "draft"
-  },
-  {
-    "test_id": "TC004",
-    "description": "Pay a bill with valid billId and amount",
-    "steps": [
-      "Send POST request to /api/bill/pay",
-      "Include JSON body with billId: 'bill123' and amount: 1500",
-      "Expect response with transactionId and status: 'SUCCESS'"
-    ],
-    "status": "draft"
-  },
-  {
-    "test_id": "TC005",
-    "description": "Purchase an insurance policy with valid policyId and term",
-    "steps": [
-      "Send POST request to /api/insurance/purchase",
-      "Include JSON body with policyId: 'pol789' and term: 5",
-      "Expect response with policyNumber, status: 'ACTIVE', and coverage amount"
-    ],
-    "status": "draft"
-  }
-]
+
+# Rounds of fixing and re-running the failed tests before QA testing completes with failures
+QA_FIX_MAX_ROUNDS = int(os.getenv("QA_FIX_MAX_ROUNDS", "3"))
+
+def _qa_testing_status(qa_testing):
+    return "passed" if qa_testing['summary']['pass_percentage'] > 50 else "failed"
 
 class QATestingNodes:
     def __init__(self, gemini_llm, anthropic_llm): 
         self.qa_testing_helper = QATestingHelper(gemini_llm, anthropic_llm)
+        self.security_review_helper = SecurityReviewHelper(gemini_llm, anthropic_llm)
         
     def perform_qa_testing(self, state : SDLCState) -> SDLCState:
         logging.info("In perform_qa_testing...")
-        test_cases = CONSTANT_TEST_CASES
-        # TODO : get test cases from the state
-        # test_cases = state.test_cases
+        test_cases = [test_case.model_dump() for test_case in state.test_cases]
         qa_testing = None
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":  
             qa_testing = self.qa_testing_helper.perform_qa_testing_with_llm(test_cases, state.backend_code)
         else:
             time.sleep(10)
             qa_testing = CONSTANT_QA_TESTING_RESULTS
-        
-        if qa_testing['summary']['pass_percentage'] > 50:
-            logging.info("QA testing passed.")
-            return {
-                "qa_testing": qa_testing,
-                "qa_testing_status": "passed",
-                "qa_testing_messages": AIMessage(
-                  content="Great! QA testing have been finalized. You can now proceed with next steps."
-                )
-            }
-        else:
-            logging.info("QA testing failed.")
-            return {
-                "qa_testing": qa_testing,
-                "qa_testing_status": "failed",
-                "qa_testing_messages": AIMessage(
-                  content="QA testing have been failed. I've revised the code according to the QA testing results."
-                )
-            }
+        logging.info(f"QA testing {_qa_testing_status(qa_testing)}.")
+        return {
+            "qa_testing": qa_testing,
+            "qa_testing_status": _qa_testing_status(qa_testing),
+            "qa_fix_count": 0,
+            "qa_fix_changed_code": True
+        }
 
-    def should_fix_code_after_qa_testing(self, state : SDLCState) -> Literal["passed", "failed"]:
-        return "passed" if state.qa_testing_status == 'passed' else 'failed'
+    def next_after_qa_testing(self, state : SDLCState) -> Literal["fix_code_after_qa_testing", "complete_qa_testing"]:
+        has_failures = any(is_failed(test_result) for test_result in state.qa_testing.test_results)
+        # A round that changed no code would be retried on the same input, so the loop ends there
+        if has_failures and state.qa_fix_changed_code and state.qa_fix_count < QA_FIX_MAX_ROUNDS and parse_bolt_files(state.backend_code):
+            return "fix_code_after_qa_testing"
+        return "complete_qa_testing"
 
     def fix_code_after_qa_testing(self, state : SDLCState) -> SDLCState:
+        """
+        Revises only the backend files that implement the endpoints hit by the failed tests, then
+        re-runs only those tests against the revised files and merges their results.
+        """
         logging.info("In fix_code_after_qa_testing...")
-        code_type = "backend"
-        revised_count = state.revised_count + 1
-        logging.info(f"revised_count : {revised_count}")
+        qa_fix_count = state.qa_fix_count + 1
+        failed_results = [test_result.model_dump() for test_result in state.qa_testing.test_results if is_failed(test_result)]
+        failed_ids = {test_result["test_id"] for test_result in failed_results}
+        failed_test_cases = [test_case.model_dump() for test_case in state.test_cases if test_case.test_id in failed_ids]
+        logging.info(f"QA fix round {qa_fix_count} for {len(failed_results)} failed tests")
 
-        if revised_count == 3:
-            return {
-                f"{code_type}_messages": AIMessage(
-                    content="Code have been revision maxed out. Please review the code and continue with the next step."
-                ),
-                f"{code_type}_status": "approved"
-            }
-        
-        failed_test_cases = [test_case for test_case in state.qa_testing if test_case['status'] == "failed"]
-        revised_code = None
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            revised_code = self.qa_testing_helper.revised_backend_code_with_qa_testing_from_llm(state.backend_code, failed_test_cases)
+            files = parse_bolt_files(state.backend_code)
+            texts = [json.dumps(item) for item in failed_test_cases + failed_results]
+            fix_files = implicated_files(files, texts)
+            if not fix_files:
+                logging.warning("No file matched the endpoints of the failed tests, sending all backend files")
+                fix_files = files
+            logging.info(f"Files implicated by the failed tests : {list(fix_files)}")
+            revised_files = self.qa_testing_helper.revised_backend_files_with_qa_testing_from_llm(fix_files, failed_results)
+            backend_code = replace_bolt_files(state.backend_code, revised_files)
+            retest_code = render_bolt_files({**fix_files, **revised_files})
+            test_results = self.qa_testing_helper.perform_qa_testing_with_llm(failed_test_cases or failed_results, retest_code)["test_results"]
         else:
             time.sleep(10)
-            revised_code = CONSTANT_REVISED_BACKEND_CODE
-        logging.info("Fixed code after QA testing completed !!!")
+            backend_code = state.backend_code
+            test_results = []
+
+        qa_testing = merge_test_results(state.qa_testing, test_results)
+        logging.info(f"After QA fix round {qa_fix_count} : {qa_testing['summary']}")
         return {
-            f"{code_type}_code": revised_code,
-            f"{code_type}_messages": AIMessage(
-                content=f"Please review revised {code_type} code and provide additional feedback or type 'Approved' if you're satisfied."
-            ),
-            f"{code_type}_status": "pending_approval",
-            "revised_count": revised_count
-        }
\ No newline at end of file
+            "backend_code": backend_code,
+            "qa_testing": qa_testing,
+            "qa_testing_status": _qa_testing_status(qa_testing),
+            "qa_fix_count": qa_fix_count,
+            "qa_fix_changed_code": backend_code != state.backend_code
+        }
+
+    def complete_qa_testing(self, state : SDLCState) -> SDLCState:
+        logging.info("In complete_qa_testing...")
+        summary = state.qa_testing.summary
+        fixes = f" after {state.qa_fix_count} round{'s' if state.qa_fix_count > 1 else ''} of fixes" if state.qa_fix_count else ""
+        if summary.failed == 0:
+            content = f"Great! All {summary.total_tests} tests passed{fixes}. You can now proceed with next steps."
+        else:
+            content = f"{summary.failed} of {summary.total_tests} tests still fail{fixes}. Please review the QA testing results."
+        return {
+            "qa_testing_status": _qa_testing_status(state.qa_testing.model_dump()),
+            "qa_testing_messages": AIMessage(content=content)
+        }
+
+    def next_after_complete_qa_testing(self, state : SDLCState) -> Literal["security_review_qa_fixes", "release_qa_testing"]:
+        # Code changed by the QA fix loop was never reviewed, so it goes through a review gate before release
+        return "security_review_qa_fixes" if state.qa_fix_count else "release_qa_testing"
+
+    def security_review_qa_fixes(self, state : SDLCState) -> SDLCState:
+        """Re-reviews the security of the backend files the QA fixes changed, ahead of the review gate."""
+        logging.info("In security_review_qa_fixes...")
+        security_reviews = state.security_reviews
+        security_review_hashes = state.security_review_hashes
+        if os.environ.get("PROJECT_ENVIRONMENT") != "development":
+            security_reviews, security_review_hashes = self.security_review_helper.generate_incremental_security_reviews(
+                state.backend_code,
+                state.security_reviews,
+                state.security_review_hashes
+            )
+        else:
+            time.sleep(10)
+        return {
+            "security_reviews": security_reviews,
+            "security_review_hashes": security_review_hashes,
+            "qa_fixes_status": "pending_approval",
+            "qa_testing_messages": AIMessage(
+                content="The QA fixes changed the backend code. Please review the fixed code and its security reviews and provide feedback or type 'Approved' to release it."
+            )
+        }
+
+    def review_qa_fixes(self, state : SDLCState) -> SDLCState:
+        logging.info("In review_qa_fixes...")
+        user_feedback = state.qa_testing_messages[-1].content.lower().strip()
+        logging.info(f"user feedback: {user_feedback}")
+        approved = user_feedback == "approved"
+        return {
+            "qa_fixes_status": "approved" if approved else "feedback",
+            "qa_testing_messages": AIMessage(
+                content="Great! The fixed backend code has been approved for release."
+                if approved else
+                "I've received your feedback. I'll revise the backend code accordingly."),
+        }
+
+    def should_revise_qa_fixes(self, state : SDLCState) -> Literal["feedback", "approved"]:
+        return "approved" if state.qa_fixes_status == 'approved' else 'feedback'
+
+    def revise_qa_fixes(self, state : SDLCState) -> SDLCState:
+        """
+        Revises the backend code with the owner's feedback, then re-runs the failed tests and the
+        tests of the endpoints the revision changed, so the code reaches the review gate again
+        only with test results that describe it.
+        """
+        logging.info("In revise_qa_fixes...")
+        user_feedback = state.qa_testing_messages[-2].content.lower().strip()
+        backend_code = state.backend_code
+        qa_testing = state.qa_testing.model_dump()
+        if os.environ.get("PROJECT_ENVIRONMENT") != "development":
+            backend_code = self.security_review_helper.revised_backend_code_with_security_reviews_from_llm(state.backend_code, state.security_reviews, user_feedback)
+            previous_files, files = parse_bolt_files(state.backend_code), parse_bolt_files(backend_code)
+            changed_files = {file_path: content for file_path, content in files.items() if previous_files.get(file_path) != content}
+            if changed_files:
+                test_cases = [test_case.model_dump() for test_case in state.test_cases]
+                retest_cases = affected_test_cases(files, changed_files, test_cases, qa_testing["test_results"])
+                logging.info(f"Re-running {len(retest_cases)} tests affected by the {len(changed_files)} revised files")
+                retest_files = implicated_files(files, [json.dumps(test_case) for test_case in retest_cases])
+                retest_code = render_bolt_files(retest_files) if retest_files else backend_code
+                test_results = self.qa_testing_helper.perform_qa_testing_with_llm(retest_cases, retest_code)["test_results"]
+                qa_testing = merge_test_results(qa_testing, test_results)
+        else:
+            time.sleep(10)
+        logging.info("Backend code revised according to the QA fixes review !!!")
+        return {
+            "backend_code": backend_code,
+            "qa_testing": qa_testing,
+            "qa_testing_status": _qa_testing_status(qa_testing),
+            "qa_fix_changed_code": backend_code != state.backend_code
+        }
+
+    def release_qa_testing(self, state : SDLCState) -> SDLCState:
+        """Ends the QA testing branch, once its results and any code it changed were reviewed."""
+        logging.info("In release_qa_testing...")
+        return {}
@@ -14,14 +14,20 @@ class SecurityReviewNodes:
     def generate_security_reviews(self, state : SDLCState) -> SDLCState:
         logging.info("In generate_security_reviews...")
         security_reviews = None
+        security_review_hashes = state.security_review_hashes
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            security_reviews = self.security_review_helper.generate_security_reviews_from_llm(state.backend_code)
+            security_reviews, security_review_hashes = self.security_review_helper.generate_incremental_security_reviews(
+                state.backend_code,
+                state.security_reviews,
+                state.security_review_hashes
+            )
         else:
             time.sleep(10)
             security_reviews = CONSTANT_SECURITY_REVIEW
         logging.info("Security reviews generated successfully !!!")
         return {
             "security_reviews": security_reviews,
+            "security_review_hashes": security_review_hashes,
             "security_reviews_status": "pending_approval",
             "security_reviews_messages": AIMessage(
                 content=f"Please review security reviews and provide feedback or type 'Approved' if you're satisfied."
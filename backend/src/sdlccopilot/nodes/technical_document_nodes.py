@@ -16,7 +16,7 @@ class TechnicalDocumentNodes:
         user_stories = state.user_stories
         functional_document = state.functional_documents
         if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            documents = self.document_helper.generate_technical_document_from_llm(functional_document, user_stories)
+            documents = self.document_helper.generate_technical_document_in_sections_from_llm(functional_document, user_stories)
         else:
             time.sleep(10)
             documents = CONSTANT_TECHNICAL_DOCUMENT
@@ -4,22 +4,43 @@ from langchain_core.messages import AIMessage
 from src.sdlccopilot.states.sdlc import SDLCState
 from src.sdlccopilot.logger import logging
 from src.sdlccopilot.helpers.test_case import TestCaseHelper
-from typing_extensions import Literal
+from src.sdlccopilot.prefetch import Prefetcher, fingerprint, DAG_SCHEDULING_ENABLED
+from langgraph.config import get_config
+from typing_extensions import List, Literal
 import os
 from src.sdlccopilot.utils.constants import CONSTANT_TEST_CASES, CONSTANT_REVISED_TEST_CASES
 import time
 class TestCaseNodes:
     def __init__(self, llm): 
         self.test_case_helper = TestCaseHelper(llm)
+        self.test_case_prefetcher = Prefetcher("test_cases")
+
+    def _generate_test_cases(self, functional_documents):
+        if os.environ.get("PROJECT_ENVIRONMENT") != "development":
+            return self.test_case_helper.generate_test_cases_from_llm(functional_documents)
+        time.sleep(10)
+        return CONSTANT_TEST_CASES
+
+    def prefetch_test_cases(self, state : SDLCState) -> SDLCState:
+        """
+        Test cases depend only on the functional documents, so once those are approved they are
+        generated in the background while the later phases run, and held for their review gate.
+        """
+        logging.info("In prefetch_test_cases...")
+        if DAG_SCHEDULING_ENABLED:
+            thread_id = get_config()["configurable"]["thread_id"]
+            functional_documents = state.functional_documents
+            self.test_case_prefetcher.submit(thread_id, fingerprint(functional_documents), lambda: self._generate_test_cases(functional_documents))
+        return {}
 
     def generate_test_cases(self, state : SDLCState) -> SDLCState: 
         logging.info("In generate_test_cases...")  
         test_cases = None
-        if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            test_cases = self.test_case_helper.generate_test_cases_from_llm(state.functional_documents)
-        else:
-            time.sleep(10)
-            test_cases = CONSTANT_TEST_CASES
+        if DAG_SCHEDULING_ENABLED:
+            thread_id = get_config()["configurable"]["thread_id"]
+            test_cases = self.test_case_prefetcher.take(thread_id, fingerprint(state.functional_documents))
+        if test_cases is None:
+            test_cases = self._generate_test_cases(state.functional_documents)
         logging.info("Test cases generated successfully !!!")
         return {
             "test_cases": test_cases,
@@ -45,6 +66,11 @@ class TestCaseNodes:
     def should_fix_test_cases(self, state : SDLCState) -> Literal["feedback", "approved"]:
         return "approved" if state.test_cases_status == 'approved' else 'feedback'
 
+    def next_after_test_cases_review(self, state : SDLCState) -> List[str]:
+        if self.should_fix_test_cases(state) == "approved":
+            return ["perform_qa_testing", "generate_deployment_steps"]
+        return ["revised_test_cases"]
+
     def revised_test_cases(self, state : SDLCState) -> SDLCState:
         logging.info("In revised_test_cases...")
         user_feedback = state.test_cases_messages[-2].content.lower().strip()
@@ -23,8 +23,11 @@ class UserStoryNodes:
         project_description = state.project_requirements.description
         requirements = state.project_requirements.requirements
         user_stories = None
-        if os.environ.get("PROJECT_ENVIRONMENT") != "development":
-            user_stories = self.user_story_helper.generate_user_stories_with_llm(project_title, project_description, requirements);
+        if state.user_stories:
+            # Pre-generated by the batch intake endpoint
+            user_stories = state.user_stories
+        elif os.environ.get("PROJECT_ENVIRONMENT") != "development":
+            user_stories = self.user_story_helper.generate_sharded_user_stories_with_llm(project_title, project_description, requirements)
         else:
             time.sleep(10)
             user_stories = CONSTANT_USER_STORIES
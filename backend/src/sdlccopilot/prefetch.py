@@ -0,0 +1,83 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.sdlccopilot.logger import logging
+from src.sdlccopilot.scheduler import llm_scheduler, scheduling_context, current_tenant, SchedulerOverloaded, PRIORITY_SPECULATIVE
+
+# Starts artifacts whose inputs are final ahead of their position in the graph
+DAG_SCHEDULING_ENABLED = os.getenv("DAG_SCHEDULING_ENABLED", "true").lower() == "true"
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "2"))
+PREFETCH_MAX_AGE = int(os.getenv("PREFETCH_MAX_AGE", "86400"))
+
+def fingerprint(text):
+    return hashlib.sha256((text or '').encode("utf-8")).hexdigest()
+
+class _Prefetch:
+    def __init__(self, input_fingerprint):
+        self.fingerprint = input_fingerprint
+        self.created_at = time.monotonic()
+        self.started = False
+        self.cancelled = False
+        self.future = None
+
+class Prefetcher:
+    """
+    Runs graph work speculatively in the background, at the scheduler's speculative priority,
+    and hands the result to the node that owns it once the graph reaches that node. The result
+    is only used when the node's input still has the fingerprint the work was started with.
+    """
+    def __init__(self, name, max_workers=PREFETCH_MAX_WORKERS, max_age=PREFETCH_MAX_AGE):
+        self.name = name
+        self.max_age = max_age
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"prefetch-{name}")
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def submit(self, key, input_fingerprint, work):
+        try:
+            llm_scheduler.check_admission(PRIORITY_SPECULATIVE)
+        except SchedulerOverloaded:
+            logging.info(f"Skipping {self.name} prefetch for {key}: the LLM queue is busy")
+            return
+        entry = _Prefetch(input_fingerprint)
+        with self.lock:
+            now = time.monotonic()
+            self.entries = {k: v for k, v in self.entries.items() if now - v.created_at <= self.max_age}
+            previous = self.entries.get(key)
+            if previous is not None:
+                previous.cancelled = True
+            self.entries[key] = entry
+        entry.future = self.executor.submit(self._run, key, current_tenant(), entry, work)
+        logging.info(f"Started {self.name} prefetch for {key}")
+
+    def _run(self, key, tenant, entry, work):
+        with self.lock:
+            if entry.cancelled:
+                return None
+            entry.started = True
+        with scheduling_context(PRIORITY_SPECULATIVE, tenant):
+            return work()
+
+    def take(self, key, input_fingerprint):
+        """
+        Returns the prefetched result for `key`, waiting for it if it is being generated, or None
+        when there is none to use. Work no worker has picked up yet is cancelled instead of
+        awaited, so the node does not queue behind other sessions' speculative work.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            if entry.fingerprint != input_fingerprint or not entry.started:
+                entry.cancelled = True
+                logging.info(f"Discarding the {self.name} prefetch for {key}")
+                return None
+        try:
+            result = entry.future.result()
+            logging.info(f"Using the {self.name} prefetch for {key}")
+            return result
+        except Exception as e:
+            logging.warning(f"The {self.name} prefetch for {key} failed: {str(e)}")
+            return None
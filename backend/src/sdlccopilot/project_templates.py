@@ -0,0 +1,99 @@
+import json
+import os
+import re
+from typing import Dict, List
+from src.sdlccopilot.prompts.code import REACT_BASE_PROMPT, REACT_TEMPLATE_STATIC_FILES
+from src.sdlccopilot.utils.artifact import parse_bolt_files, render_bolt_files, render_bolt_artifact
+from src.sdlccopilot.logger import logging
+
+# Serve the static skeleton files from the server instead of having the model regenerate them
+CODE_TEMPLATES_ENABLED = os.getenv("CODE_TEMPLATES_ENABLED", "true").lower() == "true"
+
+ARTIFACT_OPEN_PATTERN = re.compile(r'<boltArtifact\s+id="([^"]*)"\s+title="([^"]*)"\s*>')
+SHELL_ACTION_PATTERN = re.compile(r'<boltAction\s+type="(?:shell|start)"\s*>(.*?)</boltAction>', re.DOTALL)
+DEPENDENCY_KEYS = ("dependencies", "devDependencies", "peerDependencies", "scripts")
+
+def merge_package_json(base, generated):
+    """
+    Merges a generated package.json into the skeleton's: entries the skeleton does not have yet are
+    added to dependencies, devDependencies, peerDependencies and scripts, and the skeleton's own
+    entries and other fields are kept. A generated package.json that is not a JSON object leaves the
+    skeleton as is.
+    """
+    merged = json.loads(base)
+    try:
+        additions = json.loads(generated)
+    except json.JSONDecodeError as e:
+        logging.warning(f"Ignoring the generated package.json, it is not valid JSON: {str(e)}")
+        return base
+    if not isinstance(additions, dict):
+        logging.warning(f"Ignoring the generated package.json, it is a JSON {type(additions).__name__} instead of an object")
+        return base
+    for key in DEPENDENCY_KEYS:
+        if isinstance(additions.get(key), dict):
+            merged[key] = {**additions[key], **merged.get(key, {})}
+    return json.dumps(merged, indent=2) + "\n"
+
+class ProjectTemplate:
+    """
+    A project skeleton kept on the server. `static_files` are always served from the skeleton, the
+    other skeleton files are starters the model may replace, and package.json is merged.
+    """
+    def __init__(self, name, files: Dict[str, str], static_files: List[str], commands: List[str]):
+        self.name = name
+        self.files = files
+        self.static_files = set(static_files)
+        self.commands = commands
+
+    def merge(self, code):
+        """Merges the skeleton into a generated artifact, keeping the text around it and its shell actions."""
+        generated = parse_bolt_files(code)
+        files = dict(self.files)
+        for file_path, content in generated.items():
+            if file_path in self.static_files:
+                continue
+            if file_path == "package.json" and "package.json" in self.files:
+                files[file_path] = merge_package_json(self.files["package.json"], content)
+            else:
+                files[file_path] = content
+
+        artifact_open = ARTIFACT_OPEN_PATTERN.search(code or '')
+        artifact_id, title = artifact_open.groups() if artifact_open else ("project", "Project Files")
+        start = artifact_open.start() if artifact_open else len(code or '')
+        end = (code or '').find("</boltArtifact>", start)
+        before = (code or '')[:start]
+        after = code[end + len("</boltArtifact>"):] if end != -1 else ''
+        commands = [command.strip() for command in SHELL_ACTION_PATTERN.findall(code or '')] or self.commands
+        logging.info(f"Merged the {self.name} skeleton : {len(generated)} generated files, {len(files)} files in total")
+        return f"{before}{render_bolt_artifact(artifact_id, title, files, commands)}{after}"
+
+    def strip(self, code):
+        """
+        Returns the application part of a merged artifact, as file actions: the files that differ
+        from the skeleton, with package.json reduced to the entries added to the skeleton's.
+        """
+        application = {}
+        for file_path, content in parse_bolt_files(code).items():
+            if file_path in self.static_files or content == self.files.get(file_path):
+                continue
+            if file_path == "package.json" and "package.json" in self.files:
+                try:
+                    base, merged = json.loads(self.files["package.json"]), json.loads(content)
+                    additions = {
+                        key : {name : version for name, version in merged.get(key, {}).items() if name not in base.get(key, {})}
+                        for key in DEPENDENCY_KEYS if isinstance(merged.get(key), dict)
+                    }
+                    content = json.dumps({key : value for key, value in additions.items() if value}, indent=2)
+                except json.JSONDecodeError:
+                    pass
+            application[file_path] = content
+        return render_bolt_files(application)
+
+TEMPLATES = {
+    "react-vite-ts" : ProjectTemplate(
+        "react-vite-ts", parse_bolt_files(REACT_BASE_PROMPT), REACT_TEMPLATE_STATIC_FILES, ["npm install && npm run dev"]
+    ),
+}
+
+def get_template(name):
+    return TEMPLATES.get(name) if CODE_TEMPLATES_ENABLED else None
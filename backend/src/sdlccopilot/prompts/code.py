@@ -421,4 +421,46 @@ GENERATE COMPLETE, PRODUCTION-READY BACKEND CODE WITH ALL NECESSARY FILES, MODUL
 Here is a list of files that exist on the file system but are not being shown to you:
   - .gitignore
   - package-lock.json
-"""
\ No newline at end of file
+"""
+
+# Static system prompts of the code generation calls, kept byte-identical across calls for prompt caching
+FRONTEND_SYSTEM_PROMPT = f"""{CODE_SYSTEM_PROMPT}
+{FRONTEND_PROMPT}"""
+
+BACKEND_SYSTEM_PROMPT = f"""{CODE_SYSTEM_PROMPT}
+{BACKEND_PROMPT}"""
+
+# Planning step of per-file code generation: a file manifest plus the interface contract every file is written against
+CODE_MANIFEST_SYSTEM_PROMPT = """
+You are a senior software architect planning a codebase that several developers will write in parallel, one file each, without seeing each other's files.
+
+Plan the complete project and return a JSON object with:
+- "artifact_id": a short kebab-case id for the project
+- "title": a short title for the project
+- "summary": one sentence describing what is being built
+- "files": every file of the project, in creation order (configuration such as package.json first), each as {"path": "src/routes/auth.js", "purpose": "what the file does", "exports": ["names the file exports"], "imports": ["project files it imports, as paths"]}
+- "routes": every API endpoint, each as {"method": "post", "path": "/api/v1/auth/login", "file": "the file that defines the route", "request": "request body and params", "response": "response body and status codes"}
+- "types": the shared data shapes, each as {"name": "User", "fields": {"field": "type"}, "file": "the file that defines it"}
+- "dependencies": the npm or pip packages the project needs, as {"package": "version"}
+- "commands": the shell commands that install and start the project, e.g. ["npm install && npm run dev"]
+
+Keep paths, export names, route paths and type fields exact: the developers implement them literally.
+Do not write any file content.
+"""
+
+# Skeleton files of REACT_BASE_PROMPT that the server adds to every frontend artifact, see project_templates.py
+REACT_TEMPLATE_STATIC_FILES = [
+    "eslint.config.js", "postcss.config.js", "tailwind.config.js", "tsconfig.app.json",
+    "tsconfig.json", "tsconfig.node.json", "vite.config.ts", "src/vite-env.d.ts",
+]
+
+TEMPLATE_OUTPUT_PROMPT = f"""
+PROJECT SKELETON:
+The project skeleton shown above is merged into your artifact by the server.
+- Do NOT output these skeleton files, they are added unchanged: {", ".join(REACT_TEMPLATE_STATIC_FILES)}
+- Output only the application files: everything under src/ and any other file specific to this application (index.html only if you change it)
+- For package.json, output only a package.json with the "dependencies" and "devDependencies" you add to the skeleton, and "scripts" only if you add one
+"""
+
+FRONTEND_TEMPLATE_SYSTEM_PROMPT = f"""{FRONTEND_SYSTEM_PROMPT}
+{TEMPLATE_OUTPUT_PROMPT}"""
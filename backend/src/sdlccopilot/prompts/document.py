@@ -414,3 +414,48 @@ STRICTLY AVOID:
 
 """
 
+# Major sections of the documents above, as (heading, subsections, context) for outline-then-fill
+# generation. Functional sections name the user story detail they need ("full" or "titles");
+# technical sections name the functional document sections they build on.
+FUNCTIONAL_DOCUMENT_SECTIONS = [
+    ("1. INTRODUCTION", "1.1 Purpose, 1.2 Scope, 1.3 Definitions, Acronyms and Abbreviations, 1.4 References, 1.5 Overview", "titles"),
+    ("2. OVERALL DESCRIPTION / BUSINESS CONTEXT", "2.1 Product Perspective, 2.2 Product Functions, 2.3 User Classes and Characteristics, 2.4 Operating Environment, 2.5 Design and Implementation Constraints, 2.6 User Documentation and Training, 2.7 Assumptions and Dependencies", "titles"),
+    ("3. STAKEHOLDER ANALYSIS", "Primary stakeholders and users impacted, with roles and responsibilities", "titles"),
+    ("4. SPECIFIC FUNCTIONAL REQUIREMENTS", "Numbered FR-1, FR-1.1, ... each with purpose, preconditions, basic flow, alternate flow, postconditions and business rules", "full"),
+    ("5. USE CASES / WORKFLOWS", "Detailed textual use cases and step-by-step flows", "full"),
+    ("6. DATA REQUIREMENTS", "Input fields, output fields, validation rules, data formats, data retention and purging rules", "full"),
+    ("7. NON-FUNCTIONAL REQUIREMENTS (NFRs)", "Performance, security, scalability, availability, usability, compliance, logging and audit, each with measurable criteria", "titles"),
+    ("8. INTERFACE REQUIREMENTS", "User interface, external systems, reporting and integration interfaces", "titles"),
+    ("9. DEPENDENCIES & ASSUMPTIONS", "Internal, external, technical and business dependencies with impact analysis", "titles"),
+    ("10. EDGE CASES & EXCEPTION HANDLING", "Failure points, alternate flows, graceful degradation and limitations", "full"),
+    ("11. ACCEPTANCE CRITERIA", "Aggregated acceptance criteria of the user stories in a checklist-style table", "full"),
+    ("12. GLOSSARY & DEFINITIONS", "Business terms, roles, acronyms and domain-specific terminology", "titles"),
+]
+
+TECHNICAL_DOCUMENT_SECTIONS = [
+    ("1. System Architecture Overview", "High-level architecture, architecture style, architecture diagram description", (2, 8)),
+    ("2. Technology Stack", "Backend, frontend, databases, external services, rationale for each choice", (2, 7)),
+    ("3. Module-Level Design", "Per module: name, purpose, responsibilities, inputs and outputs, internal logic flow, APIs used, security notes", (4, 5)),
+    ("4. Database Design", "ER diagram description, tables, fields and data types, primary and foreign keys, indexing strategy", (6,)),
+    ("5. API Design Specification", "Per endpoint: URL, HTTP method, request and response schema, authentication, error codes, sample request and response", (4, 6, 8)),
+    ("6. Class Diagram / Object Model", "UML-style class description, entities and relationships", (4, 6)),
+    ("7. Sequence Diagrams (Textual Description)", "Time-ordered interactions for the key flows, use case descriptions with actors and relationships", (5,)),
+    ("8. Data Flow Diagrams (DFD)", "Data flow from frontend to backend to database to external APIs", (5, 6)),
+    ("9. Security & Compliance Design", "Authentication and authorization, encryption, secret management, compliance references", (7,)),
+    ("10. Performance & Scalability Design", "Caching, load balancing, scaling strategy, performance benchmarks and SLAs", (7,)),
+    ("11. Error Handling, Logging & Monitoring", "Error format, retry logic, failure scenarios, logging, monitoring and alerting", (10,)),
+    ("12. Deployment Architecture & Operations", "Containerization, CI/CD, environments, technical risks, assumptions and constraints", (2, 9)),
+]
+
+document_outline_system_prompt = """
+You are a senior analyst planning a document before it is written section by section by several writers in parallel.
+
+Given the document's fixed major sections and the project context, produce a short outline for every section:
+- 3 to 6 subsection headings per section, numbered under the section (e.g. 4.1, 4.2)
+- Under each subsection, one line with the key points, names and identifiers it must cover
+
+Use consistent names for actors, modules, entities, requirements (FR-1, FR-2, ...) and endpoints across all sections, so the parallel writers stay consistent with each other.
+Do not write the sections themselves.
+
+Return a JSON object that maps each section number (as a string, e.g. "1") to its list of outline lines.
+"""
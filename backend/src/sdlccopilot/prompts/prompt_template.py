@@ -1,7 +1,16 @@
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.outputs import Generation
+from src.sdlccopilot.utils.json_stream import parse_json
 
-json_output_parser = JsonOutputParser()
+class TolerantJsonOutputParser(JsonOutputParser):
+    """`JsonOutputParser` that repairs fences, trailing commas and truncated output before failing."""
+    def parse_result(self, result: list[Generation], *, partial: bool = False):
+        if partial:
+            return super().parse_result(result, partial=True)
+        return parse_json(result[0].text)
+
+json_output_parser = TolerantJsonOutputParser()
 
 json_prompt_template = PromptTemplate(
     template="{system_prompt} \n {format_instruction} \n {human_query} \n",
@@ -14,3 +23,9 @@ prompt_template = PromptTemplate(
     input_variables= ["system_prompt", "human_query",],
 )
 
+# Static instructions as a system message ahead of the per-call query, so the provider can
+# cache the prefix across calls. Pair it with `cache_static_prefix` from llms.prompt_cache.
+cached_prompt_template = ChatPromptTemplate.from_messages([
+    ("system", "{system_prompt}"),
+    ("human", "{human_query}"),
+])
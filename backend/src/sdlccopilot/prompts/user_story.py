@@ -48,6 +48,22 @@ You are an expert Agile Product Owner. Your task is to analyze structured projec
 🚫 Avoid vagueness, missing criteria, or unnecessary technical details.
 """
 
+packed_user_stories_system_prompt = generate_user_stories_system_prompt + """
+---
+
+**MULTIPLE PROJECTS:**
+The query contains several independent projects, each introduced by its key (P1, P2, ...).
+Generate the user stories of every project on its own, numbering the story_id of each project from US-001.
+Return ONE JSON object that maps each project key to that project's list of user stories, for example:
+```json
+{
+    "P1": [ { "story_id": "US-001", "title": "...", "description": "...", "acceptance_criteria": ["..."] } ],
+    "P2": [ { "story_id": "US-001", "title": "...", "description": "...", "acceptance_criteria": ["..."] } ]
+}
+```
+Include every project key exactly once.
+"""
+
 revised_user_stories_system_prompt = """
 # **ROLE & OBJECTIVE**  
 You are an expert Agile Product Owner. Your task is to **MODIFY THE EXISTING USER STORIES** based on user feedback. You must **PRESERVE ALL EXISTING USER STORIES** that are not mentioned in the feedback, and only make the specific changes requested. Return the output in the JSON format only. 
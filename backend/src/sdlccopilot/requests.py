@@ -8,4 +8,7 @@ class ProjectRequirementsRequest(BaseModel):
     requirements : List[str] = Field(description="Requirements of the project")
 
 class OwnerFeedbackRequest(BaseModel):
-    feedback: str = Field(default='approved', description="Feedback from the owner")
\ No newline at end of file
+    feedback: str = Field(default='approved', description="Feedback from the owner")
+
+class BatchProjectRequirementsRequest(BaseModel):
+    projects : List[ProjectRequirementsRequest] = Field(min_length=1, max_length=100, description="Projects to generate user stories for")
\ No newline at end of file
@@ -41,6 +41,7 @@ class SecurityReviewResponse(BaseModel):
     status : Literal["in_progress", "pending_approval", "feedback", "completed"] = Field(description="The status of the security review")
     reviews : List[SecurityReview] = Field(description="The reviews")
     messages : List[Dict] = Field(description="The messages")
+    messages_reset : bool = Field(default=False, description="Whether the messages are the whole history, since since_id was compacted away")
 
 
 class TestCase(BaseModel):
@@ -55,18 +56,21 @@ class TestCasesResponse(BaseModel):
     status : Literal["in_progress", "pending_approval", "feedback", "completed"] = Field(description="The status of the test cases")
     test_cases : List[TestCase] = Field(description="The test cases")
     messages : List[Dict] = Field(description="The messages")
+    messages_reset : bool = Field(default=False, description="Whether the messages are the whole history, since since_id was compacted away")
     
 class QATestingResponse(BaseModel):
     session_id : str = Field(description="The session id")
     status : Literal["in_progress", "pending_approval", "feedback", "completed"] = Field(description="The status of the qa testing")
     qa_testing : QATesting = Field(description="The qa testing")
     messages : List[Dict] = Field(description="The messages")
+    messages_reset : bool = Field(default=False, description="Whether the messages are the whole history, since since_id was compacted away")
     
 class DeploymentResponse(BaseModel):
     session_id : str = Field(description="The session id")
     status : Literal["in_progress", "pending_approval", "feedback", "completed"] = Field(description="The status of the deployment")
     deployment_steps : str = Field(description="The deployment steps")
     messages : List[Dict] = Field(description="The messages")
+    messages_reset : bool = Field(default=False, description="Whether the messages are the whole history, since since_id was compacted away")
 
 #     ********* document_state :  {'functional_documents': [DocumentSection(title='INTRODUCTION', content='This document defines the functional requirements for the Password Reset 
 # Feature of the User Management System.'), DocumentSection(title='BUSINESS CONTEXT', content='The business needs a secure mechanism for users to recover access to their accounts without compromising security, improving customer satisfaction and retention.')], 'technical_documents': [], 'messages': [AIMessage(content="Please review above functional design document and provide feedback or type 'Approved' if you're satisfied.", additional_kwargs={}, response_metadata={}, id='41a4334f-abcd-4e48-a1ce-f96f36454b07')], 'document_type': 'functional', 'status': 'pending_approval', 'revised_count': 0, 'version': 1.0}
\ No newline at end of file
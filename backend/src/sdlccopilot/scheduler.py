@@ -0,0 +1,263 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import wraps
+from fastapi import HTTPException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
+from src.sdlccopilot.logger import logging
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_INITIAL = 1
+PRIORITY_SPECULATIVE = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_INITIAL: "initial",
+    PRIORITY_SPECULATIVE: "speculative",
+}
+# Fraction of the queue each priority class may fill before it is shed
+PRIORITY_QUEUE_SHARE = {
+    PRIORITY_INTERACTIVE: 1.0,
+    PRIORITY_INITIAL: 0.75,
+    PRIORITY_SPECULATIVE: 0.5,
+}
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "32"))
+
+# The priority and tenant that provider calls made from the current graph node or request run under
+_call_context = contextvars.ContextVar("llm_call_context", default=(PRIORITY_INITIAL, "default"))
+# Set while a provider call holds a slot, so a model whose async path runs its sync one takes a single slot
+_holding_slot = contextvars.ContextVar("holding_llm_slot", default=False)
+
+class SchedulerOverloaded(Exception):
+    def __init__(self, priority, retry_after):
+        super().__init__(f"LLM work queue is full for {PRIORITY_NAMES[priority]} requests")
+        self.priority = priority
+        self.retry_after = retry_after
+
+class LLMScheduler:
+    """
+    Orders LLM provider calls across sessions.
+    At most `max_concurrency` calls run at once. Waiting calls are served by priority class,
+    and within a class by start-time fair queueing over tenants, so a tenant with many queued
+    calls cannot starve the others.
+    """
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue_depth=LLM_MAX_QUEUE_DEPTH):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.condition = threading.Condition()
+        self.queue = []
+        self.sequence = itertools.count()
+        self.running = 0
+        self.virtual_time = 0.0
+        self.tenant_tags = {}
+        self.service_time_sum = 0.0
+        self.service_count = 0
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = {priority: 0 for priority in PRIORITY_NAMES}
+        self.wait_time_sum = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.wait_time_max = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.wait_count = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def retry_after(self):
+        average_service_time = self.service_time_sum / self.service_count if self.service_count else 30.0
+        return max(1, math.ceil(average_service_time * (len(self.queue) + 1) / self.max_concurrency))
+
+    def check_admission(self, priority):
+        """Raises SchedulerOverloaded when the queue is too deep for this priority class."""
+        with self.condition:
+            if len(self.queue) >= self.max_queue_depth * PRIORITY_QUEUE_SHARE[priority]:
+                self.shed[priority] += 1
+                raise SchedulerOverloaded(priority, self.retry_after())
+            self.admitted[priority] += 1
+
+    def acquire(self, priority, tenant):
+        with self.condition:
+            tag = max(self.tenant_tags.get(tenant, 0.0), self.virtual_time) + 1
+            self.tenant_tags[tenant] = tag
+            ticket = (priority, tag, next(self.sequence))
+            heapq.heappush(self.queue, ticket)
+            enqueued_at = time.monotonic()
+            while self.running >= self.max_concurrency or self.queue[0] != ticket:
+                self.condition.wait()
+            heapq.heappop(self.queue)
+            self.running += 1
+            self.virtual_time = max(self.virtual_time, tag - 1)
+            waited = time.monotonic() - enqueued_at
+            self.wait_time_sum[priority] += waited
+            self.wait_time_max[priority] = max(self.wait_time_max[priority], waited)
+            self.wait_count[priority] += 1
+            self.condition.notify_all()
+        return waited
+
+    def release(self, service_time):
+        with self.condition:
+            self.running -= 1
+            self.service_time_sum += service_time
+            self.service_count += 1
+            self.tenant_tags = {tenant: tag for tenant, tag in self.tenant_tags.items() if tag > self.virtual_time}
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority, tenant):
+        waited = self.acquire(priority, tenant)
+        if waited > 1:
+            logging.info(f"Waited {waited:.1f}s for an LLM slot ({PRIORITY_NAMES[priority]}, tenant {tenant})")
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started_at)
+
+    @asynccontextmanager
+    async def async_slot(self, priority, tenant):
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self.acquire, priority, tenant))
+        try:
+            waited = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The waiting thread cannot be interrupted, so hand its slot back once it gets one
+            acquiring.add_done_callback(lambda done: done.cancelled() or done.exception() or self.release(0.0))
+            raise
+        if waited > 1:
+            logging.info(f"Waited {waited:.1f}s for an LLM slot ({PRIORITY_NAMES[priority]}, tenant {tenant})")
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started_at)
+
+    def metrics(self):
+        """Renders the scheduler metrics in the Prometheus text exposition format."""
+        with self.condition:
+            queued = {priority: 0 for priority in PRIORITY_NAMES}
+            for priority, _, _ in self.queue:
+                queued[priority] += 1
+            lines = [
+                "# TYPE sdlc_llm_running gauge",
+                f"sdlc_llm_running {self.running}",
+                "# TYPE sdlc_llm_queue_depth gauge",
+            ]
+            lines += [f'sdlc_llm_queue_depth{{priority="{name}"}} {queued[priority]}' for priority, name in PRIORITY_NAMES.items()]
+            lines.append("# TYPE sdlc_llm_admitted_total counter")
+            lines += [f'sdlc_llm_admitted_total{{priority="{name}"}} {self.admitted[priority]}' for priority, name in PRIORITY_NAMES.items()]
+            lines.append("# TYPE sdlc_llm_shed_total counter")
+            lines += [f'sdlc_llm_shed_total{{priority="{name}"}} {self.shed[priority]}' for priority, name in PRIORITY_NAMES.items()]
+            lines.append("# TYPE sdlc_llm_wait_seconds summary")
+            for priority, name in PRIORITY_NAMES.items():
+                lines.append(f'sdlc_llm_wait_seconds_sum{{priority="{name}"}} {self.wait_time_sum[priority]:.3f}')
+                lines.append(f'sdlc_llm_wait_seconds_count{{priority="{name}"}} {self.wait_count[priority]}')
+            lines.append("# TYPE sdlc_llm_wait_seconds_max gauge")
+            lines += [f'sdlc_llm_wait_seconds_max{{priority="{name}"}} {self.wait_time_max[priority]:.3f}' for priority, name in PRIORITY_NAMES.items()]
+            return "\n".join(lines) + "\n"
+
+llm_scheduler = LLMScheduler()
+
+@contextmanager
+def scheduling_context(priority, tenant):
+    """Runs the provider calls made inside the block, including those fanned out to other threads or tasks, as `priority` work of `tenant`."""
+    token = _call_context.set((priority, tenant))
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+def current_tenant():
+    return _call_context.get()[1]
+
+@contextmanager
+def provider_call_slot():
+    if _holding_slot.get():
+        yield
+        return
+    with llm_scheduler.slot(*_call_context.get()):
+        _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.set(False)
+
+@asynccontextmanager
+async def async_provider_call_slot():
+    if _holding_slot.get():
+        yield
+        return
+    async with llm_scheduler.async_slot(*_call_context.get()):
+        _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.set(False)
+
+class ScheduledChatModel:
+    """
+    Mixed into a chat model class so that every provider call, streamed or not, runs in a
+    scheduler slot under the current scheduling context. A node that fans out to several
+    calls therefore takes one slot per call rather than one for the whole node.
+    """
+    def _generate(self, *args, **kwargs):
+        with provider_call_slot():
+            return super()._generate(*args, **kwargs)
+
+    async def _agenerate(self, *args, **kwargs):
+        async with async_provider_call_slot():
+            return await super()._agenerate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        with provider_call_slot():
+            yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        async with async_provider_call_slot():
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+_scheduled_model_classes = {}
+
+def scheduled_chat_model(model_class):
+    """Returns `model_class` with ScheduledChatModel mixed in, keeping its name so isinstance checks and traces are unchanged."""
+    if model_class not in _scheduled_model_classes:
+        namespace = {"__module__": model_class.__module__}
+        # BaseChatModel.stream falls back to invoke only when _stream is not overridden
+        if model_class._stream is BaseChatModel._stream:
+            namespace["_stream"] = BaseChatModel._stream
+        if model_class._astream is BaseChatModel._astream:
+            namespace["_astream"] = BaseChatModel._astream
+        _scheduled_model_classes[model_class] = type(model_class.__name__, (ScheduledChatModel, model_class), namespace)
+    return _scheduled_model_classes[model_class]
+
+def scheduled(priority, node):
+    """
+    Wraps an LLM-bound graph node so the provider calls it makes are scheduled as `priority`
+    work. The tenant is the `tenant_id` from the run config, falling back to the session's thread_id.
+    """
+    # Not functools.wraps: LangGraph reads the signature to decide whether to pass `config`
+    def run(state, config: RunnableConfig):
+        configurable = (config or {}).get("configurable", {})
+        tenant = configurable.get("tenant_id") or configurable.get("thread_id", "default")
+        with scheduling_context(priority, tenant):
+            return node(state)
+    run.__name__ = getattr(node, "__name__", "scheduled_node")
+    return run
+
+def admission_control(priority):
+    """
+    Decorates an endpoint so it is shed with 429 and Retry-After while the LLM queue is full.
+    """
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                llm_scheduler.check_admission(priority)
+            except SchedulerOverloaded as e:
+                logging.warning(f"Shedding request: {str(e)}")
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+            return await endpoint(*args, **kwargs)
+        return wrapper
+    return decorator
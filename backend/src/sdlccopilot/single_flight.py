@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import os
+from functools import wraps
+from fastapi.responses import Response
+from redis.exceptions import LockError
+from starlette.concurrency import run_in_threadpool
+from src.sdlccopilot.logger import logging
+from src.sdlccopilot.utils.concurrency import run_coroutine
+from src.sdlccopilot.utils.serialization import dumps, loads
+
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv("SINGLE_FLIGHT_LOCK_TIMEOUT", "600"))
+SINGLE_FLIGHT_RESULT_TTL = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "60"))
+SINGLE_FLIGHT_POLL_INTERVAL = 0.5
+# The leader renews its lock this often, so a long generation never outlives the lock timeout
+SINGLE_FLIGHT_LOCK_RENEW_INTERVAL = max(SINGLE_FLIGHT_LOCK_TIMEOUT / 3, 1)
+
+def _stored_response(redis, result_key):
+    """The response a leader published under `result_key`, with its original headers, or None."""
+    result = redis.get(result_key)
+    if result is None:
+        return None
+    result = loads(result)
+    response = Response(content=result["body"], status_code=result["status_code"])
+    response.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in result["headers"]]
+    return response
+
+def _session_version(redis, session_id):
+    """A hash of the stored session, which every review that reaches the graph rewrites."""
+    session = redis.get(session_id) or ''
+    return hashlib.sha256(session if isinstance(session, bytes) else session.encode("utf-8")).hexdigest()[:16]
+
+async def _renew_lock(lock):
+    while True:
+        await asyncio.sleep(SINGLE_FLIGHT_LOCK_RENEW_INTERVAL)
+        try:
+            lock.extend(SINGLE_FLIGHT_LOCK_TIMEOUT, replace_ttl=True)
+        except LockError as e:
+            logging.warning(f"Could not renew the single-flight lock {lock.name}: {str(e)}")
+            return
+
+class SingleFlight:
+    """
+    Coalesces concurrent graph runs on the same session.
+    Within a worker, a duplicate caller awaits the in-flight future. Across workers, a Redis
+    lock elects one leader, and the followers wait for it to publish its response. A caller
+    with different feedback waits for the lock and then runs on its own.
+    """
+    def __init__(self):
+        self.flights = {}
+
+    async def run(self, session_id, redis, call, fingerprint=''):
+        flight_key = (session_id, fingerprint)
+        flight = self.flights.get(flight_key)
+        if flight is not None:
+            logging.info(f"Attaching to the in-flight request for session: {session_id}")
+            return await asyncio.shield(flight)
+
+        flight = asyncio.get_running_loop().create_future()
+        self.flights[flight_key] = flight
+        try:
+            response = await self._run_across_workers(session_id, redis, call, fingerprint)
+            flight.set_result(response)
+            return response
+        except Exception as e:
+            flight.set_exception(e)
+            # Retrieve the exception so an unobserved future does not log a warning
+            flight.exception()
+            raise
+        except BaseException:
+            flight.cancel()
+            raise
+        finally:
+            del self.flights[flight_key]
+
+    async def _run_across_workers(self, session_id, redis, call, fingerprint):
+        lock = redis.lock(f"singleflight:{session_id}", timeout=SINGLE_FLIGHT_LOCK_TIMEOUT)
+        result_key = f"singleflight:{session_id}:{fingerprint}:result"
+        # A retry that arrives just after the leader finished gets its response without running again
+        stored = _stored_response(redis, result_key)
+        if stored is not None:
+            return stored
+        while not lock.acquire(blocking=False):
+            logging.info(f"Waiting for the request in flight on another worker for session: {session_id}")
+            while lock.locked():
+                await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+            stored = _stored_response(redis, result_key)
+            if stored is not None:
+                return stored
+        renewal = asyncio.create_task(_renew_lock(lock))
+        try:
+            stored = _stored_response(redis, result_key)
+            if stored is not None:
+                return stored
+            # Endpoints block on the graph, so run them off the event loop to keep it free for followers
+            response = await run_in_threadpool(run_coroutine, call())
+            if isinstance(response, Response):
+                redis.set(result_key, dumps({
+                    "body": response.body.decode("utf-8"),
+                    "status_code": response.status_code,
+                    "headers": [(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.raw_headers]
+                }), ex=SINGLE_FLIGHT_RESULT_TTL)
+            return response
+        finally:
+            renewal.cancel()
+            try:
+                lock.release()
+            except LockError as e:
+                logging.warning(f"The single-flight lock for session {session_id} was no longer held: {str(e)}")
+
+review_flights = SingleFlight()
+
+def single_flight(endpoint):
+    """
+    Decorates a review endpoint taking `session_id`, `request` and `redis` so that duplicate
+    submissions for the same session share one graph run and its response. A submission is a
+    duplicate when it has the same endpoint and feedback and was made against the same version
+    of the session; once a run has updated the session, the same feedback is a new submission,
+    such as the next round of a revise loop, and reaches the graph.
+    """
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        feedback = getattr(kwargs.get("request"), "feedback", '')
+        session_version = _session_version(kwargs["redis"], kwargs["session_id"])
+        # Every review endpoint of a session takes the same feedback ("approved"), so the endpoint is part of the fingerprint
+        fingerprint = hashlib.sha256(f"{endpoint.__name__}:{feedback}:{session_version}".encode("utf-8")).hexdigest()[:16]
+        return await review_flights.run(kwargs["session_id"], kwargs["redis"], lambda: endpoint(*args, **kwargs), fingerprint)
+    return wrapper
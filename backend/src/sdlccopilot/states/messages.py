@@ -0,0 +1,45 @@
+import os
+from langchain_core.messages import AIMessage
+from langgraph.graph.message import add_messages
+
+MESSAGE_HISTORY_LIMIT = max(int(os.getenv("MESSAGE_HISTORY_LIMIT", "20")), 2)
+MESSAGE_SUMMARY_MAX_CHARS = int(os.getenv("MESSAGE_SUMMARY_MAX_CHARS", "2000"))
+MESSAGE_SUMMARY_LINE_CHARS = 160
+SUMMARY_MESSAGE_ID = "history-summary"
+
+def _summary_line(message):
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    content = " ".join(content.split())
+    if len(content) > MESSAGE_SUMMARY_LINE_CHARS:
+        content = content[:MESSAGE_SUMMARY_LINE_CHARS] + "..."
+    return f"- {message.type}: {content}"
+
+def compact_messages(messages, limit=MESSAGE_HISTORY_LIMIT):
+    """
+    Keeps the last `limit` messages in full and folds the older ones into a single
+    summary message at the head of the list. An existing summary is folded again,
+    keeping its most recent lines within MESSAGE_SUMMARY_MAX_CHARS.
+    """
+    summary = None
+    if messages and messages[0].id == SUMMARY_MESSAGE_ID:
+        summary, messages = messages[0], messages[1:]
+    if len(messages) <= limit:
+        return ([summary] if summary else []) + messages
+
+    older, recent = messages[:-limit], messages[-limit:]
+    lines = summary.content.splitlines()[1:] if summary else []
+    lines.extend(_summary_line(message) for message in older)
+    while lines and sum(len(line) + 1 for line in lines) > MESSAGE_SUMMARY_MAX_CHARS:
+        lines.pop(0)
+    summary = AIMessage(
+        id=SUMMARY_MESSAGE_ID,
+        content="\n".join(["Summary of the earlier conversation:"] + lines)
+    )
+    return [summary] + recent
+
+def add_compacted_messages(left, right):
+    """
+    `add_messages` reducer that bounds the channel to MESSAGE_HISTORY_LIMIT full messages,
+    so checkpoints and API responses stop growing with every revision loop.
+    """
+    return compact_messages(add_messages(left, right))
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import posixpath
+import re
+from typing import Dict, List
+
+BOLT_FILE_ACTION_PATTERN = re.compile(
+    r'<boltAction\s+type="file"\s+filePath="([^"]+)"\s*>(.*?)</boltAction>',
+    re.DOTALL
+)
+
+def estimate_tokens(text):
+    """Rough token estimation: ~1 token per 4 characters for English text"""
+    return len(text) // 4
+
+def parse_bolt_files(code) -> Dict[str, str]:
+    """
+    Extracts the file actions of a boltArtifact into an ordered {file_path: content} map.
+    Later actions for the same path overwrite earlier ones, like the WebContainer does.
+    """
+    files = {}
+    for file_path, content in BOLT_FILE_ACTION_PATTERN.findall(code or ''):
+        files[file_path.strip()] = content
+    return files
+
+def normalize_file_path(file_path) -> str:
+    """
+    The comparison key of a file path, so paths written differently by the model, such as
+    ./routes/Auth.js and routes/auth.js, name the same file.
+    """
+    return posixpath.normpath(str(file_path or '').strip().replace("\\", "/")).lstrip("/").lower()
+
+def hash_bolt_files(files: Dict[str, str]) -> Dict[str, str]:
+    """
+    Returns a {file_path: sha256} map used to detect which files changed between passes.
+    """
+    return {file_path: hashlib.sha256(content.encode("utf-8")).hexdigest() for file_path, content in files.items()}
+
+def render_bolt_files(files: Dict[str, str]) -> str:
+    """
+    Renders a {file_path: content} map back into boltAction file blocks.
+    """
+    return "\n\n".join(
+        f'<boltAction type="file" filePath="{file_path}">{content}</boltAction>'
+        for file_path, content in files.items()
+    )
+
+def render_bolt_artifact(artifact_id, title, files: Dict[str, str], commands: List[str] = ()) -> str:
+    """
+    Renders a complete boltArtifact: the file actions in order, followed by the shell actions.
+    """
+    actions = [render_bolt_files(files)] + [f'<boltAction type="shell">{command}</boltAction>' for command in commands]
+    return f'<boltArtifact id="{artifact_id}" title="{title}">\n' + "\n".join(actions) + "\n</boltArtifact>"
+
+def replace_bolt_files(code, files: Dict[str, str]) -> str:
+    """
+    Replaces the content of the file actions in `code` with the contents in `files`, keeping the
+    rest of the artifact as it is. Files that `code` does not have yet are appended to the artifact.
+    """
+    remaining = dict(files)
+
+    def replace(match):
+        file_path = match.group(1).strip()
+        if file_path not in remaining:
+            return match.group(0)
+        return f'<boltAction type="file" filePath="{match.group(1)}">{remaining.pop(file_path)}</boltAction>'
+
+    code = BOLT_FILE_ACTION_PATTERN.sub(replace, code or '')
+    if remaining:
+        new_files = render_bolt_files(remaining)
+        closing = code.rfind("</boltArtifact>")
+        code = f"{code[:closing]}{new_files}\n{code[closing:]}" if closing != -1 else f"{code}\n\n{new_files}"
+    return code
+
+def _split_file(content, max_tokens) -> List[str]:
+    max_chars = max(max_tokens * 4, 1)
+    chunks = []
+    current = ''
+    for line in content.splitlines(keepends=True):
+        if current and len(current) + len(line) > max_chars:
+            chunks.append(current)
+            current = ''
+        current += line
+    if current:
+        chunks.append(current)
+    return chunks
+
+def shard_bolt_files(files: Dict[str, str], max_tokens=6000) -> List[Dict[str, str]]:
+    """
+    Packs a {file_path: content} map into shards of at most `max_tokens` estimated tokens.
+    Files of the same module (directory) are kept together where they fit, and a file that
+    is larger than a shard on its own is split on line boundaries into several shards.
+    """
+    modules = {}
+    for file_path, content in files.items():
+        modules.setdefault(os.path.dirname(file_path), {})[file_path] = content
+
+    shards = []
+    current = {}
+    current_tokens = 0
+    for module_files in modules.values():
+        for file_path, content in module_files.items():
+            tokens = estimate_tokens(content)
+            if tokens > max_tokens:
+                for chunk in _split_file(content, max_tokens):
+                    shards.append({file_path: chunk})
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                shards.append(current)
+                current = {}
+                current_tokens = 0
+            current[file_path] = content
+            current_tokens += tokens
+    if current:
+        shards.append(current)
+    return shards
@@ -0,0 +1,18 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine to completion from synchronous graph nodes.
+    Nodes may be executed on a thread that already owns a running event loop
+    (FastAPI endpoints call `stream` directly), so in that case the coroutine
+    gets its own loop on a worker thread. The worker runs in a copy of the caller's
+    context, so the graph run config stays visible to the coroutine's tasks.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
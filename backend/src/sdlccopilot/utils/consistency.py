@@ -0,0 +1,61 @@
+import json
+import re
+from typing import Dict, List
+from src.sdlccopilot.utils.endpoints import IMPORT_PATTERN, resolve_import, python_imports, route_table, match_route_files
+
+SCRIPT_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs")
+# import x from 'pkg', import 'pkg/register', require('pkg') and dynamic import('pkg')
+PACKAGE_IMPORT_PATTERN = re.compile(r"""(?:\bfrom\s+|\brequire\(\s*|\bimport\s*\(?\s*)['"`]([^'"`./][^'"`]*)['"`]""")
+NODE_BUILTINS = {
+    "assert", "buffer", "child_process", "cluster", "crypto", "dns", "events", "fs", "http", "http2", "https",
+    "net", "os", "path", "perf_hooks", "process", "querystring", "readline", "stream", "string_decoder",
+    "timers", "tls", "url", "util", "v8", "vm", "worker_threads", "zlib",
+}
+
+def _package_name(specifier):
+    parts = specifier.split("/")
+    return "/".join(parts[:2]) if specifier.startswith("@") else parts[0]
+
+def check_bolt_files(files: Dict[str, str], routes=None) -> Dict[str, List[str]]:
+    """
+    Checks generated files against each other without running them: relative imports of scripts
+    and imports of project modules in Python files must resolve to a project file, packages
+    imported by scripts must be declared in package.json, and every route of the interface
+    contract (dicts with method, path and file) must be served by some file.
+    Returns {file_path: [issue, ...]} for the files that need fixing.
+    """
+    issues = {}
+    packages = set()
+    for file_path, content in files.items():
+        if file_path.endswith(".py"):
+            unresolved = [module for module, _, resolved in python_imports(file_path, content, files) if resolved is None]
+            for module in dict.fromkeys(unresolved):
+                issues.setdefault(file_path, []).append(f"imports '{module}', which is not a module of the project")
+            continue
+        if not file_path.endswith(SCRIPT_EXTENSIONS):
+            continue
+        for _, _, _, relative_path in IMPORT_PATTERN.findall(content):
+            if resolve_import(file_path, relative_path, files) is None:
+                issues.setdefault(file_path, []).append(f"imports '{relative_path}', which is not a file of the project")
+        packages.update(
+            _package_name(specifier) for specifier in PACKAGE_IMPORT_PATTERN.findall(content)
+            if not specifier.startswith("node:")
+        )
+
+    if "package.json" in files:
+        try:
+            package_json = json.loads(files["package.json"])
+            declared = {**package_json.get("dependencies", {}), **package_json.get("devDependencies", {})}
+            missing = sorted(package for package in packages - NODE_BUILTINS if package not in declared)
+            if missing:
+                issues.setdefault("package.json", []).append(f"does not declare the imported packages {missing}")
+        except (json.JSONDecodeError, AttributeError) as e:
+            issues.setdefault("package.json", []).append(f"is not valid JSON: {str(e)}")
+
+    served = route_table(files)
+    for route in routes or []:
+        method, path = str(route.get("method", "")).lower() or None, route.get("path", "")
+        if path and not match_route_files(served, method, path):
+            file_path = route.get("file") if route.get("file") in files else "routes"
+            issues.setdefault(file_path, []).append(f"does not serve the contract route {(method or '').upper()} {path}")
+    return issues
@@ -0,0 +1,200 @@
+import posixpath
+import re
+from typing import Dict, List, Optional, Tuple
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+
+# app.get('/path', ...), router.post("/path", ...), @app.get("/path") and @app.route("/path")
+ROUTE_PATTERN = re.compile(r"""\b(\w+)\.(get|post|put|patch|delete|all|route)\(\s*['"`]([^'"`]*)['"`]""")
+# app.use('/api/auth', authRoutes) and app.use('/api/auth', require('./routes/auth'))
+MOUNT_PATTERN = re.compile(r"""\b\w+\.use\(\s*['"`]([^'"`]+)['"`]\s*,\s*(?:require\(\s*['"`]([^'"`]+)['"`]\s*\)|(\w+))""")
+# import authRoutes from './routes/auth.js' and const authRoutes = require('./routes/auth')
+IMPORT_PATTERN = re.compile(
+    r"""(?:import\s+(?:(\w+)\s*,?\s*)?(?:\{[^}]*\}\s*)?(?:\*\s+as\s+(\w+)\s+)?from\s+|(?:const|let|var)\s+(?:(\w+)|\{[^}]*\})\s*=\s*require\(\s*)['"`](\.[^'"`]+)['"`]"""
+)
+# router = APIRouter(prefix="/auth") and bp = Blueprint("auth", __name__, url_prefix="/auth")
+ROUTER_PREFIX_PATTERN = re.compile(r"""\b(\w+)\s*=\s*(?:APIRouter|Blueprint)\([^)]*?\b(?:url_)?prefix\s*=\s*['"]([^'"]*)['"]""")
+# app.include_router(auth.router, prefix="/api") and app.register_blueprint(auth_bp, url_prefix="/api")
+INCLUDE_ROUTER_PATTERN = re.compile(r"""\b\w+\.(?:include_router|register_blueprint)\(\s*([\w.]+)([^)]*)\)""")
+PREFIX_ARGUMENT_PATTERN = re.compile(r"""\b(?:url_)?prefix\s*=\s*['"]([^'"]*)['"]""")
+# from app.routes import auth, from .models import (User, Session) and import app.models as models
+PY_FROM_IMPORT_PATTERN = re.compile(r"^[ \t]*from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+(?:\(([^)]*)\)|([^\n#;]+))", re.MULTILINE)
+PY_IMPORT_PATTERN = re.compile(r"^[ \t]*import[ \t]+([\w.]+(?:[ \t]+as[ \t]+\w+)?(?:[ \t]*,[ \t]*[\w.]+(?:[ \t]+as[ \t]+\w+)?)*)", re.MULTILINE)
+# /api/auth/mfa/enable, optionally preceded by its method: "Send POST request to /api/auth/mfa/enable"
+ENDPOINT_PATTERN = re.compile(r"""(?<![\w./])(/[\w\-.{}:]+(?:/[\w\-.{}:]+)*)""")
+METHOD_PATTERN = re.compile(r"\b(GET|POST|PUT|PATCH|DELETE)\b[^/\n]{0,40}$")
+RESOLVE_SUFFIXES = ("", ".js", ".ts", ".mjs", ".cjs", "/index.js", "/index.ts", ".py")
+
+def _segments(path):
+    return [segment for segment in path.split("?")[0].split("/") if segment]
+
+def resolve_import(from_file, relative_path, files) -> Optional[str]:
+    base = posixpath.normpath(posixpath.join(posixpath.dirname(from_file), relative_path))
+    for suffix in RESOLVE_SUFFIXES:
+        if base + suffix in files:
+            return base + suffix
+    return None
+
+def _python_bases(from_file, module):
+    """The directories an import of `module` in `from_file` can be relative to: the package of a relative import, or every enclosing directory, as the source root is not known."""
+    directory = posixpath.dirname(from_file)
+    level = len(module) - len(module.lstrip("."))
+    if level:
+        for _ in range(level - 1):
+            directory = posixpath.dirname(directory)
+        return [directory]
+    bases = [directory]
+    while directory:
+        directory = posixpath.dirname(directory)
+        bases.append(directory)
+    return bases
+
+def resolve_python_module(from_file, module, files) -> Optional[str]:
+    """Resolves a Python module, such as app.routes.auth or ..models, to its module file or package __init__.py in `files`."""
+    parts = [part for part in module.lstrip(".").split(".") if part]
+    for base in _python_bases(from_file, module):
+        path = posixpath.join(base, *parts)
+        for candidate in (f"{path}.py", posixpath.join(path, "__init__.py")):
+            if candidate in files:
+                return candidate
+    return None
+
+def _is_project_module(from_file, module, files):
+    """A relative import, or an absolute one whose top-level package or module is a part of the project."""
+    if module.startswith("."):
+        return True
+    top = module.split(".")[0]
+    for base in _python_bases(from_file, module):
+        path = posixpath.join(base, top)
+        if f"{path}.py" in files or any(file_path.startswith(f"{path}/") for file_path in files):
+            return True
+    return False
+
+def python_imports(file_path, content, files) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Returns the (module, bound_name, resolved_file) of each import of a project module in a Python
+    file. The file is None when the module does not resolve; imports of other packages are left out.
+    """
+    imports = []
+    for module, parenthesized, names in PY_FROM_IMPORT_PATTERN.findall(content):
+        if not _is_project_module(file_path, module, files):
+            continue
+        for name in re.sub(r"#[^\n]*", "", parenthesized or names).split(","):
+            name_parts = name.split()
+            if not name_parts:
+                continue
+            if name_parts[0] == "*":
+                imports.append((module, None, resolve_python_module(file_path, module, files)))
+                continue
+            # The name is a submodule of the package, or an attribute of the module
+            submodule = f"{module}{'' if module.endswith('.') else '.'}{name_parts[0]}"
+            resolved = resolve_python_module(file_path, submodule, files) or resolve_python_module(file_path, module, files)
+            imports.append((module, name_parts[-1], resolved))
+    for statement in PY_IMPORT_PATTERN.findall(content):
+        for name in statement.split(","):
+            name_parts = name.split()
+            if name_parts and _is_project_module(file_path, name_parts[0], files):
+                imports.append((name_parts[0], name_parts[-1], resolve_python_module(file_path, name_parts[0], files)))
+    return imports
+
+def local_imports(file_path, content, files) -> Dict[str, str]:
+    """Returns the {imported_name: file_path} map of the local imports of one file that resolve to a file in `files`."""
+    if file_path.endswith(".py"):
+        return {name: resolved for _, name, resolved in python_imports(file_path, content, files) if name and resolved}
+    imports = {}
+    for default_name, namespace_name, required_name, relative_path in IMPORT_PATTERN.findall(content):
+        resolved = resolve_import(file_path, relative_path, files)
+        if resolved is not None:
+            imports[default_name or namespace_name or required_name or relative_path] = resolved
+    return imports
+
+def extract_endpoints(text) -> List[Tuple[Optional[str], str]]:
+    """Extracts the (method, path) pairs a test case or test result refers to. The method is None when the text does not name it."""
+    endpoints = []
+    for match in ENDPOINT_PATTERN.finditer(text or ''):
+        method = METHOD_PATTERN.search(text[max(match.start() - 60, 0):match.start()])
+        endpoint = (method.group(1).lower() if method else None, match.group(1).rstrip("."))
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints
+
+def route_table(files: Dict[str, str]) -> List[Tuple[str, str, str]]:
+    """
+    Builds the (method, full_path, file_path) routes of a backend from its files. The routes of a
+    router are prefixed with the prefix of the router itself, as in `APIRouter(prefix=...)`, and
+    with the paths it is mounted on with `app.use(...)` or `app.include_router(..., prefix=...)`.
+    """
+    # Mount prefixes keyed by (file, router variable), or by (file, None) for every router of the file
+    prefixes = {}
+    for file_path, content in files.items():
+        imports = local_imports(file_path, content, files)
+        for prefix, required_path, name in MOUNT_PATTERN.findall(content):
+            target = resolve_import(file_path, required_path, files) if required_path else imports.get(name)
+            if target is not None:
+                prefixes.setdefault((target, None), []).append(prefix)
+        for router, arguments in INCLUDE_ROUTER_PATTERN.findall(content):
+            prefix = PREFIX_ARGUMENT_PATTERN.search(arguments)
+            module, _, attribute = router.rpartition(".")
+            if router in imports:
+                key = (imports[router], None)
+            elif module in imports:
+                key = (imports[module], attribute)
+            else:
+                key = (file_path, router)
+            prefixes.setdefault(key, []).append(prefix.group(1) if prefix else "")
+
+    routes = []
+    for file_path, content in files.items():
+        router_prefixes = dict(ROUTER_PREFIX_PATTERN.findall(content))
+        for router, method, path in ROUTE_PATTERN.findall(content):
+            router_prefix = router_prefixes.get(router, "")
+            # A router with a prefix can serve the prefix itself with an empty path
+            if not path.startswith("/") and (path or not router_prefix):
+                continue
+            for prefix in prefixes.get((file_path, router)) or prefixes.get((file_path, None)) or [""]:
+                routes.append((method, "/" + "/".join(_segments(prefix) + _segments(router_prefix) + _segments(path)), file_path))
+    return routes
+
+def _matches(route_segments, path_segments):
+    if len(route_segments) != len(path_segments):
+        return False
+    return all(
+        route_segment.startswith((":", "{", "<")) or route_segment == "*" or route_segment == path_segment
+        for route_segment, path_segment in zip(route_segments, path_segments)
+    )
+
+def match_route_files(routes, method, path) -> List[str]:
+    """Returns the files whose routes serve `path`, falling back to routes that end with it when the path has no prefix."""
+    path_segments = _segments(path)
+    candidates = [
+        (route_segments, file_path)
+        for route_method, route_path, file_path in routes
+        if method is None or route_method not in HTTP_METHODS or route_method == method
+        for route_segments in [_segments(route_path)]
+    ]
+    matched = [file_path for route_segments, file_path in candidates if _matches(route_segments, path_segments)]
+    if not matched and path_segments:
+        matched = [
+            file_path for route_segments, file_path in candidates
+            if len(route_segments) > len(path_segments) and _matches(route_segments[-len(path_segments):], path_segments)
+        ]
+    return list(dict.fromkeys(matched))
+
+def implicated_files(files: Dict[str, str], texts: List[str]) -> Dict[str, str]:
+    """
+    Maps the endpoints mentioned in `texts` (failing test cases and their results) to the files
+    that implement them: the router files that serve the endpoints and the local modules those
+    routers import, such as controllers and services. Returns an empty map when no endpoint matched.
+    """
+    routes = route_table(files)
+    route_files = []
+    for text in texts:
+        for method, path in extract_endpoints(text):
+            route_files.extend(match_route_files(routes, method, path))
+
+    implicated = list(dict.fromkeys(route_files))
+    for file_path in list(implicated):
+        for imported in local_imports(file_path, files[file_path], files).values():
+            if imported not in implicated:
+                implicated.append(imported)
+    return {file_path: files[file_path] for file_path in implicated}
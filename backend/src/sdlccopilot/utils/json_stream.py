@@ -0,0 +1,190 @@
+import json
+import re
+from langchain_core.exceptions import OutputParserException
+from src.sdlccopilot.logger import logging
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+CLOSERS = {"[": "]", "{": "}"}
+
+def strip_fences(text):
+    """Returns the content of the first ```json fence, or the text itself when it has none."""
+    match = CODE_FENCE_PATTERN.search(text)
+    return match.group(1) if match else text
+
+def _json_start(text):
+    starts = [index for index in (text.find("["), text.find("{")) if index != -1]
+    return min(starts) if starts else -1
+
+def repair_json(text):
+    """
+    Repairs the usual defects of LLM JSON: code fences and prose around the value, `"key"=value`
+    copied from the prompt templates, trailing commas, and a response cut off mid-value. A cut-off
+    response is truncated after the last value that closed and its open brackets are closed.
+    """
+    text = strip_fences(text)
+    start = _json_start(text)
+    if start == -1:
+        raise OutputParserException(f"No JSON value found in: {text[:200]}")
+    output, stack = [], []
+    # (output length, open brackets) after the last closed container, for truncated responses
+    last_complete = None
+    in_string = escaped = False
+    string_start = 0
+    for char in text[start:]:
+        if in_string:
+            output.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+            string_start = len(output)
+            output.append(char)
+        elif char in CLOSERS:
+            stack.append(char)
+            output.append(char)
+        elif char in "]}":
+            if not stack:
+                break
+            while output and output[-1] in " \t\r\n,":
+                output.pop()
+            output.append(CLOSERS[stack.pop()])
+            if not stack:
+                return "".join(output)
+            # Prefer the shallowest close, so a partially written item is dropped as a whole
+            if last_complete is None or len(stack) <= len(last_complete[1]):
+                last_complete = (len(output), list(stack))
+        elif char == "=" and "".join(output[-3:]).rstrip().endswith('"'):
+            output.append(":")
+        else:
+            output.append(char)
+
+    if in_string:
+        # A string cut off mid-way is dropped together with its key
+        output = output[:string_start]
+    if last_complete is None:
+        # Nothing closed yet: keep what was written and close it
+        cut, open_brackets = len(output), stack
+    else:
+        cut, open_brackets = last_complete
+    repaired = "".join(output[:cut]).rstrip(" \t\r\n,:")
+    if repaired.endswith('"') and last_complete is None and open_brackets and open_brackets[-1] == "{":
+        # Drop a dangling key with no value
+        repaired = repaired[:repaired.rfind('"', 0, len(repaired) - 1)].rstrip(" \t\r\n,")
+    return repaired + "".join(CLOSERS[bracket] for bracket in reversed(open_brackets))
+
+def parse_json(text):
+    """Parses LLM JSON output, falling back to `repair_json` when it is malformed."""
+    try:
+        return json.loads(strip_fences(text).strip())
+    except json.JSONDecodeError:
+        pass
+    repaired = repair_json(text)
+    try:
+        value = json.loads(repaired)
+    except json.JSONDecodeError as e:
+        raise OutputParserException(f"Invalid JSON output after repair: {str(e)}", llm_output=text)
+    logging.warning("Repaired malformed JSON output from the LLM")
+    return value
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of objects. `feed` returns every object of the
+    array as soon as its closing brace arrives, so callers can act on the items of a long response
+    before the rest of it has been generated. The array is the value of the top-level `key` of a
+    response object, or the response itself when the response is an array; arrays anywhere else,
+    such as {"meta": {"tags": [...]}}, are not streamed.
+    """
+    def __init__(self, key=None):
+        self.key = key
+        self.buffer = []
+        # The open brackets, and for each open object the last key read in it
+        self.stack = []
+        self.keys = []
+        self.array_depth = None
+        self.array_closed = False
+        self.item_start = None
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.last_string = None
+
+    def _is_target_array(self):
+        if self.array_depth is not None or self.array_closed:
+            return False
+        if not self.stack:
+            return True
+        return self.key is not None and self.stack == ["{"] and self.keys[0] == self.key
+
+    def feed(self, chunk):
+        items = []
+        for char in chunk:
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = "".join(self.buffer[self.string_start + 1:-1])
+                continue
+            if char == '"':
+                self.in_string = True
+                self.string_start = len(self.buffer) - 1
+            elif char == ":" and self.stack and self.stack[-1] == "{":
+                self.keys[-1] = self.last_string
+            elif char == "[":
+                target = self._is_target_array()
+                self.stack.append(char)
+                self.keys.append(None)
+                if target:
+                    self.array_depth = len(self.stack)
+            elif char == "{":
+                self.stack.append(char)
+                self.keys.append(None)
+                if self.array_depth is not None and len(self.stack) == self.array_depth + 1:
+                    self.item_start = len(self.buffer) - 1
+            elif char in "]}" and self.stack:
+                if char == "}" and self.item_start is not None and len(self.stack) == self.array_depth + 1:
+                    item = "".join(self.buffer[self.item_start:])
+                    self.item_start = None
+                    try:
+                        items.append(parse_json(item))
+                    except OutputParserException as e:
+                        logging.warning(f"Skipping a malformed streamed item: {str(e)}")
+                elif char == "]" and len(self.stack) == self.array_depth:
+                    self.array_depth = None
+                    self.array_closed = True
+                self.stack.pop()
+                self.keys.pop()
+        return items
+
+    def text(self):
+        return "".join(self.buffer)
+
+def stream_json_items(chain, inputs, list_field):
+    """
+    Streams `chain` (a prompt and chat model, without an output parser) and returns the parsed
+    response. The objects of its `list_field` array are parsed as soon as each one closes, so
+    when the full response cannot be parsed even after repair, the objects that did close are
+    returned instead of failing the whole generation.
+    """
+    parser = JsonArrayStreamParser(list_field)
+    items = []
+    for chunk in chain.stream(inputs):
+        content = chunk.content if isinstance(chunk.content, str) else "".join(
+            part.get("text", "") for part in chunk.content if isinstance(part, dict)
+        )
+        items.extend(parser.feed(content))
+    try:
+        return parse_json(parser.text())
+    except OutputParserException:
+        if not items:
+            raise
+        logging.warning(f"Using the {len(items)} {list_field} items that closed before the response broke off")
+        return items
@@ -0,0 +1,74 @@
+from pydantic import BaseModel
+
+# Compact, line-based encodings of the structured artifacts for use inside prompts. Each item is a
+# header line with its id and short fields, followed by indented lines for its longer fields, which
+# drops the quotes, field names and escapes of a Python repr or JSON dump.
+
+def _as_dict(item):
+    return item.model_dump() if isinstance(item, BaseModel) else dict(item)
+
+def _line(value):
+    return " ".join(str(value if value is not None else "").split())
+
+def _encode(items, encode_item, max_chars=None):
+    """
+    Joins the encoded items. With `max_chars`, whole items are dropped from the end to fit, and a
+    last line says how many were left out, instead of cutting an item in the middle.
+    """
+    encoded = [encode_item(_as_dict(item)) for item in items or []]
+    if max_chars is None:
+        return "\n".join(encoded)
+    kept, length = [], 0
+    for text in encoded:
+        if kept and length + len(text) + 1 > max_chars:
+            break
+        kept.append(text)
+        length += len(text) + 1
+    if len(kept) < len(encoded):
+        kept.append(f"... ({len(encoded) - len(kept)} more)")
+    return "\n".join(kept)
+
+def _user_story(story):
+    lines = [f"{story.get('story_id', '')} | {_line(story.get('title'))}", f"  {_line(story.get('description'))}"]
+    lines += [f"  - {_line(criterion)}" for criterion in story.get("acceptance_criteria") or []]
+    return "\n".join(lines)
+
+def encode_user_stories(user_stories, max_chars=None, titles_only=False):
+    """`US-001 | title`, then the description and one `- criterion` line per acceptance criterion."""
+    if titles_only:
+        return _encode(user_stories, lambda story: f"{story.get('story_id', '')} | {_line(story.get('title'))}", max_chars)
+    return _encode(user_stories, _user_story, max_chars)
+
+def _test_case(test_case):
+    lines = [f"{test_case.get('test_id', '')} [{test_case.get('status', '')}] {_line(test_case.get('description'))}"]
+    lines += [f"  {index}. {_line(step)}" for index, step in enumerate(test_case.get("steps") or [], start=1)]
+    return "\n".join(lines)
+
+def encode_test_cases(test_cases, max_chars=None):
+    """`TC001 [status] description`, then one numbered line per step."""
+    return _encode(test_cases, _test_case, max_chars)
+
+def _security_review(review):
+    return "\n".join([
+        f"{review.get('sec_id', '')} [{review.get('priority', '')}] {review.get('file_path', '')}",
+        f"  issue: {_line(review.get('review'))}",
+        f"  fix: {_line(review.get('recommendation'))}",
+    ])
+
+def encode_security_reviews(reviews, max_chars=None):
+    """`SR-001 [priority] file_path`, then the issue and the recommended fix."""
+    return _encode(reviews, _security_review, max_chars)
+
+def _test_result(result):
+    lines = [
+        f"{result.get('test_id', '')} {_line(result.get('status')).upper()} {_line(result.get('description'))}",
+        f"  expected: {_line(result.get('expected_result'))}",
+        f"  actual: {_line(result.get('actual_result'))}",
+    ]
+    if result.get("failure_reason"):
+        lines.append(f"  reason: {_line(result.get('failure_reason'))}")
+    return "\n".join(lines)
+
+def encode_test_results(test_results, max_chars=None):
+    """`TC001 PASS|FAIL description`, then the expected and actual result and the failure reason if any."""
+    return _encode(test_results, _test_result, max_chars)
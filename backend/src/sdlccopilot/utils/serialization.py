@@ -0,0 +1,31 @@
+import os
+import orjson
+from pydantic import BaseModel
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(data, sort_keys=False) -> bytes:
+    """
+    Serializes session data with orjson; pydantic models are dumped to dicts.
+    """
+    option = orjson.OPT_SORT_KEYS if sort_keys else None
+    return orjson.dumps(data, default=_default, option=option)
+
+def loads(raw):
+    return orjson.loads(raw)
+
+def model_json(model: BaseModel) -> bytes:
+    """
+    Serializes a response model straight through pydantic-core, without re-validating it.
+    Models built with `model_construct` may hold plain dicts for nested models, so the
+    type-mismatch warnings are disabled and those values are serialized as they are.
+    Outside production the model is validated once first, so a response that does not match
+    its model fails instead of being served as is.
+    """
+    if os.environ.get("PROJECT_ENVIRONMENT") != "production":
+        model = type(model).model_validate(dict(model))
+        return model.__pydantic_serializer__.to_json(model)
+    return model.__pydantic_serializer__.to_json(model, warnings=False)
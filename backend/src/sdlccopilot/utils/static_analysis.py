@@ -0,0 +1,230 @@
+import ast
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from src.sdlccopilot.states.security import SecurityReview
+
+PYTHON_EXTENSIONS = (".py",)
+SCRIPT_EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+STATIC_ANALYSIS_MAX_WORKERS = int(os.getenv("STATIC_ANALYSIS_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+SECRET_NAME_PATTERN = re.compile(r'(secret|passw(or)?d|api[_-]?key|access[_-]?key|private[_-]?key|token)', re.IGNORECASE)
+PLACEHOLDER_PATTERN = re.compile(r'^(your|change|replace|example|xxx|<|\$\{)', re.IGNORECASE)
+SQL_PATTERN = re.compile(r'\b(SELECT\s.+\sFROM|INSERT\s+INTO|UPDATE\s+\w+\s+SET|DELETE\s+FROM)\b', re.IGNORECASE)
+
+JS_SECRET_PATTERN = re.compile(
+    r'''\b(\w*(?:secret|passw(?:or)?d|api[_-]?key|access[_-]?key|private[_-]?key|token)\w*)['"]?\s*[:=]\s*(?:process\.env\.\w+\s*(?:\|\||\?\?)\s*)?(['"`])([^'"`\s]{8,})\2''',
+    re.IGNORECASE
+)
+JS_SQL_CONCAT_PATTERN = re.compile(
+    r'''(['"`])[^'"`\n]*\b(?:SELECT|INSERT\s+INTO|UPDATE|DELETE\s+FROM)\b[^'"`\n]*(?:\1\s*\+|\$\{)''',
+    re.IGNORECASE
+)
+JS_CORS_PATTERNS = [
+    re.compile(r'\bcors\(\s*\)'),
+    re.compile(r'''\borigin\s*:\s*(['"])\*\1'''),
+    re.compile(r'''\borigin\s*:\s*true\b'''),
+    re.compile(r'''Access-Control-Allow-Origin['"]\s*,\s*['"]\*['"]'''),
+]
+JS_ROUTE_PATTERN = re.compile(r'\b(?:app|router)\.(?:post|put|patch)\s*\(')
+JS_VALIDATION_PATTERN = re.compile(r'express-validator|validationResult|\bJoi\b|\bzod\b|\.safeParse\(|\.validate\(|\bcelebrate\b')
+# Path parameters of a route template: {user_id} in FastAPI, <user_id> or <int:user_id> in Flask
+PATH_PARAMETER_PATTERN = re.compile(r'\{(\w+)(?::[^}]*)?\}|<(?:\w+:)?(\w+)>')
+
+def _line_of(content, index):
+    return content.count("\n", 0, index) + 1
+
+def _review(file_path, line, review, recommendation, priority):
+    return SecurityReview(
+        sec_id="SA-000",
+        review=f"{review} (line {line})",
+        file_path=file_path,
+        recommendation=recommendation,
+        priority=priority
+    )
+
+def _hard_coded_secret(file_path, line, name):
+    return _review(
+        file_path, line,
+        f"`{name}` is assigned a hard-coded secret value. Anyone with access to the source or the built bundle can read it and use it to forge tokens or access the protected service.",
+        "Load the value from an environment variable or a secret manager and fail fast at startup when it is missing; rotate the exposed secret.",
+        "high"
+    )
+
+def _sql_concatenation(file_path, line):
+    return _review(
+        file_path, line,
+        "A SQL statement is built by concatenating or interpolating values into the query string, which allows SQL injection when any of those values come from user input.",
+        "Use parameterized queries or the ORM query builder and pass user values as bound parameters.",
+        "high"
+    )
+
+def _permissive_cors(file_path, line):
+    return _review(
+        file_path, line,
+        "CORS is configured to accept any origin, so any website can issue authenticated cross-origin requests to this API from a victim's browser.",
+        "Restrict the allowed origins to the known frontend domains, loaded from configuration.",
+        "medium"
+    )
+
+def _missing_validation(file_path, line, handler):
+    return _review(
+        file_path, line,
+        f"{handler} reads the request body without validating it against a schema, so malformed or malicious input such as unexpected types, oversized values or extra fields reaches the business logic and the database.",
+        "Validate the request body with a schema (a typed Pydantic model, Joi, zod or express-validator) and reject requests that do not match it.",
+        "medium"
+    )
+
+def _is_secret_literal(name, value):
+    return (
+        isinstance(value, str)
+        and SECRET_NAME_PATTERN.search(name or '') is not None
+        and len(value) >= 8
+        and not PLACEHOLDER_PATTERN.match(value)
+    )
+
+def _target_name(target):
+    if isinstance(target, ast.Name):
+        return target.id
+    if isinstance(target, ast.Attribute):
+        return target.attr
+    return None
+
+def _path_parameters(decorator):
+    """The names a route decorator binds from its path template."""
+    templates = [arg.value for arg in decorator.args[:1] if isinstance(arg, ast.Constant) and isinstance(arg.value, str)]
+    templates += [
+        keyword.value.value for keyword in decorator.keywords
+        if keyword.arg in ("path", "rule") and isinstance(keyword.value, ast.Constant) and isinstance(keyword.value.value, str)
+    ]
+    return {name for template in templates for match in PATH_PARAMETER_PATTERN.finditer(template) for name in match.groups() if name}
+
+def _analyze_python(file_path, content) -> Tuple[List[SecurityReview], bool]:
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return [], True
+
+    reviews = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            for target in node.targets:
+                name = _target_name(target)
+                if _is_secret_literal(name, node.value.value):
+                    reviews.append(_hard_coded_secret(file_path, node.lineno, name))
+        elif isinstance(node, ast.keyword) and isinstance(node.value, ast.Constant):
+            if _is_secret_literal(node.arg, node.value.value):
+                reviews.append(_hard_coded_secret(file_path, node.value.lineno, node.arg))
+            if node.arg == "allow_origins" and node.value.value == "*":
+                reviews.append(_permissive_cors(file_path, node.value.lineno))
+        elif isinstance(node, ast.keyword) and node.arg == "allow_origins" and isinstance(node.value, (ast.List, ast.Tuple)):
+            if any(isinstance(item, ast.Constant) and item.value == "*" for item in node.value.elts):
+                reviews.append(_permissive_cors(file_path, node.value.lineno))
+        elif isinstance(node, ast.JoinedStr):
+            literal = "".join(part.value for part in node.values if isinstance(part, ast.Constant))
+            if SQL_PATTERN.search(literal) and any(isinstance(part, ast.FormattedValue) for part in node.values):
+                reviews.append(_sql_concatenation(file_path, node.lineno))
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+            if isinstance(node.left, ast.Constant) and isinstance(node.left.value, str) and SQL_PATTERN.search(node.left.value):
+                reviews.append(_sql_concatenation(file_path, node.lineno))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format":
+            base = node.func.value
+            if isinstance(base, ast.Constant) and isinstance(base.value, str) and SQL_PATTERN.search(base.value):
+                reviews.append(_sql_concatenation(file_path, node.lineno))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            # Request handlers that read raw request bodies or take untyped or dict inputs
+            routes = [
+                decorator for decorator in node.decorator_list
+                if isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)
+                and decorator.func.attr in ("post", "put", "patch", "route")
+            ]
+            if not routes:
+                continue
+            source = ast.get_source_segment(content, node) or ''
+            # Arguments bound from the path template are converted and validated by the router
+            path_parameters = set().union(*(_path_parameters(decorator) for decorator in routes)) | {"self", "cls"}
+            untyped = any(
+                arg.annotation is None or (isinstance(arg.annotation, ast.Name) and arg.annotation.id in ("dict", "Dict", "Any"))
+                for arg in node.args.args if arg.arg not in path_parameters
+            )
+            if untyped or re.search(r'request\.(json|get_json|form|args)\b', source):
+                reviews.append(_missing_validation(file_path, node.lineno, f"The request handler `{node.name}`"))
+    return reviews, False
+
+def _analyze_script(file_path, content) -> Tuple[List[SecurityReview], bool]:
+    reviews = []
+    for match in JS_SECRET_PATTERN.finditer(content):
+        if not PLACEHOLDER_PATTERN.match(match.group(3)):
+            reviews.append(_hard_coded_secret(file_path, _line_of(content, match.start()), match.group(1)))
+    for match in JS_SQL_CONCAT_PATTERN.finditer(content):
+        reviews.append(_sql_concatenation(file_path, _line_of(content, match.start())))
+    for pattern in JS_CORS_PATTERNS:
+        for match in pattern.finditer(content):
+            reviews.append(_permissive_cors(file_path, _line_of(content, match.start())))
+    if JS_ROUTE_PATTERN.search(content) is not None and "req.body" in content and JS_VALIDATION_PATTERN.search(content) is None:
+        reviews.append(_missing_validation(file_path, _line_of(content, content.index("req.body")), "A route handler"))
+    return reviews, False
+
+def analyze_file(file_path, content) -> Tuple[List[SecurityReview], bool]:
+    """
+    Runs the local security rules over a single file.
+    Returns the definite findings and whether the rules were inconclusive for the file,
+    because it does not parse or because its language is not covered.
+    """
+    if file_path.endswith(PYTHON_EXTENSIONS):
+        return _analyze_python(file_path, content)
+    if file_path.endswith(SCRIPT_EXTENSIONS):
+        return _analyze_script(file_path, content)
+    return [], True
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def start_process_pool(max_workers=STATIC_ANALYSIS_MAX_WORKERS):
+    """
+    Starts the process pool shared by every analysis. It is started from the application's
+    startup, and its workers are spawned there rather than on first use from a request thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None and max_workers > 1:
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pool.submit(os.getpid).result()
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def static_security_analysis(files: Dict[str, str], max_workers=STATIC_ANALYSIS_MAX_WORKERS) -> Tuple[List[SecurityReview], Dict[str, str]]:
+    """
+    Analyzes a {file_path: content} map across the shared process pool, or in this process
+    when the pool is not running.
+    Returns the definite security reviews and the files that should still be reviewed by the LLM:
+    the rules only cover a few vulnerability classes, so every file without a definite finding,
+    and every file the rules could not analyze, still gets an LLM review.
+    """
+    if not files:
+        return [], {}
+    file_paths = list(files.keys())
+    contents = list(files.values())
+    workers = max(1, min(max_workers, len(file_paths)))
+    pool = _pool
+    if workers == 1 or pool is None:
+        results = list(map(analyze_file, file_paths, contents))
+    else:
+        results = list(pool.map(analyze_file, file_paths, contents, chunksize=max(1, len(file_paths) // (workers * 4))))
+
+    reviews = []
+    review_files = {}
+    for file_path, (file_reviews, ambiguous) in zip(file_paths, results):
+        for review in file_reviews:
+            review.sec_id = f"SA-{len(reviews) + 1:03d}"
+            reviews.append(review)
+        if ambiguous or not file_reviews:
+            review_files[file_path] = files[file_path]
+    return reviews, review_files
@@ -0,0 +1,96 @@
+import fakeredis
+from typing import TypedDict
+from langgraph.graph import StateGraph, START, END
+from src.sdlccopilot.checkpointer import PHASE_STATUS_CHANNELS, RetentionMemorySaver
+
+class PhaseState(TypedDict):
+    user_story_status: str
+    step: int
+
+def _run_steps(checkpointer, statuses, thread_id="session"):
+    """Runs a one-node graph once per status, leaving one checkpoint per step on the thread."""
+    builder = StateGraph(PhaseState)
+    builder.add_node("advance", lambda state: {"step": state.get("step", 0) + 1})
+    builder.add_edge(START, "advance")
+    builder.add_edge("advance", END)
+    graph = builder.compile(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": thread_id}}
+    for status in statuses:
+        graph.invoke({"user_story_status": status}, config)
+    return graph, config
+
+def _checkpoint_count(checkpointer, thread_id="session"):
+    return sum(len(checkpoints) for checkpoints in checkpointer.storage[thread_id].values())
+
+def test_prune_thread_keeps_the_latest_checkpoints_and_the_approval():
+    checkpointer = RetentionMemorySaver(keep_latest=2)
+    graph, config = _run_steps(checkpointer, ["pending", "feedback", "approved", "approved", "approved"])
+    before = _checkpoint_count(checkpointer)
+
+    dropped = checkpointer.prune_thread("session")
+
+    assert dropped > 0 and _checkpoint_count(checkpointer) == before - dropped
+    # The two latest checkpoints, and the first one where the user stories were approved
+    assert [snapshot.values for snapshot in graph.get_state_history(config)] == [
+        {"user_story_status": "approved", "step": 5},
+        {"user_story_status": "approved", "step": 4},
+        {"user_story_status": "approved", "step": 2},
+    ]
+
+def test_prune_thread_drops_blobs_no_checkpoint_references():
+    checkpointer = RetentionMemorySaver(keep_latest=1)
+    _run_steps(checkpointer, ["pending", "feedback", "feedback"])
+    checkpointer.prune_thread("session")
+    referenced = set()
+    for saved in checkpointer.storage["session"][""].values():
+        referenced.update(checkpointer.serde.loads_typed(saved[0])["channel_versions"].items())
+    assert {(key[2], key[3]) for key in checkpointer.blobs if key[0] == "session"} <= referenced
+
+def test_collect_garbage_expires_idle_threads():
+    checkpointer = RetentionMemorySaver(ttl=-1)
+    _run_steps(checkpointer, ["pending"])
+    assert checkpointer.collect_garbage()[0] == 1
+    assert "session" not in checkpointer.storage
+
+def _interrupted_graph(checkpointer):
+    builder = StateGraph(PhaseState)
+    builder.add_node("generate", lambda state: {"step": state.get("step", 0) + 1})
+    builder.add_node("review", lambda state: {"user_story_status": "approved"})
+    builder.add_edge(START, "generate")
+    builder.add_edge("generate", "review")
+    builder.add_edge("review", END)
+    return builder.compile(checkpointer=checkpointer, interrupt_before=["review"])
+
+def test_persisted_thread_resumes_in_a_new_process():
+    redis = fakeredis.FakeRedis()
+    config = {"configurable": {"thread_id": "session"}}
+    before_restart = RetentionMemorySaver()
+    before_restart.configure(redis)
+    _interrupted_graph(before_restart).invoke({"user_story_status": "pending"}, config)
+
+    after_restart = RetentionMemorySaver()
+    after_restart.configure(redis)
+    graph = _interrupted_graph(after_restart)
+    assert graph.get_state(config).next == ("review",)
+    assert graph.invoke(None, config) == {"user_story_status": "approved", "step": 1}
+
+def test_pruned_checkpoints_are_deleted_from_redis():
+    redis = fakeredis.FakeRedis()
+    checkpointer = RetentionMemorySaver(keep_latest=1)
+    checkpointer.configure(redis)
+    _run_steps(checkpointer, ["pending", "feedback", "feedback"])
+    checkpointer.prune_thread("session")
+
+    reloaded = RetentionMemorySaver()
+    reloaded.configure(redis)
+    reloaded._load_thread("session")
+    assert reloaded.storage["session"] == checkpointer.storage["session"]
+    assert reloaded.blobs == checkpointer.blobs
+
+    checkpointer.delete_thread("session")
+    assert not redis.exists("checkpoints:session")
+
+def test_phase_status_channels_cover_every_approved_phase():
+    assert "qa_fixes_status" in PHASE_STATUS_CHANNELS and "deployment_status" in PHASE_STATUS_CHANNELS
+    # QA testing passes or fails, it is never approved
+    assert "qa_testing_status" not in PHASE_STATUS_CHANNELS
@@ -0,0 +1,58 @@
+import json
+import re
+import pytest
+from langchain_core.messages import AIMessageChunk
+from src.sdlccopilot.helpers.code import CodeHelper, _file_content
+
+MANIFEST = {
+    "files": [
+        {"path": "src/a.js", "purpose": "entry point", "exports": []},
+        {"path": "src/b.js", "purpose": "helpers", "exports": ["add"]},
+    ],
+    "routes": [],
+}
+
+class StubFileLLM:
+    """Streams the scripted (text, finish_reason) responses of each file, in the order they are requested."""
+    def __init__(self, responses):
+        self.responses = {file_path: list(scripted) for file_path, scripted in responses.items()}
+        self.queries = []
+
+    def stream(self, messages, config=None, **kwargs):
+        query = messages[-1].content
+        self.queries.append(query)
+        file_path = json.loads(re.search(r"FILE TO WRITE:\n(\{.*\})", query).group(1))["path"]
+        text, reason = self.responses[file_path].pop(0)
+        yield AIMessageChunk(content=text, response_metadata={"finish_reason": reason})
+
+def test_file_content_of_a_complete_action():
+    assert _file_content('<boltAction type="file" filePath="src/a.js">const a = 1</boltAction>', "src/a.js") == "const a = 1"
+
+def test_file_content_drops_the_opening_tag_of_an_unclosed_action():
+    assert _file_content('<boltAction type="file" filePath="src/a.js">const a = 1;\nconst b', "src/a.js") == "const a = 1;\nconst b"
+
+def test_file_content_of_a_code_block():
+    assert _file_content("```js\nconst a = 1\n```", "src/a.js") == "const a = 1\n"
+
+def test_truncated_file_is_continued_before_it_is_assembled():
+    llm = StubFileLLM({
+        "src/a.js": [('<boltAction type="file" filePath="src/a.js">const a = require("./b")\nconsole.log(a.ad', "length"), ('d(1, 2))\n</boltAction>', "stop")],
+        "src/b.js": [('<boltAction type="file" filePath="src/b.js">exports.add = (x, y) => x + y\n</boltAction>', "stop")],
+    })
+    files = CodeHelper(llm)._generate_files("system", MANIFEST, "context", ["src/a.js", "src/b.js"])
+    assert files == {"src/a.js": 'const a = require("./b")\nconsole.log(a.add(1, 2))\n', "src/b.js": "exports.add = (x, y) => x + y\n"}
+    assert sum("CUT OFF AT THE OUTPUT LIMIT" in query for query in llm.queries) == 1
+
+def test_file_still_truncated_after_the_continuations_fails_the_generation():
+    llm = StubFileLLM({
+        "src/a.js": [('<boltAction type="file" filePath="src/a.js">const a', "length")] + [(" = 1", "length")] * 3,
+        "src/b.js": [('<boltAction type="file" filePath="src/b.js">exports.add = 1</boltAction>', "stop")],
+    })
+    with pytest.raises(RuntimeError, match=r"src/a\.js"):
+        CodeHelper(llm)._generate_files("system", MANIFEST, "context", ["src/a.js", "src/b.js"])
+
+def test_planned_code_falls_back_to_one_artifact_when_a_file_stays_truncated(monkeypatch):
+    helper = CodeHelper(StubFileLLM({"src/a.js": [("const a", "length")] * 4, "src/b.js": [("exports.add = 1", "stop")]}))
+    monkeypatch.setattr(helper, "plan_code_from_llm", lambda project_type, context: MANIFEST)
+    monkeypatch.setattr(helper, "generate_backend_code_from_llm", lambda *args: "<boltArtifact>single call</boltArtifact>")
+    assert helper.generate_planned_backend_code_from_llm([]) == "<boltArtifact>single call</boltArtifact>"
@@ -0,0 +1,45 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from src.sdlccopilot.compression import CompressionMiddleware, encoding_etag, identity_etag, merge_vary, negotiate_encoding
+
+def test_merge_vary_keeps_the_existing_fields():
+    headers = [(b"content-type", b"application/json"), (b"vary", b"Origin")]
+    assert merge_vary(headers) == [(b"content-type", b"application/json"), (b"vary", b"Origin, Accept-Encoding")]
+
+def test_merge_vary_joins_several_vary_headers_without_duplicates():
+    headers = [(b"vary", b"Origin"), (b"Vary", b"accept-encoding, Cookie")]
+    assert merge_vary(headers) == [(b"vary", b"Origin, accept-encoding, Cookie")]
+
+def test_merge_vary_leaves_a_wildcard_alone():
+    assert merge_vary([(b"vary", b"*")]) == [(b"vary", b"*")]
+
+def test_negotiate_encoding_skips_rejected_encodings():
+    assert negotiate_encoding([(b"accept-encoding", b"gzip;q=0, identity")]) is None
+    assert negotiate_encoding([(b"accept-encoding", b"deflate, gzip")]) == "gzip"
+
+def test_encoding_etag_round_trips_through_identity_etag():
+    assert encoding_etag(b'"abc"', "gzip") == b'"abc-gzip"'
+    assert encoding_etag(b'W/"abc"', "br") == b'W/"abc-br"'
+    assert identity_etag(' W/"abc-gzip"') == identity_etag('"abc-br"') == identity_etag('"abc"') == '"abc"'
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+    @app.get("/artifact")
+    def artifact(request: Request):
+        if identity_etag(request.headers.get("if-none-match", "")) == '"abc"':
+            return Response(status_code=304, headers={"ETag": '"abc"'})
+        return Response(content=b"x" * 100, headers={"ETag": '"abc"'})
+    return TestClient(app)
+
+def test_compressed_and_identity_responses_have_different_etags():
+    client = _client()
+    compressed = client.get("/artifact", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/artifact", headers={"Accept-Encoding": "identity"})
+    assert compressed.headers["content-encoding"] == "gzip" and compressed.headers["etag"] == '"abc-gzip"'
+    assert "content-encoding" not in identity.headers and identity.headers["etag"] == '"abc"'
+    # A revalidation answers with the ETag of the representation the client holds
+    revalidated = client.get("/artifact", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abc-gzip"'})
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == '"abc-gzip"'
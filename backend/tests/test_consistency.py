@@ -0,0 +1,55 @@
+import json
+from src.sdlccopilot.utils.consistency import check_bolt_files
+from src.sdlccopilot.utils.endpoints import route_table
+
+NODE_FILES = {
+    "package.json": json.dumps({"dependencies": {"express": "^4.18.0"}}),
+    "server.js": "import express from 'express'\nimport authRoutes from './routes/auth.js'\nconst app = express()\napp.use('/api/auth', authRoutes)\n",
+    "routes/auth.js": "import express from 'express'\nimport { login } from '../controllers/auth.js'\nconst router = express.Router()\nrouter.post('/login', login)\nexport default router\n",
+    "controllers/auth.js": "import jwt from 'jsonwebtoken'\nexport const login = (req, res) => res.json({})\n",
+}
+
+FASTAPI_FILES = {
+    "app/__init__.py": "",
+    "app/main.py": "from fastapi import FastAPI\nfrom app.routes import auth\nfrom app.routes.items import router as items_router\nfrom .database import engine\n\napp = FastAPI()\napp.include_router(auth.router, prefix=\"/api\")\napp.include_router(items_router)\n\n@app.get(\"/health\")\ndef health():\n    return {}\n",
+    "app/database.py": "engine = None\n",
+    "app/routes/__init__.py": "",
+    "app/routes/auth.py": "from fastapi import APIRouter\nfrom ..database import engine\n\nrouter = APIRouter(\n    prefix=\"/auth\",\n    tags=[\"auth\"],\n)\n\n@router.post(\"/login\")\ndef login():\n    return {}\n",
+    "app/routes/items.py": "from fastapi import APIRouter\nfrom app import database\n\nrouter = APIRouter(prefix=\"/api/items\")\n\n@router.get(\"\")\ndef list_items():\n    return []\n\n@router.get(\"/{item_id}\")\ndef get_item(item_id: int):\n    return {}\n",
+}
+
+def test_check_bolt_files_reports_unresolved_imports_and_undeclared_packages():
+    files = {**NODE_FILES, "server.js": NODE_FILES["server.js"] + "import { db } from './db.js'\n"}
+    issues = check_bolt_files(files)
+    assert issues["server.js"] == ["imports './db.js', which is not a file of the project"]
+    assert issues["package.json"] == ["does not declare the imported packages ['jsonwebtoken']"]
+
+def test_check_bolt_files_reports_contract_routes_nobody_serves():
+    routes = [
+        {"method": "POST", "path": "/api/auth/login", "file": "routes/auth.js"},
+        {"method": "POST", "path": "/api/auth/logout", "file": "routes/auth.js"},
+    ]
+    issues = check_bolt_files(NODE_FILES, routes)
+    assert issues["routes/auth.js"] == ["does not serve the contract route POST /api/auth/logout"]
+
+def test_route_table_applies_router_and_include_prefixes():
+    assert sorted(route_table(FASTAPI_FILES)) == [
+        ("get", "/api/items", "app/routes/items.py"),
+        ("get", "/api/items/{item_id}", "app/routes/items.py"),
+        ("get", "/health", "app/main.py"),
+        ("post", "/api/auth/login", "app/routes/auth.py"),
+    ]
+
+def test_check_bolt_files_accepts_a_consistent_fastapi_backend():
+    routes = [
+        {"method": "POST", "path": "/api/auth/login", "file": "app/routes/auth.py"},
+        {"method": "GET", "path": "/api/items/{item_id}", "file": "app/routes/items.py"},
+    ]
+    assert check_bolt_files(FASTAPI_FILES, routes) == {}
+
+def test_check_bolt_files_reports_unresolved_python_modules():
+    files = {**FASTAPI_FILES, "app/routes/auth.py": "from app.services.auth import verify\nfrom ..schemas import User, Token\n" + FASTAPI_FILES["app/routes/auth.py"]}
+    assert check_bolt_files(files)["app/routes/auth.py"] == [
+        "imports 'app.services.auth', which is not a module of the project",
+        "imports '..schemas', which is not a module of the project",
+    ]
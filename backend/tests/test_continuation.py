@@ -0,0 +1,81 @@
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+from src.sdlccopilot.llms.continuation import is_truncated, invoke_with_continuation, batch_with_continuation
+
+class StubChain:
+    """Returns one scripted (text, finish_reason) response per call, or streams it in two chunks."""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.queries = []
+
+    def invoke(self, inputs):
+        self.queries.append(inputs["human_query"])
+        text, reason = self.responses.pop(0)
+        return AIMessage(content=text, response_metadata={"finish_reason": reason})
+
+    def stream(self, inputs):
+        self.queries.append(inputs["human_query"])
+        text, reason = self.responses.pop(0)
+        middle = len(text) // 2
+        yield AIMessageChunk(content=text[:middle])
+        yield AIMessageChunk(content=text[middle:], response_metadata={"finish_reason": reason})
+
+def _action(path, content):
+    return f'<boltAction type="file" filePath="{path}">{content}</boltAction>'
+
+INPUTS = {"system_prompt": "Write the code", "human_query": "Build the backend"}
+
+def test_is_truncated():
+    assert is_truncated("anything", "length", "document")
+    assert is_truncated("anything", "max_tokens", "artifact")
+    assert not is_truncated("<boltArtifact>done</boltArtifact>", "stop", "artifact")
+    assert is_truncated('<boltArtifact id="x">' + _action("a.js", "1"), "stop", "artifact")
+    assert not is_truncated("# Title\nno artifact", "stop", "document")
+
+def test_complete_output_is_returned_as_is():
+    chain = StubChain([("# Document\n\ncomplete", "stop")])
+    assert invoke_with_continuation(chain, INPUTS, "document") == "# Document\n\ncomplete"
+    assert len(chain.queries) == 1
+
+def test_cut_off_artifact_is_stitched_after_its_last_complete_file():
+    first = '<boltArtifact id="app">' + _action("a.js", "const a = 1") + '<boltAction type="file" filePath="b.js">const b'
+    second = _action("a.js", "rewritten") + _action("b.js", "const b = 2") + "</boltArtifact>"
+    chain = StubChain([(first, "length"), (second, "stop")])
+    content = invoke_with_continuation(chain, INPUTS, "artifact")
+    assert content == '<boltArtifact id="app">' + _action("a.js", "const a = 1") + "\n" + _action("b.js", "const b = 2") + "</boltArtifact>"
+    assert "These files are complete, do not write them again: a.js" in chain.queries[1]
+
+def test_cut_off_document_is_continued_from_its_last_section():
+    first = "# Document\n\n## 1. Overview\nThe app.\n\n## 2. Features\nLog"
+    second = "Sure!\n## 2. Features\nLogin and payments.\n"
+    chain = StubChain([(first, "length"), (second, "stop")])
+    content = invoke_with_continuation(chain, INPUTS, "document")
+    assert content == "# Document\n\n## 1. Overview\nThe app.\n\n## 2. Features\nLogin and payments.\n"
+    assert "Start directly with the heading ## 2. Features" in chain.queries[1]
+
+def test_artifact_still_cut_off_after_the_last_continuation_is_closed():
+    first = '<boltArtifact id="app">' + _action("a.js", "1") + '<boltAction type="file" filePath="b.js">'
+    chain = StubChain([(first, "length")])
+    content = invoke_with_continuation(chain, INPUTS, "artifact", max_continuations=0)
+    assert content == '<boltArtifact id="app">' + _action("a.js", "1") + "\n</boltArtifact>"
+
+def test_cut_off_file_is_continued_where_it_stopped():
+    chain = StubChain([('<boltAction type="file" filePath="a.py"># Models\nclass User:\n    na', "length"), ("me = None\n</boltAction>", "stop")])
+    content = invoke_with_continuation(chain, INPUTS, "file")
+    assert content == '<boltAction type="file" filePath="a.py"># Models\nclass User:\n    name = None\n</boltAction>'
+    assert "Continue the file exactly where the response stopped" in chain.queries[1]
+
+def test_file_still_cut_off_after_the_last_continuation_raises():
+    chain = StubChain([("const a", "length"), (" = 1", "length")])
+    with pytest.raises(RuntimeError):
+        invoke_with_continuation(chain, INPUTS, "file", max_continuations=1)
+
+def test_batch_with_continuation_keeps_the_order_and_the_failures():
+    class FailingChain:
+        def stream(self, inputs):
+            if inputs["human_query"] == "fail":
+                raise ValueError("provider error")
+            yield AIMessageChunk(content=inputs["human_query"].upper(), response_metadata={"finish_reason": "stop"})
+
+    results = batch_with_continuation(FailingChain(), [{"system_prompt": "", "human_query": query} for query in ("a", "fail", "c")], "document", 2)
+    assert results[0] == "A" and isinstance(results[1], ValueError) and results[2] == "C"
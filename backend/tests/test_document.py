@@ -0,0 +1,34 @@
+import json
+import re
+from langchain_core.messages import AIMessage
+from src.sdlccopilot.helpers.document import DocumentHelper, split_major_sections
+from src.sdlccopilot.prompts.document import FUNCTIONAL_DOCUMENT_SECTIONS
+
+STORIES = [{"story_id": "US-001", "title": "Login", "description": "As a user I want to log in", "acceptance_criteria": []}]
+
+def test_split_major_sections():
+    document = "**1. INTRODUCTION**\nIntro.\n\n**2. SCOPE**\nScope.\n### 2.1 Detail\nMore."
+    assert split_major_sections(document) == {1: "**1. INTRODUCTION**\nIntro.", 2: "**2. SCOPE**\nScope.\n### 2.1 Detail\nMore."}
+
+def _section_llm(queries):
+    """Outlines the document, and cuts off the first response for section 4 at the output-token limit."""
+    def llm(prompt):
+        query = prompt.to_string()
+        queries.append(query)
+        if "Major sections:" in query:
+            return AIMessage(content=json.dumps({heading.split(".")[0]: ["point"] for heading, _, _ in FUNCTIONAL_DOCUMENT_SECTIONS}))
+        heading = re.search(r"Write only section (.+?), starting", query).group(1)
+        if heading.startswith("4.") and "CUT OFF AT THE OUTPUT LIMIT" not in query:
+            return AIMessage(content=f"**{heading}**\nFR-1 Login: the user logs in wi", response_metadata={"finish_reason": "length"})
+        if heading.startswith("4."):
+            return AIMessage(content="th a password.", response_metadata={"finish_reason": "stop"})
+        return AIMessage(content=f"**{heading}**\nContent of {heading.split('.')[0]}.", response_metadata={"finish_reason": "stop"})
+    return llm
+
+def test_cut_off_section_is_continued_before_it_is_joined():
+    queries = []
+    document = DocumentHelper(_section_llm(queries)).generate_functional_document_in_sections_from_llm(STORIES)
+    sections = split_major_sections(document)
+    assert list(sections) == list(range(1, len(FUNCTIONAL_DOCUMENT_SECTIONS) + 1))
+    assert sections[4] == "**4. SPECIFIC FUNCTIONAL REQUIREMENTS**\nFR-1 Login: the user logs in with a password."
+    assert sum("CUT OFF AT THE OUTPUT LIMIT" in query for query in queries) == 1
@@ -0,0 +1,29 @@
+from src.sdlccopilot.utils.endpoints import extract_endpoints, route_table, match_route_files, implicated_files
+
+FILES = {
+    "server.js": "import authRoutes from './routes/auth.js'\nconst payRoutes = require('./routes/pay')\napp.use('/api/auth', authRoutes)\napp.use('/api/pay', payRoutes)\napp.get('/health', health)\n",
+    "routes/auth.js": "import { login } from '../controllers/auth.js'\nrouter.post('/login', login)\nrouter.get('/users/:id', getUser)\n",
+    "routes/pay.js": "router.post('/', pay)\n",
+    "controllers/auth.js": "export const login = (req, res) => res.json({})\n",
+}
+
+def test_extract_endpoints_reads_the_method_before_the_path():
+    assert extract_endpoints("Send POST request to /api/auth/login. Then open /health") == [("post", "/api/auth/login"), (None, "/health")]
+
+def test_route_table_prefixes_mounted_routers():
+    assert sorted(route_table(FILES)) == [
+        ("get", "/api/auth/users/:id", "routes/auth.js"),
+        ("get", "/health", "server.js"),
+        ("post", "/api/auth/login", "routes/auth.js"),
+        ("post", "/api/pay", "routes/pay.js"),
+    ]
+
+def test_match_route_files_matches_parameters_and_unprefixed_paths():
+    routes = route_table(FILES)
+    assert match_route_files(routes, "get", "/api/auth/users/42") == ["routes/auth.js"]
+    assert match_route_files(routes, None, "/login") == ["routes/auth.js"]
+    assert match_route_files(routes, "delete", "/api/auth/login") == []
+
+def test_implicated_files_adds_the_modules_the_routers_import():
+    assert list(implicated_files(FILES, ["TC001 POST /api/auth/login returned 500"])) == ["routes/auth.js", "controllers/auth.js"]
+    assert implicated_files(FILES, ["the page looks wrong"]) == {}
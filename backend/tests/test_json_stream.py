@@ -0,0 +1,69 @@
+import json
+import pytest
+from langchain_core.exceptions import OutputParserException
+from src.sdlccopilot.utils.json_stream import repair_json, parse_json, JsonArrayStreamParser
+
+def test_repair_json_strips_fences_and_prose():
+    text = 'Here are the stories:\n```json\n[{"title": "Login"}]\n```\nLet me know!'
+    assert json.loads(repair_json(text)) == [{"title": "Login"}]
+
+def test_repair_json_drops_trailing_commas():
+    assert json.loads(repair_json('{"items": [1, 2, 3,], "done": true,}')) == {"items": [1, 2, 3], "done": True}
+
+def test_repair_json_replaces_equals_after_key():
+    assert json.loads(repair_json('{"title"="Login", "priority" = "high"}')) == {"title": "Login", "priority": "high"}
+
+def test_repair_json_keeps_brackets_inside_strings():
+    assert json.loads(repair_json('[{"description": "uses [brackets] and {braces}", "ok": 1}]')) == [
+        {"description": "uses [brackets] and {braces}", "ok": 1}
+    ]
+
+def test_repair_json_drops_the_item_cut_off_mid_way():
+    text = '{"user_stories": [{"story_id": "US-001", "title": "Login"}, {"story_id": "US-002", "title": "Sig'
+    assert json.loads(repair_json(text)) == {"user_stories": [{"story_id": "US-001", "title": "Login"}]}
+
+def test_repair_json_closes_an_output_with_nothing_closed():
+    assert json.loads(repair_json('{"summary": "all good", "total"')) == {"summary": "all good"}
+
+def test_repair_json_without_json_raises():
+    with pytest.raises(OutputParserException):
+        repair_json("no json here")
+
+def test_parse_json_parses_valid_json_as_is():
+    assert parse_json('```json\n{"a": [1]}\n```') == {"a": [1]}
+
+def test_parse_json_repairs_malformed_json():
+    assert parse_json('[{"a": 1}, {"a": 2},]') == [{"a": 1}, {"a": 2}]
+
+def _feed_in_chunks(parser, text, size=7):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return items
+
+def test_stream_parser_yields_the_items_of_a_root_array():
+    text = '[{"id": 1, "tags": ["a", "b"]}, {"id": 2, "note": "a } in a string"}]'
+    assert _feed_in_chunks(JsonArrayStreamParser(), text) == [{"id": 1, "tags": ["a", "b"]}, {"id": 2, "note": "a } in a string"}]
+
+def test_stream_parser_yields_each_item_as_soon_as_it_closes():
+    parser = JsonArrayStreamParser()
+    assert parser.feed('[{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(': 2}]') == [{"id": 2}]
+
+def test_stream_parser_follows_the_requested_key():
+    text = '{"summary": {"total": 2}, "test_results": [{"test_id": "TC001"}, {"test_id": "TC002"}]}'
+    assert _feed_in_chunks(JsonArrayStreamParser("test_results"), text) == [{"test_id": "TC001"}, {"test_id": "TC002"}]
+
+def test_stream_parser_ignores_arrays_under_other_keys():
+    text = '{"meta": {"tags": [{"name": "x"}]}, "notes": [{"n": 1}], "user_stories": [{"story_id": "US-001"}]}'
+    assert _feed_in_chunks(JsonArrayStreamParser("user_stories"), text) == [{"story_id": "US-001"}]
+
+def test_stream_parser_ignores_a_nested_array_with_the_same_key():
+    text = '{"meta": {"user_stories": [{"story_id": "wrong"}]}, "user_stories": [{"story_id": "US-001"}]}'
+    assert _feed_in_chunks(JsonArrayStreamParser("user_stories"), text) == [{"story_id": "US-001"}]
+
+def test_stream_parser_keeps_the_full_text():
+    parser = JsonArrayStreamParser()
+    text = '[{"id": 1}]'
+    _feed_in_chunks(parser, text, size=3)
+    assert parser.text() == text
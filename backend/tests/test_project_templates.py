@@ -0,0 +1,14 @@
+import json
+from src.sdlccopilot.project_templates import merge_package_json
+
+BASE = json.dumps({"name": "app", "dependencies": {"react": "^18.3.1"}, "scripts": {"dev": "vite"}})
+
+def test_merge_package_json_adds_new_entries_and_keeps_the_skeletons():
+    generated = json.dumps({"dependencies": {"react": "^17.0.0", "axios": "^1.7.0"}, "scripts": {"test": "vitest"}})
+    merged = json.loads(merge_package_json(BASE, generated))
+    assert merged["dependencies"] == {"react": "^18.3.1", "axios": "^1.7.0"}
+    assert merged["scripts"] == {"dev": "vite", "test": "vitest"}
+
+def test_merge_package_json_keeps_the_skeleton_for_json_that_is_not_an_object():
+    for generated in ('["axios"]', '"axios"', "null", "{not json"):
+        assert merge_package_json(BASE, generated) == BASE
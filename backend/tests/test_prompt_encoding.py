@@ -0,0 +1,36 @@
+from src.sdlccopilot.states.story import UserStory
+from src.sdlccopilot.utils.prompt_encoding import encode_user_stories, encode_security_reviews, encode_test_results
+
+STORIES = [
+    {"story_id": "US-001", "title": "Login", "description": "As a user\nI want to log in", "acceptance_criteria": ["valid credentials log in", "lockout after 5 failures"]},
+    {"story_id": "US-002", "title": "Pay bills", "description": "As a user I want to pay bills", "acceptance_criteria": []},
+]
+
+def test_encode_user_stories():
+    assert encode_user_stories(STORIES) == (
+        "US-001 | Login\n  As a user I want to log in\n  - valid credentials log in\n  - lockout after 5 failures\n"
+        "US-002 | Pay bills\n  As a user I want to pay bills"
+    )
+
+def test_encode_user_stories_accepts_models_and_titles_only():
+    stories = [UserStory.model_validate(story) for story in STORIES]
+    assert encode_user_stories(stories, titles_only=True) == "US-001 | Login\nUS-002 | Pay bills"
+
+def test_encode_drops_whole_items_to_fit_max_chars():
+    assert encode_user_stories(STORIES, max_chars=120) == (
+        "US-001 | Login\n  As a user I want to log in\n  - valid credentials log in\n  - lockout after 5 failures\n... (1 more)"
+    )
+
+def test_encode_security_reviews():
+    reviews = [{"sec_id": "SR-001", "priority": "high", "file_path": "routes/auth.js", "review": "Hardcoded secret", "recommendation": "Read it from the environment"}]
+    assert encode_security_reviews(reviews) == "SR-001 [high] routes/auth.js\n  issue: Hardcoded secret\n  fix: Read it from the environment"
+
+def test_encode_test_results_adds_the_failure_reason_of_failed_tests():
+    results = [
+        {"test_id": "TC001", "status": "fail", "description": "Login", "expected_result": "200", "actual_result": "500", "failure_reason": "DB down"},
+        {"test_id": "TC002", "status": "pass", "description": "Logout", "expected_result": "200", "actual_result": "200"},
+    ]
+    assert encode_test_results(results) == (
+        "TC001 FAIL Login\n  expected: 200\n  actual: 500\n  reason: DB down\n"
+        "TC002 PASS Logout\n  expected: 200\n  actual: 200"
+    )
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from langchain_core.messages import AIMessage, HumanMessage
+from src.sdlccopilot.helpers.qa_testing import affected_test_cases, is_failed, summarize_test_results, merge_test_results
+from src.sdlccopilot.nodes.qa_testing_nodes import QATestingNodes
+from src.sdlccopilot.states.sdlc import SDLCState
+
+FILES = {
+    "server.js": "const authRoutes = require('./routes/auth')\nconst payRoutes = require('./routes/pay')\napp.use('/api/auth', authRoutes)\napp.use('/api/pay', payRoutes)\n",
+    "routes/auth.js": "const { login } = require('../controllers/auth')\nrouter.post('/login', login)\n",
+    "routes/pay.js": "router.post('/', pay)\n",
+    "controllers/auth.js": "exports.login = (req, res) => res.json({})\n",
+}
+TEST_CASES = [
+    {"test_id": "TC001", "description": "POST /api/auth/login with valid credentials"},
+    {"test_id": "TC002", "description": "POST /api/pay with a valid amount"},
+    {"test_id": "TC003", "description": "POST /api/pay with a negative amount"},
+]
+
+def test_is_failed():
+    assert is_failed({"status": "Failed"}) and is_failed({"status": "fail"})
+    assert not is_failed({"status": "pass"})
+
+def test_merge_test_results_replaces_rerun_results_and_recomputes_the_summary():
+    qa_testing = {"summary": {}, "test_results": [{"test_id": "TC001", "status": "fail"}, {"test_id": "TC002", "status": "pass"}]}
+    merged = merge_test_results(qa_testing, [{"test_id": "TC001", "status": "pass"}])
+    assert merged["test_results"] == [{"test_id": "TC001", "status": "pass"}, {"test_id": "TC002", "status": "pass"}]
+    assert merged["summary"]["failed"] == 0
+
+def test_summarize_test_results():
+    results = [{"status": "pass"}, {"status": "Failed"}, {"status": "pass"}]
+    assert summarize_test_results(results) == {"total_tests": 3, "passed": 2, "failed": 1, "pass_percentage": 66.67}
+    assert summarize_test_results([])["pass_percentage"] == 0.0
+
+def test_affected_test_cases_are_the_failed_ones_and_those_reaching_a_changed_file():
+    test_results = [{"test_id": "TC001", "status": "pass"}, {"test_id": "TC002", "status": "pass"}, {"test_id": "TC003", "status": "fail"}]
+    affected = affected_test_cases(FILES, {"controllers/auth.js": "changed"}, TEST_CASES, test_results)
+    assert [test_case["test_id"] for test_case in affected] == ["TC001", "TC003"]
+
+def test_affected_test_cases_fall_back_to_every_test_when_no_endpoint_reaches_the_change():
+    affected = affected_test_cases(FILES, {"utils/format.js": "changed"}, TEST_CASES, [])
+    assert affected == TEST_CASES
+
+def _result(test_id, status):
+    return {"test_id": test_id, "status": status, "description": "d", "actual_result": "a", "expected_result": "e"}
+
+def _state(status, changed_code):
+    return SDLCState(
+        project_requirements={"title": "t", "description": "d", "requirements": ["r"]},
+        backend_code='<boltAction type="file" filePath="routes/pay.js">router.post(\'/\', pay)</boltAction>',
+        qa_testing={"summary": summarize_test_results([{"status": status}]), "test_results": [{"test_id": "TC002", "status": status, "description": "d", "actual_result": "a", "expected_result": "e"}]},
+        qa_fix_changed_code=changed_code,
+    )
+
+def test_fix_loop_ends_when_a_round_changed_no_code():
+    nodes = QATestingNodes(None, None)
+    assert nodes.next_after_qa_testing(_state("fail", True)) == "fix_code_after_qa_testing"
+    assert nodes.next_after_qa_testing(_state("fail", False)) == "complete_qa_testing"
+    assert nodes.next_after_qa_testing(_state("pass", True)) == "complete_qa_testing"
+
+def test_revised_qa_fixes_are_retested_before_the_gate(monkeypatch):
+    monkeypatch.setenv("PROJECT_ENVIRONMENT", "production")
+    backend_code = "".join(f'<boltAction type="file" filePath="{path}">{content}</boltAction>' for path, content in FILES.items())
+    revised_code = backend_code.replace("res.json({})", "res.json({ token })")
+    retested = []
+
+    def perform_qa_testing_with_llm(test_cases, code):
+        retested.append(([test_case["test_id"] for test_case in test_cases], code))
+        return {"test_results": [_result("TC001", "fail")]}
+
+    nodes = QATestingNodes(None, None)
+    nodes.security_review_helper = SimpleNamespace(revised_backend_code_with_security_reviews_from_llm=lambda code, reviews, feedback: revised_code)
+    nodes.qa_testing_helper = SimpleNamespace(perform_qa_testing_with_llm=perform_qa_testing_with_llm)
+    state = SDLCState(
+        project_requirements={"title": "t", "description": "d", "requirements": ["r"]},
+        backend_code=backend_code,
+        test_cases=[{**test_case, "steps": [], "status": "draft"} for test_case in TEST_CASES],
+        qa_testing={"summary": summarize_test_results([]), "test_results": [_result(test_case["test_id"], "pass") for test_case in TEST_CASES]},
+        qa_fix_count=1,
+        qa_testing_messages=[HumanMessage(content="return a token"), AIMessage(content="I'll revise the backend code accordingly.")],
+    )
+    update = nodes.revise_qa_fixes(state)
+    # Only the login test reaches the revised controller, and it runs against the files it needs
+    assert [test_ids for test_ids, _ in retested] == [["TC001"]]
+    assert "controllers/auth.js" in retested[0][1] and "routes/pay.js" not in retested[0][1]
+    assert update["backend_code"] == revised_code and update["qa_fix_changed_code"]
+    assert update["qa_testing"]["summary"]["failed"] == 1
+    assert nodes.next_after_qa_testing(SDLCState.model_validate({**dict(state), **update})) == "fix_code_after_qa_testing"
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.sdlccopilot import scheduler
+from src.sdlccopilot.scheduler import LLMScheduler, scheduled, scheduled_chat_model, PRIORITY_INITIAL, PRIORITY_INTERACTIVE
+from src.sdlccopilot.utils.concurrency import run_coroutine
+
+class SlowChatModel(FakeListChatModel):
+    def _call(self, *args, **kwargs):
+        with calls_lock:
+            in_flight.append(1)
+            peak[0] = max(peak[0], len(in_flight))
+        time.sleep(0.05)
+        with calls_lock:
+            in_flight.pop()
+        return "done"
+
+calls_lock, in_flight, peak = threading.Lock(), [], [0]
+
+class RecordingScheduler(LLMScheduler):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.tickets = []
+
+    def acquire(self, priority, tenant):
+        self.tickets.append((priority, tenant))
+        return super().acquire(priority, tenant)
+
+def test_fanned_out_calls_each_take_a_slot(monkeypatch):
+    llm_scheduler = RecordingScheduler(max_concurrency=2)
+    monkeypatch.setattr(scheduler, "llm_scheduler", llm_scheduler)
+    peak[0] = 0
+    llm = scheduled_chat_model(SlowChatModel)(responses=["done"])
+
+    async def fan_out():
+        return await asyncio.gather(*(llm.ainvoke("a") for _ in range(6)))
+
+    def node(state):
+        # The async path runs the sync one in an executor, which must not take a second slot
+        return run_coroutine(fan_out())
+
+    results = scheduled(PRIORITY_INTERACTIVE, node)({}, {"configurable": {"thread_id": "session", "tenant_id": "client:acme"}})
+    assert [result.content for result in results] == ["done"] * 6
+    assert peak[0] == 2
+    assert llm_scheduler.tickets == [(PRIORITY_INTERACTIVE, "client:acme")] * 6
+    assert llm_scheduler.running == 0
+
+def test_node_without_tenant_is_scheduled_per_session(monkeypatch):
+    llm_scheduler = RecordingScheduler(max_concurrency=1)
+    monkeypatch.setattr(scheduler, "llm_scheduler", llm_scheduler)
+    llm = scheduled_chat_model(SlowChatModel)(responses=["done"])
+    scheduled(PRIORITY_INITIAL, lambda state: llm.invoke("a"))({}, {"configurable": {"thread_id": "session", "tenant_id": None}})
+    assert llm_scheduler.tickets == [(PRIORITY_INITIAL, "session")]
+
+def test_scheduled_model_keeps_its_class_identity():
+    llm = scheduled_chat_model(SlowChatModel)(responses=["done"])
+    assert isinstance(llm, SlowChatModel)
+    assert type(llm).__name__ == "SlowChatModel"
+    assert scheduled_chat_model(SlowChatModel) is type(llm)
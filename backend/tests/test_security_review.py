@@ -0,0 +1,75 @@
+import json
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from src.sdlccopilot.helpers.security_review import SecurityReviewHelper, merge_security_reviews
+from src.sdlccopilot.utils.artifact import hash_bolt_files
+
+def _review(sec_id, file_path, review, priority):
+    return {"sec_id": sec_id, "file_path": file_path, "review": review, "recommendation": "fix it", "priority": priority}
+
+def test_merge_security_reviews_renumbers_across_shards():
+    merged = merge_security_reviews([
+        [_review("SR-001", "routes/auth.js", "Passwords are compared without a constant-time check", "medium")],
+        [_review("SR-001", "routes/pay.js", "The amount is not validated before the transfer", "high")],
+    ])
+    assert [(review["sec_id"], review["file_path"]) for review in merged] == [("SR-001", "routes/auth.js"), ("SR-002", "routes/pay.js")]
+
+def test_merge_security_reviews_keeps_the_higher_priority_of_a_duplicate():
+    merged = merge_security_reviews([
+        [_review("SR-001", "routes/auth.js", "The JWT secret is hardcoded in the source", "medium")],
+        [_review("SR-004", "routes/auth.js", "The JWT secret is hardcoded in the source", "high")],
+    ])
+    assert len(merged) == 1
+    assert merged[0]["priority"] == "high" and merged[0]["sec_id"] == "SR-001"
+
+def test_merge_security_reviews_keeps_the_same_finding_in_different_files():
+    merged = merge_security_reviews([
+        [_review("SR-001", "routes/auth.js", "The request body is not validated", "medium")],
+        [_review("SR-001", "routes/pay.js", "The request body is not validated", "medium")],
+    ])
+    assert len(merged) == 2
+
+def test_sharded_security_reviews_drop_invalid_findings():
+    def llm(prompt):
+        file_path = "routes/auth.js" if "routes/auth.js" in prompt.to_string() else "routes/pay.js"
+        return AIMessage(content=json.dumps({"security_reviews": [
+            _review("SR-001", file_path, f"The input of {file_path} is not validated", "high"),
+            _review("SR-002", file_path, "Something looks off", "critical"),
+        ]}))
+
+    content = "const x = 1;\n" * 200
+    backend_code = "".join(
+        f'<boltAction type="file" filePath="{file_path}">{content}</boltAction>'
+        for file_path in ("routes/auth.js", "routes/pay.js")
+    )
+    helper = SecurityReviewHelper(RunnableLambda(llm), None)
+    reviews = helper.generate_sharded_security_reviews_from_llm(backend_code, max_shard_tokens=1000)
+    # The finding with a priority outside the schema is dropped from each shard
+    assert [(review["sec_id"], review["file_path"], review["priority"]) for review in reviews] == [
+        ("SR-001", "routes/auth.js", "high"), ("SR-002", "routes/pay.js", "high")
+    ]
+
+def test_incremental_reviews_carry_findings_forward_by_normalized_path():
+    files = {"routes/auth.js": "const auth = 1;", "routes/pay.js": "const pay = 2;"}
+    backend_code = "".join(f'<boltAction type="file" filePath="{path}">{content}</boltAction>' for path, content in files.items())
+    previous_hashes = {f"./{path}": file_hash for path, file_hash in hash_bolt_files(files).items()}
+    previous_hashes["./routes/pay.js"] = "changed since"
+    previous_reviews = [
+        _review("SR-001", "./Routes/Auth.js", "The JWT secret is hardcoded", "high"),
+        _review("SR-002", "routes/pay.js", "The amount is not validated", "medium"),
+        _review("SR-003", "config/db.js", "The connection string holds a password", "high"),
+    ]
+    reviewed = []
+    helper = SecurityReviewHelper(None, None)
+    helper.generate_security_reviews_with_static_analysis = lambda code: reviewed.append(code) or [
+        _review("SR-001", "routes/pay.js", "The amount is still not validated", "high")
+    ]
+    reviews, hashes = helper.generate_incremental_security_reviews(backend_code, previous_reviews, previous_hashes)
+    # Only the changed file is re-reviewed; its old finding is replaced and the others are kept
+    assert len(reviewed) == 1 and "routes/pay.js" in reviewed[0] and "routes/auth.js" not in reviewed[0]
+    assert [(review["file_path"], review["review"]) for review in reviews] == [
+        ("./Routes/Auth.js", "The JWT secret is hardcoded"),
+        ("config/db.js", "The connection string holds a password"),
+        ("routes/pay.js", "The amount is still not validated"),
+    ]
+    assert hashes == hash_bolt_files(files)
@@ -0,0 +1,18 @@
+import pytest
+from pydantic import ValidationError
+from src.sdlccopilot.responses import SecurityReviewResponse
+from src.sdlccopilot.utils.serialization import model_json
+
+def _response(priority):
+    review = {"sec_id": "SR-001", "review": "r", "file_path": "app.py", "recommendation": "fix it", "priority": priority}
+    return SecurityReviewResponse.model_construct(session_id="s", status="completed", reviews=[review], messages=[])
+
+def test_model_json_validates_outside_production(monkeypatch):
+    monkeypatch.setenv("PROJECT_ENVIRONMENT", "development")
+    assert b'"priority":"high"' in model_json(_response("high"))
+    with pytest.raises(ValidationError):
+        model_json(_response("urgent"))
+
+def test_model_json_serializes_constructed_models_as_they_are_in_production(monkeypatch):
+    monkeypatch.setenv("PROJECT_ENVIRONMENT", "production")
+    assert b'"priority":"urgent"' in model_json(_response("urgent"))
@@ -0,0 +1,49 @@
+import asyncio
+import fakeredis
+from types import SimpleNamespace
+from fastapi.responses import JSONResponse
+from src.sdlccopilot.single_flight import single_flight
+
+def _review_endpoint(calls, delay=0):
+    @single_flight
+    async def review_stories(session_id, request, redis):
+        calls.append(request.feedback)
+        await asyncio.sleep(delay)
+        # A review that reaches the graph rewrites the session
+        redis.set(session_id, f"round {len(calls)}")
+        return JSONResponse({"round": len(calls)}, headers={"etag": f'"{len(calls)}"'})
+    return review_stories
+
+def _submit(endpoint, redis, feedback):
+    return endpoint(session_id="session", request=SimpleNamespace(feedback=feedback), redis=redis)
+
+def test_concurrent_duplicates_share_one_run():
+    redis, calls = fakeredis.FakeRedis(decode_responses=True), []
+    endpoint = _review_endpoint(calls, delay=0.2)
+
+    async def submit_twice():
+        return await asyncio.gather(_submit(endpoint, redis, "add MFA"), _submit(endpoint, redis, "add MFA"))
+
+    first, second = asyncio.run(submit_twice())
+    assert calls == ["add MFA"]
+    assert first.body == second.body
+
+def test_same_feedback_after_the_session_changed_runs_again():
+    redis, calls = fakeredis.FakeRedis(decode_responses=True), []
+    redis.set("session", "round 0")
+    endpoint = _review_endpoint(calls)
+    first = asyncio.run(_submit(endpoint, redis, "add MFA"))
+    second = asyncio.run(_submit(endpoint, redis, "add MFA"))
+    assert calls == ["add MFA", "add MFA"]
+    assert first.body != second.body
+
+def test_stored_response_keeps_its_headers():
+    redis, calls = fakeredis.FakeRedis(decode_responses=True), []
+    redis.set("session", "round 0")
+    endpoint = _review_endpoint(calls)
+    response = asyncio.run(_submit(endpoint, redis, "approved"))
+    # A retry against the same session version, as on another worker before the session was rewritten
+    redis.set("session", "round 0")
+    replayed = asyncio.run(_submit(endpoint, redis, "approved"))
+    assert calls == ["approved"]
+    assert replayed.body == response.body and replayed.headers["etag"] == response.headers["etag"]
@@ -0,0 +1,27 @@
+from src.sdlccopilot.utils import static_analysis
+from src.sdlccopilot.utils.static_analysis import analyze_file, static_security_analysis, start_process_pool, shutdown_process_pool
+
+def _reviews(content):
+    reviews, ambiguous = analyze_file("app/routes.py", content)
+    assert not ambiguous
+    return [review.review for review in reviews]
+
+def test_path_parameters_are_not_missing_validation():
+    assert _reviews("@router.put('/users/{user_id}')\ndef update(user_id, user: UserUpdate):\n    pass\n") == []
+    assert _reviews("@app.route('/orders/<int:order_id>', methods=['POST'])\ndef cancel(order_id):\n    pass\n") == []
+
+def test_untyped_and_dict_body_inputs_are_missing_validation():
+    assert len(_reviews("@router.post('/users/{user_id}')\ndef update(user_id, payload: dict):\n    pass\n")) == 1
+    assert len(_reviews("@router.post(path='/users')\ndef create(payload):\n    pass\n")) == 1
+
+def test_analysis_runs_in_the_started_pool_and_in_process_without_it():
+    files = {f"app/routes_{index}.py": "@router.post('/items')\ndef create(item: dict):\n    pass\n" for index in range(4)}
+    start_process_pool(2)
+    try:
+        assert static_analysis._pool is not None
+        pooled, _ = static_security_analysis(files, max_workers=2)
+    finally:
+        shutdown_process_pool()
+    assert static_analysis._pool is None
+    in_process, _ = static_security_analysis(files, max_workers=2)
+    assert [review.file_path for review in pooled] == [review.file_path for review in in_process] == list(files)
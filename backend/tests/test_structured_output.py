@@ -0,0 +1,15 @@
+from src.sdlccopilot.llms.structured_output import normalize_salvaged, UserStories
+from src.sdlccopilot.states.qa import QATesting
+
+def test_normalize_salvaged_drops_invalid_items_and_wraps_a_bare_list():
+    salvaged = [
+        {"story_id": "US-001", "title": "Login", "description": "As a user I want to log in", "acceptance_criteria": ["ok"]},
+        {"story_id": "US-002"},
+    ]
+    assert normalize_salvaged(UserStories, "user_stories", salvaged) == {"user_stories": [salvaged[0]]}
+
+def test_normalize_salvaged_fills_in_the_fields_the_response_lost():
+    result = {"test_id": "TC001", "description": "Login", "status": "pass", "expected_result": "200", "actual_result": "200"}
+    normalized = normalize_salvaged(QATesting, "test_results", [result])
+    assert set(normalized) == set(QATesting.model_fields)
+    assert len(normalized["test_results"]) == 1
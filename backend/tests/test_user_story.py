@@ -0,0 +1,60 @@
+import asyncio
+import json
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from src.sdlccopilot.helpers import user_story
+from src.sdlccopilot.helpers.user_story import UserStoryHelper, merge_user_stories, shard_requirements
+from src.sdlccopilot.requests import ProjectRequirementsRequest
+
+def _story(story_id, title, description, criteria):
+    return {"story_id": story_id, "title": title, "description": description, "acceptance_criteria": criteria}
+
+def test_shard_requirements_keeps_the_order():
+    assert shard_requirements(["r1", "r2", "r3", "r4", "r5"], 2) == [["r1", "r2"], ["r3", "r4"], ["r5"]]
+
+def test_merge_user_stories_renumbers_in_shard_order():
+    merged = merge_user_stories([
+        [_story("US-001", "Login", "As a user I want to log in", ["valid credentials log in"])],
+        [_story("US-001", "Pay bills", "As a user I want to pay my utility bills", ["bill is paid"])],
+    ])
+    assert [(story["story_id"], story["title"]) for story in merged] == [("US-001", "Login"), ("US-002", "Pay bills")]
+
+def test_merge_user_stories_folds_duplicates_into_the_first_story():
+    merged = merge_user_stories([
+        [_story("US-001", "Login", "As a user I want to log in to my account", ["valid credentials log in"])],
+        [_story("US-001", "Login", "As a user I want to log in to my account", ["valid credentials log in", "lockout after 5 failures"])],
+    ])
+    assert len(merged) == 1
+    assert merged[0]["acceptance_criteria"] == ["valid credentials log in", "lockout after 5 failures"]
+
+def test_merge_user_stories_keeps_stories_below_the_similarity():
+    merged = merge_user_stories([
+        [_story("US-001", "Login", "As a user I want to log in with a password", [])],
+        [_story("US-001", "Login", "As a user I want to log in with my fingerprint", [])],
+    ], similarity=0.9)
+    assert len(merged) == 2
+
+def _collect(helper, projects):
+    async def collect():
+        return {index: user_stories async for index, user_stories in helper.generate_user_stories_batch_with_llm(projects)}
+    return asyncio.run(collect())
+
+def test_packed_user_stories_are_validated_per_project(monkeypatch):
+    packed = {
+        "P1": [_story("US-001", "Login", "As a user I log in", ["works"]), {"title": "No description"}],
+        "P2": [{"story_id": "US-001"}],
+    }
+    llm = RunnableLambda(lambda prompt: AIMessage(content=json.dumps(packed)))
+    fallbacks = []
+
+    def generate_with_schema(llm, schema, list_field, system_prompt, human_query):
+        fallbacks.append(human_query)
+        return {"user_stories": [_story("US-001", "Search", "As a user I search", ["finds"])]}
+
+    monkeypatch.setattr(user_story, "generate_with_schema", generate_with_schema)
+    projects = [ProjectRequirementsRequest(title=f"p{index}", description="d", requirements=["r"]) for index in range(2)]
+    results = _collect(UserStoryHelper(llm), projects)
+    # The invalid story is dropped, and a project left with none is generated on its own
+    assert results[0] == [_story("US-001", "Login", "As a user I log in", ["works"])]
+    assert results[1] == [_story("US-001", "Search", "As a user I search", ["finds"])]
+    assert len(fallbacks) == 1 and "p1" in fallbacks[0]